@@ -0,0 +1,75 @@
+"""
+Compares the encoded size and the encode/decode throughput of blocks and messages
+between the marshmallow JSON path (BlockSchema, BaseSchema) and the codecs.
+
+Run from the root of the repository:
+    python -m benchmarks.codec_benchmark
+"""
+import argparse
+from timeit import Timer
+
+from funcoin_business.blockchain import Blockchain
+from funcoin_business.cars.car import Car
+from funcoin_business.codec.codec import CODECS
+from funcoin_business.messages import BaseSchema, create_block_message
+from funcoin_business.schema import BlockSchema
+from funcoin_business.transactions.transactions import create_transaction
+from funcoin_business.users.dealer import Dealer
+from funcoin_business.users.manufacturer import Manufacturer
+
+
+def make_block(transactions: int) -> dict:
+    """
+    :param transactions: int, the number of signed car transfers in the block.
+    :return: dict, a sealed block(similar to BlockSchema).
+    """
+    manufacturer = Manufacturer(None, None, 100, False, {"ip": "10.0.0.1", "port": 8001})
+    dealer = Dealer(None, None, 100, False, {"ip": "10.0.0.2", "port": 8002})
+    owner = {"address": manufacturer.get_address(), "access": manufacturer.get_access()}
+    txs = [create_transaction(manufacturer, dealer, Car(car_id, dict(owner), "Mazda", "red"))
+           for car_id in range(transactions)]
+    return Blockchain.create_block(1, {"ip": "0.0.0.0", "port": 8888}, txs, "0" * 64)
+
+
+def rate(function, number: int) -> float:
+    """
+    :return: float, calls per second, the best of 3 repeats.
+    """
+    return number / min(Timer(function).repeat(3, number))
+
+
+def report(name: str, encoded: bytes | str, encode, decode, number: int) -> None:
+    size = len(encoded.encode() if isinstance(encoded, str) else encoded)
+    print(f"  {name:<22}{size:>10} B{rate(encode, number):>14,.0f}/s{rate(decode, number):>14,.0f}/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=Blockchain.MAX_TRANSACTIONS,
+                        help="the number of transactions in the block")
+    parser.add_argument("--number", type=int, default=200, help="calls per measurement")
+    args = parser.parse_args()
+
+    block = make_block(args.transactions)
+    message = BaseSchema().loads(create_block_message("10.0.0.1", 8888, block))
+    print(f"block with {args.transactions} transactions")
+    print(f"  {'path':<22}{'size':>12}{'encode':>16}{'decode':>16}")
+
+    text = BlockSchema().dumps(block)
+    report("BlockSchema", text, lambda: BlockSchema().dumps(block), lambda: BlockSchema().loads(text), args.number)
+    for codec in CODECS.values():
+        encoded = codec.encode_block(block)
+        report(f"{codec.name} codec", encoded, lambda: codec.encode_block(block),
+               lambda: codec.decode_block(encoded), args.number)
+
+    print("block message")
+    text = BaseSchema().dumps(message)
+    report("BaseSchema", text, lambda: BaseSchema().dumps(message), lambda: BaseSchema().loads(text), args.number)
+    for codec in CODECS.values():
+        encoded = codec.encode_message(message)
+        report(f"{codec.name} codec", encoded, lambda: codec.encode_message(message),
+               lambda: codec.decode_message(encoded), args.number)
+
+
+if __name__ == "__main__":
+    main()
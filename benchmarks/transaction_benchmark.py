@@ -0,0 +1,50 @@
+"""
+Measures the cost of creating a transaction: copying the car with a CarSchema JSON round trip(the old path)
+against Car.snapshot, and create_transaction against signing alone.
+
+Run from the root of the repository:
+    python -m benchmarks.transaction_benchmark
+"""
+import argparse
+from timeit import Timer
+
+# blockchain is imported before schema, they import each other
+import funcoin_business.blockchain
+from funcoin_business.cars.car import Car
+from funcoin_business.schema import CarSchema
+from funcoin_business.transactions.canonical import canonical_bytes
+from funcoin_business.transactions.transactions import create_transaction
+from funcoin_business.users.dealer import Dealer
+from funcoin_business.users.manufacturer import Manufacturer
+
+
+def cost(function, number: int) -> float:
+    """
+    :return: float, microseconds per call, the best of 3 repeats.
+    """
+    return min(Timer(function).repeat(3, number)) / number * 1e6
+
+
+def report(name: str, function, number: int) -> None:
+    print(f"  {name:<36}{cost(function, number):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="calls per measurement")
+    args = parser.parse_args()
+
+    manufacturer = Manufacturer(None, None, 100, False, {"ip": "10.0.0.1", "port": 8001})
+    dealer = Dealer(None, None, 100, False, {"ip": "10.0.0.2", "port": 8002})
+    car = Car(1, {"address": manufacturer.get_address(), "access": manufacturer.get_access()}, "Mazda", "red")
+    signing_bytes = canonical_bytes(create_transaction(manufacturer, dealer, car))
+
+    print("microseconds per call")
+    report("car copy, CarSchema round trip", lambda: CarSchema().loads(CarSchema().dumps(car)), args.number)
+    report("car copy, Car.snapshot", car.snapshot, args.number)
+    report("create_transaction", lambda: create_transaction(manufacturer, dealer, car), args.number)
+    report("signing alone", lambda: manufacturer.sign(signing_bytes), args.number)
+
+
+if __name__ == "__main__":
+    main()
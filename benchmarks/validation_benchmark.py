@@ -0,0 +1,52 @@
+"""
+Compares the cost of validating one object between building a new marshmallow schema on every call
+(the way the hot paths used to validate), loading with a schema that is built once,
+and the validators of validation.validators in their normal and strict modes.
+
+Run from the root of the repository:
+    python -m benchmarks.validation_benchmark
+"""
+import argparse
+from timeit import Timer
+
+from benchmarks.codec_benchmark import make_block
+from funcoin_business.blockchain import Blockchain
+from funcoin_business.schema import AddressSchema, CarSchema, TransactionSchema, BlockSchema
+from funcoin_business.validation.validators import ADDRESS_VALIDATOR, CAR_VALIDATOR, TRANSACTION_VALIDATOR, \
+    BLOCK_VALIDATOR
+
+
+def cost(function, number: int) -> float:
+    """
+    :return: float, microseconds per call, the best of 3 repeats.
+    """
+    return min(Timer(function).repeat(3, number)) / number * 1e6
+
+
+def report(name: str, schema_class, validator, data, number: int) -> None:
+    per_call = cost(lambda: schema_class().load(data), number)
+    built_once = cost(lambda: validator.schema.load(data), number)
+    fast = cost(lambda: validator.load(data), number)
+    strict = cost(lambda: validator.load(data, strict=True), number)
+    print(f"  {name:<14}{per_call:>12.1f}{built_once:>12.1f}{fast:>12.1f}{strict:>12.1f}{per_call / fast:>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=Blockchain.MAX_TRANSACTIONS,
+                        help="the number of transactions in the block")
+    parser.add_argument("--number", type=int, default=500, help="calls per measurement")
+    args = parser.parse_args()
+
+    block = make_block(args.transactions)
+    transaction = block["transaction"][0]
+    print(f"microseconds per object, block with {args.transactions} transactions")
+    print(f"  {'type':<14}{'per call':>12}{'built once':>12}{'validator':>12}{'strict':>12}{'speedup':>10}")
+    report("address", AddressSchema, ADDRESS_VALIDATOR, block["address"], args.number)
+    report("car", CarSchema, CAR_VALIDATOR, transaction["item"], args.number)
+    report("transaction", TransactionSchema, TRANSACTION_VALIDATOR, transaction, args.number)
+    report("block", BlockSchema, BLOCK_VALIDATOR, block, args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import asyncio
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+
+import structlog
+
+from funcoin_business.admission.voter import Voter, ABSTAIN
+from funcoin_business.users.user import User
+
+logger = structlog.getLogger(__name__)
+
+
+class AdmissionTimeout(Exception):
+    pass
+
+
+class AdmissionControl:
+    """
+    Class AdmissionControl, lets several users through authorization at the same time, each with its own vote.
+    Users beyond max_concurrent wait in line and are woken up in the order they arrived when a place frees up.
+    Waiting in line is bounded by queue_timeout and the authorization of a user by timeout,
+    so a user who never answers can't keep the others out.
+    """
+
+    MAX_CONCURRENT = 4
+    QUEUE_TIMEOUT = 300.0
+    TIMEOUT = 120.0
+    VOTE_DEADLINE = 60.0
+    AUTHORIZATION_WORD = "p"
+    # The number of ended votes whose latency is kept
+    LATENCY_HISTORY = 100
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT, queue_timeout: float = QUEUE_TIMEOUT,
+                 timeout: float = TIMEOUT, authorization_word: str = AUTHORIZATION_WORD,
+                 vote_deadline: float | None = VOTE_DEADLINE, silent_voters: str = ABSTAIN):
+        """
+        :param max_concurrent: int, the maximal number of users in authorization at the same time.
+        :param queue_timeout: float, the maximal number of seconds a user waits in line.
+        :param timeout: float, the maximal number of seconds the authorization of a user takes.
+        :param authorization_word: str, the vote in favor of a user.
+        :param vote_deadline: float, the maximal number of seconds a vote takes, see Voter.
+        :param silent_voters: str, voter.ABSTAIN or voter.REJECT, what silent voters count as at the deadline.
+        """
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.authorization_word = authorization_word
+        self.vote_deadline = vote_deadline
+        self.silent_voters = silent_voters
+        self._places = asyncio.Semaphore(max_concurrent)
+        # {"ip:port" of the user who wants to join: Voter}
+        self.votes = {}
+        # "ip:port" of the users in authorization, an address is reserved by one joining user at a time
+        self.reserved = set()
+        self.counts = Counter(authorizations=0, timed_out=0, queue_timed_out=0)
+        # The seconds the latest votes took, from the oldest
+        self.vote_latencies = deque(maxlen=self.LATENCY_HISTORY)
+
+    def is_full(self) -> bool:
+        """
+        :return: Boolean, True if a new user has to wait in line, False otherwise.
+        """
+        return self._places.locked()
+
+    @asynccontextmanager
+    async def place(self):
+        """
+        Waits in line for a place in authorization, the place is held until the context exits.
+        :raise: AdmissionTimeout if the user waited longer than queue_timeout.
+        """
+        try:
+            await asyncio.wait_for(self._places.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.counts["queue_timed_out"] += 1
+            raise AdmissionTimeout("Waited too long for authorization")
+        try:
+            yield
+        finally:
+            self._places.release()
+
+    async def authorize(self, authorization):
+        """
+        Runs the authorization of a user, bounded by timeout.
+        :raise: AdmissionTimeout if the authorization took longer than timeout.
+
+        :param authorization: coroutine, the authorization of the user.
+        :return: the result of the authorization.
+        """
+        self.counts["authorizations"] += 1
+        try:
+            return await asyncio.wait_for(authorization, self.timeout)
+        except asyncio.TimeoutError:
+            self.counts["timed_out"] += 1
+            raise AdmissionTimeout("Authorization took too long")
+
+    def reserve(self, address: str) -> bool:
+        """
+        Reserves the address of a joining user for its authorization, release must be called once it ends.
+
+        :param address: str, "ip:port" of the user who wants to join.
+        :return: Boolean, True if the address was reserved, False if another user in authorization holds it.
+        """
+        if address in self.reserved:
+            return False
+        self.reserved.add(address)
+        return True
+
+    def release(self, address: str) -> None:
+        """
+        :param address: str, "ip:port" of a user whose authorization ended.
+        """
+        self.reserved.discard(address)
+
+    def start_vote(self, address: str, voters: list[str]) -> Voter:
+        """
+        :param address: str, "ip:port" of the user who wants to join.
+        :param voters: list of str, "ip:port" of the users who vote.
+        :return: Voter, the vote about the user.
+        """
+        voter = Voter(voters, self.authorization_word, self.vote_deadline, self.silent_voters)
+        self.votes[address] = voter
+        logger.info("Started authorization vote", address=address, voters=len(voters), open_votes=len(self.votes))
+        return voter
+
+    def end_vote(self, address: str, voter: Voter) -> None:
+        """
+        Closes the vote about a user and records how long it took, if it ended.
+
+        :param address: str, "ip:port" of the user the vote was about.
+        :param voter: Voter, the vote, returned by start_vote.
+        """
+        if self.votes.get(address) is voter:
+            del self.votes[address]
+        if not voter.is_vote_ended():
+            return
+        self.vote_latencies.append(voter.latency)
+        logger.info("Authorization vote ended", address=address, outcome=voter.outcome, reason=voter.reason,
+                    latency=round(voter.latency, 3), votes=len(voter.votes), voters=len(voter.voters))
+
+    def open_votes(self, user: User) -> list[tuple[str, Voter]]:
+        """
+        :param user: User, an authorized user.
+        :return: list of tuples ("ip:port" of the user who wants to join, Voter), the votes the user can vote in.
+        """
+        return [(address, voter) for address, voter in list(self.votes.items()) if voter.can_vote(user)]
+
+    async def notify_user_quit(self, address: str) -> None:
+        """
+        notifies the open votes an authorized user has left, so they don't wait for the user's vote.
+        :param address: str, "ip:port" of the user.
+        """
+        for voter in list(self.votes.values()):
+            await voter.notify_user_quit(address)
@@ -0,0 +1,143 @@
+import asyncio
+from time import monotonic
+
+from funcoin_business.users.user import User
+
+# What the votes of voters who stay silent until the deadline count as
+ABSTAIN = "abstain"
+REJECT = "reject"
+
+
+class Voter:
+    """
+    Class Voter, handles a vote on the server about a user who wants to join.
+    Only the authorized users who were connected when the vote started can vote.
+    The user is authorized if at least half of the votes are in favor, the vote ends as soon as the outcome
+    can't change anymore, whatever the remaining voters vote, or at the deadline.
+    At the deadline the silent voters abstain(the cast votes decide, and no votes at all reject the user)
+    or count as votes against the user, as set by silent.
+    """
+
+    def __init__(self, voters: list[str], authorization_word: str, deadline: float | None = None,
+                 silent: str = ABSTAIN):
+        """
+        :param voters: list of str, "ip:port" of the users who can vote.
+        :param authorization_word: str, the vote in favor of the user.
+        :param deadline: float, the maximal number of seconds the vote takes, no deadline if not given.
+        :param silent: str, ABSTAIN or REJECT, what the votes of silent voters count as at the deadline.
+        """
+        self.voters = set(voters)
+        self.votes = {}
+        self.authorization_word = authorization_word
+        self.deadline = deadline
+        self.silent = silent
+        self.started = monotonic()
+        # Set once the vote ended: the outcome, why it ended and how many seconds it took
+        self.outcome = None
+        self.reason = None
+        self.latency = None
+        self._ended = asyncio.Event()
+        self._decide()
+
+    def is_vote_ended(self) -> bool:
+        """
+        :return: True if vote ended, False otherwise.
+        """
+        return self._ended.is_set()
+
+    def has_user_vote(self, user: User) -> bool:
+        """
+        checks if a user has already voted.
+        :param user: The user.
+        :return: True if the user has already voted, False otherwise.
+        """
+        return user.get_address() in self.votes.keys()
+
+    def can_vote(self, user: User) -> bool:
+        """
+        :param user: The user.
+        :return: True if the vote is open and the user can vote and hasn't voted yet, False otherwise.
+        """
+        return not self.is_vote_ended() and user.get_address() in self.voters and not self.has_user_vote(user)
+
+    async def add_vote(self, vote: str, address: str) -> None:
+        """
+        Adds user's vote.
+        :param vote: Str, the answer for the vote
+        :param address: the address if the user that voted.
+        """
+        if self.is_vote_ended() or address not in self.voters:
+            return
+        self.votes[address] = vote
+        self._decide()
+
+    def conclude_vote(self) -> bool:
+        """
+        :return: True if the vote has passed(at least half of the votes were in favor), False otherwise.
+        Before the vote ended, the outcome of the votes cast so far.
+        """
+        if self.outcome is not None:
+            return self.outcome
+        yes_voters = list(self.votes.values()).count(self.authorization_word)
+        return yes_voters >= len(self.votes) / 2.0
+
+    async def notify_user_quit(self, address: str) -> None:
+        """
+        notifies the voter an authorized user has left during the vote.
+        :param address: str, "ip:port" of the user.
+        """
+        # Only a voter who hasn't voted yet is still waited for
+        if self.is_vote_ended() or address not in self.voters or address in self.votes:
+            return
+        self.voters.discard(address)
+        self._decide()
+
+    async def wait(self, timeout: float | None = None) -> bool:
+        """
+        Waits for the vote to end, the vote is ended by the silent voters rule if the deadline passes meanwhile.
+
+        :param timeout: float, the maximal number of seconds to wait, until the vote ends if not given.
+        :return: Boolean, True if the vote ended, False if the time ran out first.
+        """
+        remaining = None if self.deadline is None else self.started + self.deadline - monotonic()
+        if timeout is not None and (remaining is None or timeout < remaining):
+            try:
+                await asyncio.wait_for(self._ended.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+            return True
+        try:
+            await asyncio.wait_for(self._ended.wait(), remaining)
+        except asyncio.TimeoutError:
+            self._expire()
+        return True
+
+    def _decide(self) -> None:
+        """
+        Ends the vote if the remaining voters can't change its outcome.
+        """
+        yes_voters = list(self.votes.values()).count(self.authorization_word)
+        no_voters = len(self.votes) - yes_voters
+        remaining = len(self.voters) - len(self.votes)
+        if yes_voters >= no_voters + remaining:
+            self._end(True, "decided" if remaining else "everyone voted")
+        elif yes_voters + remaining < no_voters:
+            self._end(False, "decided" if remaining else "everyone voted")
+
+    def _expire(self) -> None:
+        """
+        Ends the vote at the deadline by the silent voters rule.
+        """
+        if self.is_vote_ended():
+            return
+        yes_voters = list(self.votes.values()).count(self.authorization_word)
+        no_voters = len(self.votes) - yes_voters
+        if self.silent == REJECT:
+            no_voters += len(self.voters) - len(self.votes)
+        self._end(bool(self.votes) and yes_voters >= no_voters, "deadline")
+
+    def _end(self, outcome: bool, reason: str) -> None:
+        self.outcome = outcome
+        self.reason = reason
+        self.latency = monotonic() - self.started
+        self._ended.set()
@@ -1,5 +1,8 @@
 import asyncio
 import json
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from collections.abc import Iterator
 import math
 import random
 from hashlib import sha256
@@ -7,7 +10,19 @@ from time import time
 import structlog
 from marshmallow.exceptions import MarshmallowError
 
-from funcoin_business.schema import TransactionSchema, BlockSchema
+from funcoin_business.codec.codec import CodecError
+from funcoin_business.forks.block_tree import (BlockTree, BranchView, block_work,
+                                               EXTENDED, SIDE, REORG, ORPHAN, KNOWN, INVALID)
+from funcoin_business.indexes.participant_index import ParticipantIndex
+from funcoin_business.indexes.provenance_index import CarProvenanceIndex
+from funcoin_business.mining.miner import DifficultyAdjuster
+from funcoin_business.merkle import merkle_proof, merkle_root, verify_merkle_proof
+from funcoin_business.schema import TransactionSchema
+from funcoin_business.storage.block_store import BlockStore, MemoryBlockStore
+from funcoin_business.storage.header_chain import HeaderChain
+from funcoin_business.transactions.canonical import canonical_bytes, transaction_digest
+from funcoin_business.transactions.mempool import Mempool, MempoolException
+from funcoin_business.validation.validators import BLOCK_VALIDATOR, TRANSACTION_VALIDATOR
 
 
 logger = structlog.getLogger("blockchain")
@@ -16,15 +31,53 @@ logger = structlog.getLogger("blockchain")
 class Blockchain(object):
     """
     class Blockchain handles a blockchain
+    The chain is the main chain, competing blocks from other nodes are kept in a block tree,
+    the chain switches to a side branch once it holds more work(more blocks without proof of work).
     """
     MAX_TRANSACTIONS = 10
+    # Side blocks deeper than this below the tip are dropped, the chain is never reorganised deeper
+    MAX_REORG_DEPTH = 100
+    # Every node starts from the same genesis block, so the chains of different nodes link
+    GENESIS_ADDRESS = {"ip": "0.0.0.0", "port": 8888}
+    GENESIS_TIMESTAMP = 1672531200.0
 
-    def __init__(self):
-        self.chain = []
-        self.pending_transactions = []
+    def __init__(self, store: BlockStore | HeaderChain | None = None, mempool_size: int = Mempool.MAX_SIZE,
+                 difficulty: DifficultyAdjuster | None = None):
+        """
+        :param store: BlockStore or HeaderChain, disk backed storage of the chain,
+        if not given the chain is kept in memory only.
+        :param mempool_size: int, the maximal number of pending transactions.
+        :param difficulty: DifficultyAdjuster, decides the proof of work difficulty of blocks,
+        blocks need no proof of work if not given.
+        """
+        self.chain = store if store is not None else MemoryBlockStore()
+        self.difficulty = difficulty
+        # Functions called with every block that extends the chain and whether it was trusted
+        self.block_listeners = []
+        # Functions called on a reorganisation with the removed blocks and the added blocks, from the oldest
+        self.reorg_listeners = []
+        self.side_blocks = BlockTree()
+        self.pending_transactions = Mempool(mempool_size)
+        # Secondary indexes over the transactions of the chain, they catch up with a loaded chain on first use
+        self.car_index = CarProvenanceIndex()
+        self.participant_index = ParticipantIndex()
+        self.indexes = [self.car_index, self.participant_index]
+        # The number of blocks added through each validation tier, and the number of rejected blocks
+        self.validation_counts = Counter(trusted=0, full=0, rejected=0)
+        if self.chain:
+            logger.info("loaded chain from the block store", height=len(self.chain))
+            return
         # create the genesis block
         logger.info("creating genesis block")
-        self.chain.append(self.new_block())
+        self.chain.append(self.genesis_block())
+
+    @classmethod
+    def genesis_block(cls) -> dict:
+        """
+        :return: dict, the genesis block, the same on every node(similar to BlockSchema).
+        """
+        return cls.create_block(height=0, address=dict(cls.GENESIS_ADDRESS), transactions=[],
+                                previous_hash="first block", timestamp=cls.GENESIS_TIMESTAMP)
 
     def new_block(self):
         """
@@ -33,17 +86,52 @@ class Blockchain(object):
         :return: the block.
         """
         # Generates a new block
-        block = self.create_block(
-            height=len(self.chain),
-            address={"ip": "0.0.0.0", "port": 8888},
-            transactions=self.pending_transactions,
-            previous_hash=self.last_block['hash'] if self.last_block else "first block",
-            timestamp=time(),
-        )
-
-        # Reset the list of pending transactions
-        self.pending_transactions = []
-        return block
+        return self.create_block(**self.next_block_fields(len(self.pending_transactions)))
+
+    def next_block_fields(self, max_transactions: int) -> dict:
+        """
+        Takes the oldest pending transactions and the position of the next block in the chain,
+        everything create_block needs to make the next block.
+
+        :param max_transactions: int, the maximal number of transactions in the block.
+        :return: dict, the keyword arguments of create_block.
+        """
+        return {
+            "height": len(self.chain),
+            "address": {"ip": "0.0.0.0", "port": 8888},
+            "transactions": self.take_pending_transactions(max_transactions),
+            "previous_hash": self.last_block['hash'] if self.last_block else "first block",
+            "timestamp": time(),
+            "difficulty": self.required_difficulty(),
+        }
+
+    def required_difficulty(self, chain=None) -> int:
+        """
+        :param chain: the blocks to build on, Blockchain.chain or a BranchView, the main chain if not given.
+        :return: int, the proof of work difficulty of the next block, 0 if proof of work is off.
+        (the genesis block has no proof of work)
+        """
+        chain = self.chain if chain is None else chain
+        if self.difficulty is None or not chain:
+            return 0
+        return self.difficulty.next_difficulty(chain)
+
+    def take_pending_transactions(self, max_transactions: int) -> list[dict]:
+        """
+        Removes the oldest pending transactions.
+
+        :param max_transactions: int, the maximal number of transactions to take.
+        :return: list of TransactionSchema, the transactions in the order they were added.
+        """
+        return self.pending_transactions.take(max_transactions)
+
+    def return_pending_transactions(self, transactions: list[dict]) -> None:
+        """
+        Puts transactions taken for a block that wasn't added back at the front of the pending transactions.
+
+        :param transactions: list of TransactionSchema, the transactions in the order they were taken.
+        """
+        self.pending_transactions.restore(transactions)
 
     @staticmethod
     def hash(block: dict) -> str:
@@ -54,9 +142,25 @@ class Blockchain(object):
         :return: str, the hash if the block using sha256 in hexadecimal.
         """
         # Hashes a block
-        # We ensure the dictionary is sorted, or we'll have inconsistent hashes
-        block_string = json.dumps(block, sort_keys=True).encode()
-        return sha256(block_string).hexdigest()
+        # Only the header is hashed, the transactions are committed to by the merkle root in the header
+        block_header = {key: value for key, value in block.items() if key not in ("transaction", "hash")}
+        return sha256(canonical_bytes(block_header)).hexdigest()
+
+    @staticmethod
+    def header(block: dict) -> dict:
+        """
+        :param block: dict, the block.
+        :return: dict, the header of the block, the block without its transactions.
+        """
+        return {key: value for key, value in block.items() if key != "transaction"}
+
+    @staticmethod
+    def merkle_root(transactions: list[dict]) -> str:
+        """
+        :param transactions: list of TransactionSchema, the transactions of a block.
+        :return: str, the root of the merkle tree over the cached digests of the transactions.
+        """
+        return merkle_root([transaction_digest(tx) for tx in transactions])
 
     @staticmethod
     def create_block(height: int,
@@ -64,6 +168,8 @@ class Blockchain(object):
                      transactions: list[TransactionSchema],
                      previous_hash: str,
                      timestamp: float = None,
+                     difficulty: int = 0,
+                     nonce: int = 0,
                      ) -> dict:
         """
         creates a new block.
@@ -73,13 +179,18 @@ class Blockchain(object):
         :param transactions: the transactions stored in the block
         :param previous_hash: the hash of the previous block in the chain
         :param timestamp: float, the time the block was created on
+        :param difficulty: int, the number of leading zero bits the hash must have, 0 without proof of work
+        :param nonce: int, the proof of work
         :return: dictionary representing a block(similar to BlockSchema).
         """
         block = {"height": height,
                  "address": address,
                  "transaction": transactions,
+                 "merkle_root": Blockchain.merkle_root(transactions),
                  "previous_hash": previous_hash,
-                 "timestamp": timestamp or time(),
+                 "timestamp": time() if timestamp is None else timestamp,
+                 "difficulty": difficulty,
+                 "nonce": nonce,
                  }
         # Get the hash of the new block, and add it to the block
         block["hash"] = Blockchain.hash(block)
@@ -95,49 +206,399 @@ class Blockchain(object):
         """
         return self.chain[-1] if self.chain else None
 
-    def add_block(self, block: dict) -> bool:
+    def is_next_block(self, block: dict) -> bool:
+        """
+        :param block: dict, a block.
+        :return: Boolean, True if the block extends the last block of the chain, False otherwise
+        """
+        last_block = self.last_block
+        if not last_block:
+            return block["height"] == 0 and block["previous_hash"] == "first block"
+        return block["height"] == last_block["height"] + 1 and block["previous_hash"] == last_block["hash"]
+
+    def add_block(self, block: dict, trusted: bool = False) -> bool:
         """
         gets a block and add it to the chain
+        Blocks from other nodes get full validation: deserialization by BLOCK_VALIDATOR(BlockSchema), which checks the structure,
+        the hash and the merkle root, and a check that the block extends the chain.
+        Trusted blocks, made by this node from transactions that were already validated, are only checked to extend
+        the chain.
 
         :param block: , dict representing the block to add
+        :param trusted: Boolean, True for blocks made by this node(i.e. by new_block)
         :return: Boolean, True if added the block successfully, False otherwise
         """
-        # Verify the block
+        if trusted:
+            verified_block = block
+        else:
+            # Verify the block
+            try:
+                verified_block = BLOCK_VALIDATOR.load(block)
+            except (MarshmallowError, json.decoder.JSONDecodeError) as e:
+                logger.info(str(e))
+                self.validation_counts["rejected"] += 1
+                return False
+
+        if not self.is_next_block(verified_block):
+            logger.info("The block doesn't extend the chain", height=verified_block["height"])
+            self.validation_counts["rejected"] += 1
+            return False
+        # The schema checked the hash meets the difficulty of the block, it must also be the required difficulty
+        if verified_block.get("difficulty", 0) != self.required_difficulty():
+            logger.info("The block has the wrong difficulty", height=verified_block["height"])
+            self.validation_counts["rejected"] += 1
+            return False
+        if not self._append(verified_block, trusted):
+            self.validation_counts["rejected"] += 1
+            return False
+        self.validation_counts["trusted" if trusted else "full"] += 1
+        return True
+
+    def _append(self, block: dict, trusted: bool) -> bool:
+        """
+        Appends a validated block to the chain.
+
+        :param block: BlockSchema, a block that extends the chain.
+        :param trusted: Boolean, True for blocks made by this node.
+        :return: Boolean, True if the block was appended, False if the store can't encode it.
+        """
+        # The block is encoded before anything is written, a block that can't be encoded leaves the store as it was
         try:
-            verified_block = BlockSchema().load(block)
+            self.chain.append(block)
+        except CodecError as e:
+            logger.error("The block store can't encode the block", height=block["height"], error=str(e))
+            return False
+        self.update_indexes(block)
+        for listener in self.block_listeners:
+            listener(block, trusted)
+        return True
+
+    def is_known_block(self, block: dict) -> bool:
+        """
+        :param block: dict, a block.
+        :return: Boolean, True if the block is on the chain, a side block or an orphan, False otherwise
+        """
+        if block["hash"] in self.side_blocks:
+            return True
+        return block["height"] < len(self.chain) and self.chain.hash_at(block["height"]) == block["hash"]
+
+    def receive_block(self, block: dict) -> str:
+        """
+        Takes in a block from another node, which may extend the chain, a side branch, or neither yet.
+        The block gets full validation, blocks whose parent arrives later are kept as orphans and connected then.
+
+        :param block: dict, the block(similar to BlockSchema).
+        :return: str, the outcome, one of block_tree.EXTENDED, SIDE, REORG, ORPHAN, KNOWN or INVALID.
+        """
+        try:
+            verified_block = BLOCK_VALIDATOR.load(block)
         except (MarshmallowError, json.decoder.JSONDecodeError) as e:
             logger.info(str(e))
+            self.validation_counts["rejected"] += 1
+            return INVALID
+
+        outcome = self._connect_block(verified_block)
+        # Blocks that were waiting for this one can be connected now, the outcome tells if they changed the chain
+        connected = [verified_block] if outcome in (EXTENDED, SIDE, REORG) else []
+        while connected:
+            for orphan in self.side_blocks.take_orphans(connected.pop()["hash"]):
+                orphan_outcome = self._connect_block(orphan)
+                if orphan_outcome in (EXTENDED, SIDE, REORG):
+                    connected.append(orphan)
+                if orphan_outcome == REORG or orphan_outcome == EXTENDED and outcome != REORG:
+                    outcome = orphan_outcome
+        self.side_blocks.prune(len(self.chain) - self.MAX_REORG_DEPTH)
+        return outcome
+
+    def _connect_block(self, block: dict) -> str:
+        """
+        Connects a validated block to the chain or to the block tree, switching to its branch if it has more work.
+
+        :param block: BlockSchema, the block.
+        :return: str, the outcome, see receive_block.
+        """
+        if self.is_known_block(block):
+            return KNOWN
+        if block["height"] < len(self.chain) - self.MAX_REORG_DEPTH:
+            logger.info("The block is too deep below the tip", height=block["height"])
+            self.validation_counts["rejected"] += 1
+            return INVALID
+
+        if block["height"] == 0:
+            logger.info("The genesis block can't be replaced")
+            self.validation_counts["rejected"] += 1
+            return INVALID
+
+        parent = self.side_blocks.blocks.get(block["previous_hash"])
+        if parent:
+            if parent["height"] != block["height"] - 1:
+                logger.info("The block has the wrong height", height=block["height"])
+                self.validation_counts["rejected"] += 1
+                return INVALID
+            # The side branch from the fork point up to the parent
+            branch = self.side_blocks.branch(parent["hash"])
+            fork_height = branch[0]["height"] - 1
+        else:
+            fork_height = block["height"] - 1
+            if fork_height >= len(self.chain) or self.chain.hash_at(fork_height) != block["previous_hash"]:
+                self.side_blocks.add_orphan(block)
+                return ORPHAN
+            branch = []
+
+        if block.get("difficulty", 0) != self.required_difficulty(BranchView(self.chain, fork_height, branch)):
+            logger.info("The block has the wrong difficulty", height=block["height"])
+            self.validation_counts["rejected"] += 1
+            return INVALID
+
+        if not branch and block["height"] == len(self.chain):
+            if not self._append(block, trusted=False):
+                self.validation_counts["rejected"] += 1
+                return INVALID
+            self.validation_counts["full"] += 1
+            return EXTENDED
+
+        self.validation_counts["full"] += 1
+        self.side_blocks.add(block)
+        branch.append(block)
+        branch_work = sum(block_work(side_block) for side_block in branch)
+        chain_work = sum(block_work(self.chain[height]) for height in range(fork_height + 1, len(self.chain)))
+        if branch_work <= chain_work:
+            logger.info("Added a side block", height=block["height"], fork_height=fork_height)
+            return SIDE
+        self.reorganize(fork_height, branch)
+        return REORG
+
+    def reorganize(self, fork_height: int, branch: list[dict]) -> None:
+        """
+        Switches the chain to a side branch, only the blocks after the fork point are touched:
+        they are removed from the chain and the indexes and kept as side blocks, the branch is appended instead.
+        Transactions of the removed blocks that are not in the branch are pending again.
+
+        :param fork_height: int, the height of the last block the branch shares with the chain.
+        :param branch: list of BlockSchema, the side blocks after the fork point, from the oldest.
+        """
+        removed = self.chain[fork_height + 1:]
+        self.chain.truncate(fork_height + 1)
+        for block in reversed(removed):
+            for index in self.indexes:
+                if index.height > block["height"]:
+                    index.remove_block(block)
+        for block in removed:
+            self.side_blocks.add(block)
+
+        for block in branch:
+            self.side_blocks.remove(block["hash"])
+            self.chain.append(block)
+            self.update_indexes(block)
+
+        sealed = {tx["signature"] for block in branch for tx in block["transaction"]}
+        for signature in sealed:
+            self.pending_transactions.remove(signature)
+        self.return_pending_transactions([tx for block in removed for tx in block["transaction"]
+                                          if tx["signature"] not in sealed])
+        logger.info("Reorganised the chain", fork_height=fork_height, removed=len(removed), added=len(branch))
+        for listener in self.reorg_listeners:
+            listener(removed, branch)
+
+    def get_chain_tips(self) -> list[dict]:
+        """
+        :return: list of dict {"height": int, "hash": str, "branch_length": int, "status": "active" or "side"}
+        of the tip of the chain and the tips of the side branches.
+        """
+        tips = [{"height": self.last_block["height"], "hash": self.last_block["hash"], "branch_length": 0,
+                 "status": "active"}]
+        for tip_hash in self.side_blocks.tips:
+            tip = self.side_blocks.blocks[tip_hash]
+            tips.append({"height": tip["height"], "hash": tip_hash,
+                         "branch_length": len(self.side_blocks.branch(tip_hash)), "status": "side"})
+        return tips
+
+    def update_indexes(self, block: dict) -> None:
+        """
+        Adds a block that was just appended to the chain to the indexes that are up to date,
+        the other indexes catch up when they are queried.
+
+        :param block: BlockSchema, the last block of the chain.
+        """
+        for index in self.indexes:
+            if index.height == block["height"]:
+                index.add_block(block)
+
+    def rebuild_indexes(self) -> None:
+        """
+        Builds all the indexes again from the blocks in the chain.
+        """
+        for index in self.indexes:
+            index.rebuild(self.chain)
+
+    def _read_transactions(self, locations: list[tuple[int, int]]) -> list[tuple[dict, dict]]:
+        """
+        :param locations: list of tuples (block height, position in the block) grouped by height.
+        :return: list of tuples (block, transaction) of the locations, each block is read once.
+        """
+        block = None
+        transactions = []
+        for height, position in locations:
+            if not block or block["height"] != height:
+                block = self.chain[height]
+            transactions.append((block, block["transaction"][position]))
+        return transactions
+
+    def get_car_history(self, car_id: int | str) -> list[dict]:
+        """
+        Returns the ownership trail of a car, read from the blocks of its transfers only.
+
+        :param car_id: int or str, the id of the car.
+        :return: list of dict {"height": int, "position": int, "timestamp": int,
+        "sender": OwnerSchema, "receiver": OwnerSchema} from the oldest transfer.
+        """
+        self.car_index.catch_up(self.chain)
+        locations = self.car_index.get_locations(car_id)
+        return [{"height": block["height"],
+                 "position": position,
+                 "timestamp": tx["timestamp"],
+                 "sender": tx["sender"],
+                 "receiver": tx["receiver"],
+                 }
+                for (_, position), (block, tx) in zip(locations, self._read_transactions(locations))]
+
+    def get_participant_history(self, address: str, access: str | None = None,
+                                limit: int = ParticipantIndex.PAGE_SIZE, cursor: str | None = None) -> dict:
+        """
+        Returns a page of the transactions a participant sent or received, from the newest.
+        :raise: ValueError if the cursor is not valid or the limit is lower than 1.
+
+        :param address: str, "ip:port" of the participant.
+        :param access: str, only transactions the participant made with this access, all of them if not given.
+        :param limit: int, the maximal number of transactions in the page.
+        :param cursor: str, the "next_cursor" returned with the previous page, the first page if not given.
+        :return: dict {
+            "transactions": list of dict {"height": int, "position": int, "direction": "sent" or "received",
+                                          "transaction": TransactionSchema},
+            "next_cursor": str, the cursor of the next page, None if this is the last page.
+        }
+        """
+        self.participant_index.catch_up(self.chain)
+        locations, next_cursor = self.participant_index.get_page(address, access, limit, cursor)
+        return {"transactions": [{"height": block["height"],
+                                  "position": position,
+                                  "direction": "sent" if tx["sender"]["address"] == address else "received",
+                                  "transaction": tx,
+                                  }
+                                 for (_, position), (block, tx) in zip(locations,
+                                                                       self._read_transactions(locations))],
+                "next_cursor": next_cursor,
+                }
+
+    def get_header(self, height: int) -> dict:
+        """
+        :param height: int, the height of the block.
+        :return: dict, the header of the block at the given height.
+        """
+        return self.header(self.chain[height])
+
+    def get_transaction_proof(self, height: int, signature: str) -> dict | None:
+        """
+        Builds a proof that a transaction is included in a block, it can be checked against the block header alone.
+
+        :param height: int, the height of the block holding the transaction.
+        :param signature: str, the signature of the transaction.
+        :return: dict {"height", "block_hash", "merkle_root", "index", "proof"},
+        None if the block doesn't hold the transaction.
+        """
+        block = self.chain[height]
+        digests = [transaction_digest(tx) for tx in block["transaction"]]
+        for index, tx in enumerate(block["transaction"]):
+            if tx["signature"] == signature:
+                return {"height": height,
+                        "block_hash": block["hash"],
+                        "merkle_root": block["merkle_root"],
+                        "index": index,
+                        "proof": merkle_proof(digests, index),
+                        }
+        return None
+
+    @staticmethod
+    def verify_transaction_proof(transaction: dict, proof: dict, header: dict) -> bool:
+        """
+        Checks that a transaction is included in a block, using only the header of the block.
+
+        :param transaction: TransactionSchema, the transaction.
+        :param proof: dict, the proof made by get_transaction_proof.
+        :param header: dict, the header of the block, see get_header.
+        :return: Boolean, True if the transaction is in the block, False otherwise
+        """
+        # The header must be genuine, and the proof must be made for it
+        if header["hash"] != Blockchain.hash(header) or proof["block_hash"] != header["hash"]:
             return False
-        self.chain.append(verified_block)
-        return True
+        return verify_merkle_proof(transaction_digest(transaction), proof["proof"], header["merkle_root"])
 
-    async def get_blocks_after_timestamp(self, timestamp: float) -> list[dict]:
+    def height_after_timestamp(self, timestamp: float) -> int:
         """
+        Binary searches the timestamp index of the chain.
 
         :param timestamp: float value representing the timestamp
-        :return: a list of all the blocks whose timestamps are bigger than the timestamp received.
-        The list containing dictionary of type BlockSchema
+        :return: int, the height of the first block whose timestamp is bigger than the timestamp received,
+        the length of the chain if there is no such block.
         """
-        for index, block in enumerate(self.chain):
-            if timestamp < block["timestamp"]:
-                return self.chain[index:]
+        return bisect_right(range(len(self.chain)), timestamp, key=self.chain.timestamp_at)
 
-    def new_transaction(self, transaction: dict) -> bool:
+    def iter_blocks(self, start_height: int = 0, end_height: int | None = None) -> Iterator[dict]:
         """
-        Adds a new transaction to the list of pending transactions.
+        Lazily iterates over a range of heights, blocks are read one at a time.
+
+        :param start_height: int, the height of the first block.
+        :param end_height: int, the height to stop before, the end of the chain if not given.
+        :return: iterator of dictionaries of type BlockSchema
+        """
+        end_height = len(self.chain) if end_height is None else min(end_height, len(self.chain))
+        for height in range(max(start_height, 0), end_height):
+            yield self.chain[height]
+
+    def iter_blocks_between(self, start_timestamp: float, end_timestamp: float) -> Iterator[dict]:
+        """
+        Lazily iterates over the blocks created from start_timestamp up to(not including) end_timestamp.
+
+        :param start_timestamp: float, the earliest timestamp of a returned block.
+        :param end_timestamp: float, the timestamp all returned blocks are older than.
+        :return: iterator of dictionaries of type BlockSchema
+        """
+        heights = range(len(self.chain))
+        start_height = bisect_left(heights, start_timestamp, key=self.chain.timestamp_at)
+        end_height = bisect_left(heights, end_timestamp, lo=start_height, key=self.chain.timestamp_at)
+        return self.iter_blocks(start_height, end_height)
+
+    async def get_blocks_after_timestamp(self, timestamp: float) -> Iterator[dict]:
+        """
+
+        :param timestamp: float value representing the timestamp
+        :return: a lazy iterator over all the blocks whose timestamps are bigger than the timestamp received,
+        empty if there are no such blocks. The blocks are dictionaries of type BlockSchema
+        """
+        return self.iter_blocks(self.height_after_timestamp(timestamp))
+
+    def new_transaction(self, transaction: dict, strict: bool = False) -> bool:
+        """
+        Adds a new transaction to the pending transactions.
 
         :param transaction: TransactionSchema, dict with all the transaction details
+        :param strict: Boolean, True for transactions made on this node(i.e. by create_transaction),
+        they are validated in the strict fast mode of the validator and keep their cached encodings.
         :return: Boolean, indicating if the transaction succeeded or not
         """
         # Validate the transaction
         try:
-            tx = TransactionSchema().load(transaction)
+            tx = TRANSACTION_VALIDATOR.load(transaction, strict)
         except (MarshmallowError, json.decoder.JSONDecodeError) as e:
             logger.error(f"Someone was trying to add an invalid transaction to the blockchain: {str(e)}")
             return False
 
-        # Add the transaction to the list of pending transaction
-        self.pending_transactions.append(tx)
+        # Add the transaction to the pending transactions, unless it or another transaction of its car is pending
+        try:
+            self.pending_transactions.add(tx)
+        except MempoolException as e:
+            logger.error(f"Rejected a pending transaction: {str(e)}")
+            return False
         return True
 
     def is_pending_transactions_full(self) -> bool:
@@ -145,4 +606,4 @@ class Blockchain(object):
         Checks if the pending transaction list has reached full capacity
         :return: Boolean, indicating if full or not
         """
-        return len(self.pending_transactions) == self.MAX_TRANSACTIONS
+        return len(self.pending_transactions) >= self.MAX_TRANSACTIONS
@@ -1,3 +1,24 @@
+class FrozenDict(dict):
+    """
+    Class FrozenDict, a dict that can't be changed after it is made.
+    It is still a dict, so it is JSON serializable and can be embedded in transactions as is.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(f"{self.__class__.__name__} can't be changed")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _immutable
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
 class Car:
     """
     Class Car, handles cars.
@@ -60,6 +81,16 @@ class Car:
         self.owner["address"] = address
         self.owner["access"] = access
 
+    def snapshot(self) -> FrozenDict:
+        """
+        :return: FrozenDict(similar to CarSchema), the current fields of the car, safe to embed in a transaction,
+        it doesn't change when the car changes owner.
+        """
+        return FrozenDict(id=self.id,
+                          owner=FrozenDict(address=self.owner["address"], access=self.owner["access"]),
+                          model=self.model,
+                          color=self.color)
+
     def __str__(self):
         return f"Car:\r\n" \
                f"  id: {self.get_id()}\r\n" \
@@ -42,6 +42,15 @@ class CarInventory:
         """
         return self.inventory.get(car_id)
 
+    def get_cars_by_owner(self, address: str, access: str) -> list[Car]:
+        """
+        :param address: Str, "ip:port" of the owner
+        :param access: Str, the access of the owner
+        :return: list of Car, the cars in the inventory owned by the given owner
+        """
+        return [car for car in self.inventory.values()
+                if car.get_owner_address() == address and car.get_owner_access() == access]
+
     def view_cars(self) -> str:
         """
         :raises: NoCarsException - if there are no cars in the inventory
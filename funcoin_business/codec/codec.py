@@ -0,0 +1,323 @@
+import json
+import struct
+
+from funcoin_business.transactions.canonical import CanonicalTransaction
+
+
+class CodecError(Exception):
+    pass
+
+
+class JsonCodec:
+    """
+    Class JsonCodec, encodes blocks, transactions and messages as JSON text.
+    """
+
+    name = "json"
+
+    @staticmethod
+    def _encode(data: dict) -> bytes:
+        return json.dumps(data, separators=(",", ":")).encode()
+
+    @staticmethod
+    def _decode(data: bytes) -> dict:
+        try:
+            return json.loads(data)
+        except (json.decoder.JSONDecodeError, UnicodeDecodeError) as e:
+            raise CodecError(str(e))
+
+    def encode_block(self, block: dict) -> bytes:
+        return self._encode(block)
+
+    def decode_block(self, data: bytes) -> dict:
+        block = self._decode(data)
+        block["transaction"] = [CanonicalTransaction(tx) for tx in block["transaction"]]
+        return block
+
+    def encode_transaction(self, transaction: dict) -> bytes:
+        return self._encode(transaction)
+
+    def decode_transaction(self, data: bytes) -> dict:
+        return CanonicalTransaction(self._decode(data))
+
+    def encode_message(self, message: dict) -> bytes:
+        return self._encode(message)
+
+    def decode_message(self, data: bytes) -> dict:
+        return self._decode(data)
+
+
+class _Writer:
+    """
+    Builds a binary record field by field.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, fmt: str, *values) -> None:
+        # A value out of the range of its field(i.e. a port above 65535, a string longer than its length prefix)
+        try:
+            self.parts.append(struct.pack(fmt, *values))
+        except struct.error as e:
+            raise CodecError(str(e))
+
+    def string(self, value: str, length_format: str = "<B") -> None:
+        data = value.encode()
+        self.pack(length_format, len(data))
+        self.parts.append(data)
+
+    def hex(self, value: str, size: int) -> None:
+        # Raw bytes when the value is hex of the expected size(flag 0), the text otherwise(flag 1)
+        try:
+            raw = bytes.fromhex(value)
+        except ValueError:
+            raw = None
+        if raw is not None and len(raw) == size and raw.hex() == value:
+            self.pack("<B", 0)
+            self.parts.append(raw)
+        else:
+            self.pack("<B", 1)
+            self.string(value, "<H")
+
+    def raw(self, data: bytes) -> None:
+        self.parts.append(data)
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.parts)
+
+
+class _Reader:
+    """
+    Reads the fields of a binary record in the order they were written.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def unpack(self, fmt: str) -> tuple:
+        try:
+            values = struct.unpack_from(fmt, self.data, self.offset)
+        except struct.error as e:
+            raise CodecError(str(e))
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def read(self, size: int) -> bytes:
+        if self.offset + size > len(self.data):
+            raise CodecError("unexpected end of data")
+        data = bytes(self.data[self.offset:self.offset + size])
+        self.offset += size
+        return data
+
+    def string(self, length_format: str = "<B") -> str:
+        (length,) = self.unpack(length_format)
+        try:
+            return self.read(length).decode()
+        except UnicodeDecodeError as e:
+            raise CodecError(str(e))
+
+    def hex(self, size: int) -> str:
+        (flag,) = self.unpack("<B")
+        return self.read(size).hex() if flag == 0 else self.string("<H")
+
+    def rest(self) -> bytes:
+        data = bytes(self.data[self.offset:])
+        self.offset = len(self.data)
+        return data
+
+
+class BinaryCodec:
+    """
+    Class BinaryCodec, a compact binary encoding of blocks, transactions and messages.
+    Numbers are fixed-width little endian, hashes and signatures are raw bytes instead of hexadecimal text,
+    and strings are length-prefixed UTF-8. Every encoding starts with a kind byte and the version of the format.
+
+    block: kind, version, height(u64), timestamp(f64), ip, port(u16), hash, merkle root, previous hash,
+           proof of work flag(u8), [nonce(u64), difficulty(u8)], number of transactions(u32), transactions
+    transaction: timestamp(i64), sender, receiver, car id(i64), car owner, model, color, signature
+    message: kind, version, ip, port(u16), client, message name, payload
+
+    Version 1 blocks have no proof of work fields, they are still decoded.
+    """
+
+    name = "binary"
+    VERSION = 2
+    VERSIONS = (1, 2)
+    BLOCK = 1
+    TRANSACTION = 2
+    MESSAGE = 3
+    HASH_SIZE = 32
+    SIGNATURE_SIZE = 64
+
+    def _write_header(self, writer: _Writer, kind: int) -> None:
+        writer.pack("<BB", kind, self.VERSION)
+
+    def _read_header(self, reader: _Reader, kind: int) -> int:
+        read_kind, version = reader.unpack("<BB")
+        if read_kind != kind:
+            raise CodecError(f"expected kind {kind}, got {read_kind}")
+        if version not in self.VERSIONS:
+            raise CodecError(f"unsupported binary codec version {version}")
+        return version
+
+    @staticmethod
+    def _write_owner(writer: _Writer, owner: dict) -> None:
+        writer.string(owner["address"])
+        writer.string(owner["access"])
+
+    @staticmethod
+    def _read_owner(reader: _Reader) -> dict:
+        return {"address": reader.string(), "access": reader.string()}
+
+    def _write_transaction(self, writer: _Writer, transaction: dict) -> None:
+        car = transaction["item"]
+        writer.pack("<q", transaction["timestamp"])
+        self._write_owner(writer, transaction["sender"])
+        self._write_owner(writer, transaction["receiver"])
+        writer.pack("<q", car["id"])
+        self._write_owner(writer, car["owner"])
+        writer.string(car["model"], "<H")
+        writer.string(car["color"], "<H")
+        writer.hex(transaction["signature"], self.SIGNATURE_SIZE)
+
+    def _read_transaction(self, reader: _Reader) -> CanonicalTransaction:
+        (timestamp,) = reader.unpack("<q")
+        sender = self._read_owner(reader)
+        receiver = self._read_owner(reader)
+        (car_id,) = reader.unpack("<q")
+        car = {"id": car_id, "owner": self._read_owner(reader), "model": reader.string("<H"),
+               "color": reader.string("<H")}
+        return CanonicalTransaction({"timestamp": timestamp,
+                                     "sender": sender,
+                                     "receiver": receiver,
+                                     "item": car,
+                                     "signature": reader.hex(self.SIGNATURE_SIZE),
+                                     })
+
+    def _write_block(self, writer: _Writer, block: dict) -> None:
+        writer.pack("<Qd", block["height"], block["timestamp"])
+        writer.string(block["address"]["ip"])
+        writer.pack("<H", block["address"]["port"])
+        writer.hex(block["hash"], self.HASH_SIZE)
+        writer.hex(block["merkle_root"], self.HASH_SIZE)
+        writer.hex(block["previous_hash"], self.HASH_SIZE)
+        # Blocks made before proof of work have no nonce, their hash doesn't cover one
+        if "nonce" in block:
+            writer.pack("<BQB", 1, block["nonce"], block["difficulty"])
+        else:
+            writer.pack("<B", 0)
+        writer.pack("<I", len(block["transaction"]))
+        for transaction in block["transaction"]:
+            self._write_transaction(writer, transaction)
+
+    def _read_block(self, reader: _Reader, version: int) -> dict:
+        height, timestamp = reader.unpack("<Qd")
+        address = {"ip": reader.string(), "port": reader.unpack("<H")[0]}
+        block_hash = reader.hex(self.HASH_SIZE)
+        merkle_root = reader.hex(self.HASH_SIZE)
+        previous_hash = reader.hex(self.HASH_SIZE)
+        proof_of_work = {}
+        if version >= 2 and reader.unpack("<B")[0]:
+            nonce, difficulty = reader.unpack("<QB")
+            proof_of_work = {"difficulty": difficulty, "nonce": nonce}
+        (count,) = reader.unpack("<I")
+        transactions = [self._read_transaction(reader) for _ in range(count)]
+        return {"height": height,
+                "address": address,
+                "transaction": transactions,
+                "merkle_root": merkle_root,
+                "previous_hash": previous_hash,
+                "hash": block_hash,
+                "timestamp": timestamp,
+                **proof_of_work,
+                }
+
+    def encode_block(self, block: dict) -> bytes:
+        writer = _Writer()
+        self._write_header(writer, self.BLOCK)
+        self._write_block(writer, block)
+        return writer.getvalue()
+
+    def decode_block(self, data: bytes) -> dict:
+        reader = _Reader(data)
+        version = self._read_header(reader, self.BLOCK)
+        return self._read_block(reader, version)
+
+    def encode_transaction(self, transaction: dict) -> bytes:
+        writer = _Writer()
+        self._write_header(writer, self.TRANSACTION)
+        self._write_transaction(writer, transaction)
+        return writer.getvalue()
+
+    def decode_transaction(self, data: bytes) -> dict:
+        reader = _Reader(data)
+        self._read_header(reader, self.TRANSACTION)
+        return self._read_transaction(reader)
+
+    def encode_message(self, message: dict) -> bytes:
+        """
+        :param message: dict, {"meta": MetaSchema, "message": {"name": str, "payload": ...}} see messages.BaseSchema
+        :return: bytes, the encoded message, payloads of unknown message names are kept as JSON.
+        """
+        writer = _Writer()
+        self._write_header(writer, self.MESSAGE)
+        meta, body = message["meta"], message["message"]
+        writer.string(meta["address"]["ip"])
+        writer.pack("<H", meta["address"]["port"])
+        writer.string(meta["client"])
+        writer.string(body["name"])
+        payload = body["payload"]
+        if body["name"] == "block":
+            self._write_block(writer, payload)
+        elif body["name"] == "transaction":
+            self._write_transaction(writer, payload)
+        elif body["name"] == "blocks":
+            writer.pack("<I", len(payload["blocks"]))
+            for block in payload["blocks"]:
+                self._write_block(writer, block)
+        elif body["name"] == "peer":
+            writer.string(payload["address"]["ip"])
+            writer.pack("<Hq", payload["address"]["port"], payload["last_seen"])
+        else:
+            writer.raw(JsonCodec._encode(payload))
+        return writer.getvalue()
+
+    def decode_message(self, data: bytes) -> dict:
+        reader = _Reader(data)
+        version = self._read_header(reader, self.MESSAGE)
+        meta = {"address": {"ip": reader.string(), "port": reader.unpack("<H")[0]}, "client": reader.string()}
+        name = reader.string()
+        if name == "block":
+            payload = self._read_block(reader, version)
+        elif name == "transaction":
+            payload = self._read_transaction(reader)
+        elif name == "blocks":
+            (count,) = reader.unpack("<I")
+            payload = {"blocks": [self._read_block(reader, version) for _ in range(count)]}
+        elif name == "peer":
+            ip = reader.string()
+            port, last_seen = reader.unpack("<Hq")
+            payload = {"address": {"ip": ip, "port": port}, "last_seen": last_seen}
+        else:
+            payload = JsonCodec._decode(reader.rest())
+        return {"meta": meta, "message": {"name": name, "payload": payload}}
+
+
+CODECS = {
+    JsonCodec.name: JsonCodec(),
+    BinaryCodec.name: BinaryCodec(),
+}
+
+
+def get_codec(name: str) -> JsonCodec | BinaryCodec:
+    """
+    :raise: CodecError if there is no codec with the given name.
+    :param name: str, the name of the codec, "json" or "binary".
+    :return: the codec.
+    """
+    codec = CODECS.get(name)
+    if not codec:
+        raise CodecError(f"Unknown codec {name}, the available codecs are: {', '.join(CODECS)}")
+    return codec
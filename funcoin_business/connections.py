@@ -1,7 +1,10 @@
+from collections import Counter
+
 import structlog
 from more_itertools import take
 
-from funcoin_business.users.user import User
+from funcoin_business.outbound.send_queue import SendQueue, DROP
+from funcoin_business.users.user import User, encode_message
 from funcoin_business.users.authorized_user import AuthorizedUser
 
 logger = structlog.getLogger(__name__)
@@ -13,29 +16,50 @@ class ConnectionPool:
     has a dictionary with:
     keys - user addresses (ip:port)
     value - the user, funcoin_business.user.User
+    Every connected user has a send queue of its own(outbound.send_queue.SendQueue),
+    so messages are written to the users concurrently and a slow user doesn't hold back the others.
     """
 
-    def __init__(self):
+    def __init__(self, max_queued_messages: int = SendQueue.MAX_MESSAGES, slow_consumer_policy: str = DROP):
+        """
+        :param max_queued_messages: int, the maximal number of messages waiting to be written to a user.
+        :param slow_consumer_policy: str, what happens when a user's send queue is full, see SendQueue.
+        """
         self.connection_pool = dict()
+        self.max_queued_messages = max_queued_messages
+        self.slow_consumer_policy = slow_consumer_policy
+        # The bytes of broadcast messages that were encoded, and that were queued for the connections
+        # (the bytes written to each connection are counted by its SendQueue)
+        self.byte_counts = Counter(encoded=0, queued=0)
 
     async def broadcast(self, message: str) -> None:
         """
-        sends a message to all the user connected to the server
+        sends a message to all the user connected to the server,
+        returns once the message was queued for every user, without waiting for it to be written.
+        The message is encoded once and the same bytes are handed to every connection.
         :param message:  the message to send
         """
+        data = encode_message(message)
+        self.byte_counts["encoded"] += len(data)
         for user in list(self.connection_pool.values()):
-            await user.receive_message(message)
+            if user.send(data, broadcast=True):
+                self.byte_counts["queued"] += len(data)
 
     def add_peer(self, user: User) -> None:
         """adds a user to the dictionary of the connected users"""
         address = user.get_address()
         self.connection_pool[address] = user
+        user.send_queue = SendQueue(user.get_writer(), self.max_queued_messages, self.slow_consumer_policy)
+        user.send_queue.start()
         logger.info("Added new peer to pool", address=address)
 
     def remove_peer(self, user: User) -> None:
         """Removes a user from the dictionary of the connected users"""
         address = user.get_address()
         self.connection_pool.pop(address)
+        if user.send_queue is not None:
+            user.send_queue.close()
+            user.send_queue = None
         logger.info("Removed peer from pool", address=address)
 
     def get_alive_peers(self, count: int) -> list:
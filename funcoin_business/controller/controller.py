@@ -2,10 +2,10 @@ from funcoin_business.server import Server
 from funcoin_business.commands.commands import Command, CommandErrorException
 from copy import copy
 from funcoin_business.cars.car import Car
-from funcoin_business.messages import create_transaction_message, BaseSchema
+from funcoin_business.messages import create_transaction_message, load_message
 from funcoin_business.schema import TransactionSchema, CarSchema
 from funcoin_business.blockchain import Blockchain
-from funcoin_business.transactions.transactions import validate_transaction
+from funcoin_business.transactions.transactions import create_car_transaction, create_scrap_transaction
 
 
 class Controller:
@@ -88,9 +88,9 @@ class Controller:
         car = self.server.cars.get_car(str(transaction["item"]["id"]))
         if not (sender and receiver and car):
             raise CommandErrorException("Invalid transaction, there was a problem with one or more of the details")
-        # Add the transaction to the blockchain
+        # Add the transaction to the blockchain, it was made by create_transaction on this node
         # Case invalid transaction
-        if not self.server.blockchain.new_transaction(transaction):
+        if not self.server.blockchain.new_transaction(transaction, strict=True):
             raise CommandErrorException("Transaction was failed")
 
         # Delete the car from the sender cars inventory
@@ -103,17 +103,11 @@ class Controller:
         # Create a transaction message and broadcast it to all connected users.
         transaction_message = create_transaction_message(self.server.external_ip, self.server.external_port,
                                                          transaction)
-        message = BaseSchema().loads(transaction_message)
+        message = load_message(transaction_message)
         await self.server.p2p_protocol.handle_message(message["message"])
 
-        # If the number of pending transaction has reached the maximum, create a new block and store it.
-        if self.server.blockchain.is_pending_transactions_full():
-            # Try to add a new block containing all pending transactions to the blockchain
-            if not self.server.blockchain.add_block(self.server.blockchain.new_block()):
-                # If the block is not valid
-                raise CommandErrorException("Fraudulent Block")
-            # Broadcast a message to the server about the new block that was added to the blockchain
-            await self.server.connection_pool.broadcast("A new Block was added to the blockchain")
+        # The block sealer seals the transaction into a block in the background
+        self.server.sealer.notify()
 
     async def handle_transaction(self, transaction: TransactionSchema()) -> None:
         """
@@ -130,8 +124,8 @@ class Controller:
         if not (sender and receiver and car):
             raise CommandErrorException("Invalid transaction, there was a problem with one or more of the details")
 
-        # validate the transaction by sender's signature
-        if not validate_transaction(transaction, sender):
+        # validate the transaction by sender's signature, verified in a batch off the event loop
+        if not await self.server.signatures.verify(transaction, sender.get_address(), sender.get_public_key()):
             await self.server.connection_pool.broadcast("A fraudulent transaction was detected")
             return None
 
@@ -142,14 +136,23 @@ class Controller:
     async def handle_new_car(self, car: dict[CarSchema]) -> None:
         """
         Handles new car command, a creation of a new car.
+        The creation is written on the chain, so the car can be rebuilt from the blocks.
+        :raise: CommandErrorException if the creation can't be added to the blockchain.
 
         :param car: CarSchema, dictionary that represents a car
         (accepted as dict and not as Car object in order to prevent aliasing
         in the server's inventory and the user's inventory)
         """
         car_obj = Car(**car)
+        manufacturer = self.server.connection_pool.get_authorized_user(car_obj.get_owner_address())
+        if not (manufacturer and
+                self.server.blockchain.new_transaction(create_car_transaction(manufacturer, car_obj), strict=True)):
+            if manufacturer:
+                await manufacturer.remove_car(str(car_obj.get_id()))
+            raise CommandErrorException("The car couldn't be created")
         # Add the car to the server's car inventory
         self.server.cars.add_car(car_obj)
+        self.server.sealer.notify()
         # Broadcast a message to all connected users about the new car.
         await self.server.connection_pool.broadcast(f"A new car was created:\r\n{str(car_obj)}")
 
@@ -165,10 +168,22 @@ class Controller:
     async def handle_destroy_car(self, car: Car) -> None:
         """
         Handles destroy car command, a car that was destroyed.
+        The destruction is written on the chain, so the car doesn't come back when the chain is replayed.
+        :raise: CommandErrorException if the destruction can't be added to the blockchain.
+
         :param car: Car(object), the car to destroy
         """
+        scrap_merchant = self.server.connection_pool.get_authorized_user(car.get_owner_address())
+        if not (scrap_merchant and
+                self.server.blockchain.new_transaction(create_scrap_transaction(scrap_merchant, car), strict=True)):
+            # The car stays with the scrap merchant
+            if scrap_merchant:
+                await scrap_merchant.add_car(car)
+            raise CommandErrorException("The car couldn't be destroyed")
         # Remove the car from the server's inventory and broadcast a message about it to all connected users.
         await self.server.cars.remove_car(str(car.get_id()))
+        self.server.scrapped_cars.add(str(car.get_id()))
+        self.server.sealer.notify()
         await self.server.connection_pool.broadcast(f"A car was destroyed:\r\n{str(car)}")
 
     async def handle_success(self, _) -> None:
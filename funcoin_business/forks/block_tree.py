@@ -0,0 +1,166 @@
+from collections import OrderedDict
+
+import structlog
+
+logger = structlog.getLogger(__name__)
+
+# The outcomes of Blockchain.receive_block
+EXTENDED = "extended"
+SIDE = "side"
+REORG = "reorg"
+ORPHAN = "orphan"
+KNOWN = "known"
+INVALID = "invalid"
+
+
+def block_work(block: dict) -> int:
+    """
+    :param block: dict, a block.
+    :return: int, the expected number of hashes it took to make the block, 1 for a block without proof of work.
+    """
+    return 2 ** block.get("difficulty", 0)
+
+
+class BranchView:
+    """
+    Class BranchView, the main chain up to a fork point followed by the blocks of a side branch,
+    read like Blockchain.chain, so the rules of the chain(i.e. the difficulty) can be applied to the branch.
+    Only the blocks below the fork point are read from the main chain, the branch is kept in memory.
+    """
+
+    def __init__(self, chain, fork_height: int, branch: list[dict]):
+        """
+        :param chain: the blocks of the main chain, Blockchain.chain
+        :param fork_height: int, the height of the last block the branch shares with the main chain.
+        :param branch: list of BlockSchema, the blocks of the branch after the fork point, from the oldest.
+        """
+        self.chain = chain
+        self.fork_height = fork_height
+        self.branch = branch
+
+    def __len__(self) -> int:
+        return self.fork_height + 1 + len(self.branch)
+
+    def __getitem__(self, height: int) -> dict:
+        height = height + len(self) if height < 0 else height
+        if height <= self.fork_height:
+            return self.chain[height]
+        return self.branch[height - self.fork_height - 1]
+
+    def timestamp_at(self, height: int) -> float:
+        timestamp = self.chain.timestamp_at(min(height, self.fork_height))
+        for block in self.branch[:max(height - self.fork_height, 0)]:
+            timestamp = max(timestamp, block["timestamp"])
+        return timestamp
+
+
+class BlockTree:
+    """
+    Class BlockTree, keeps the valid blocks that are not on the main chain, keyed by their hash.
+    Every side branch starts at a block of the main chain, the tips are the side blocks nothing was built on yet.
+    Blocks whose parent is unknown are kept apart as orphans until their parent arrives.
+    """
+
+    MAX_ORPHANS = 100
+
+    def __init__(self, max_orphans: int = MAX_ORPHANS):
+        """
+        :param max_orphans: int, the maximal number of orphans kept, the oldest one is dropped to make room.
+        """
+        self.max_orphans = max_orphans
+        # {hash: block} of the side blocks
+        self.blocks = {}
+        # {hash: set of the hashes of its side children}
+        self.children = {}
+        # hashes of the side blocks without side children
+        self.tips = set()
+        # {hash: block} of the orphans in arrival order
+        self.orphans = OrderedDict()
+
+    def __contains__(self, block_hash: str) -> bool:
+        return block_hash in self.blocks or block_hash in self.orphans
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def add(self, block: dict) -> None:
+        """
+        Adds a side block, its parent must be on the main chain or in the tree.
+
+        :param block: BlockSchema, the block.
+        """
+        block_hash, parent_hash = block["hash"], block["previous_hash"]
+        self.blocks[block_hash] = block
+        self.children.setdefault(block_hash, set())
+        self.tips.add(block_hash)
+        if parent_hash in self.blocks:
+            self.children[parent_hash].add(block_hash)
+            self.tips.discard(parent_hash)
+
+    def remove(self, block_hash: str) -> dict | None:
+        """
+        Removes a side block, its side children stay in the tree.
+
+        :param block_hash: str, the hash of the block.
+        :return: BlockSchema, the removed block, None if it wasn't in the tree.
+        """
+        block = self.blocks.pop(block_hash, None)
+        if not block:
+            return None
+        self.children.pop(block_hash)
+        self.tips.discard(block_hash)
+        parent_hash = block["previous_hash"]
+        if parent_hash in self.blocks:
+            self.children[parent_hash].discard(block_hash)
+            if not self.children[parent_hash]:
+                self.tips.add(parent_hash)
+        return block
+
+    def branch(self, block_hash: str) -> list[dict]:
+        """
+        :param block_hash: str, the hash of a side block.
+        :return: list of BlockSchema, the side blocks from the one built on the main chain up to the block.
+        """
+        branch = []
+        block = self.blocks.get(block_hash)
+        while block:
+            branch.append(block)
+            block = self.blocks.get(block["previous_hash"])
+        return branch[::-1]
+
+    def add_orphan(self, block: dict) -> None:
+        """
+        Keeps a block whose parent is unknown, until its parent arrives.
+
+        :param block: BlockSchema, the block.
+        """
+        self.orphans[block["hash"]] = block
+        if len(self.orphans) > self.max_orphans:
+            _, dropped = self.orphans.popitem(last=False)
+            logger.info("Dropped the oldest orphan block", height=dropped["height"])
+
+    def take_orphans(self, parent_hash: str) -> list[dict]:
+        """
+        :param parent_hash: str, the hash of a block that was just connected.
+        :return: list of BlockSchema, the orphans built on the block, removed from the orphans.
+        """
+        children = [block for block in self.orphans.values() if block["previous_hash"] == parent_hash]
+        for block in children:
+            del self.orphans[block["hash"]]
+        return children
+
+    def prune(self, min_height: int) -> None:
+        """
+        Drops the side blocks and orphans below min_height, and the side blocks built on them,
+        they are too deep to ever replace the main chain.
+
+        :param min_height: int, the height of the oldest block worth keeping.
+        """
+        stale = [block_hash for block_hash, block in self.blocks.items() if block["height"] < min_height]
+        while stale:
+            block_hash = stale.pop()
+            if block_hash in self.blocks:
+                stale.extend(self.children[block_hash])
+                self.remove(block_hash)
+        for block_hash in [block_hash for block_hash, block in self.orphans.items() if block["height"] < min_height]:
+            del self.orphans[block_hash]
@@ -0,0 +1,80 @@
+class BlockIndex:
+    """
+    Class BlockIndex, base class of the secondary indexes over the transactions of the chain.
+    Blocks are indexed in height order, the index remembers how many blocks it holds, so it can be kept up to date
+    block by block when blocks are added, or catch up with the chain later (i.e. after the node restarted).
+    Blocks can also be removed from the end of the index, when the chain drops them.
+    Derived classes implement add_transaction, remove_transaction and clear.
+    """
+
+    def __init__(self):
+        # The number of blocks in the index, the height of the next block to index
+        self.height = 0
+
+    def add_transaction(self, height: int, position: int, transaction: dict) -> None:
+        """
+        Indexes one transaction.
+
+        :param height: int, the height of the block holding the transaction.
+        :param position: int, the position of the transaction in the block.
+        :param transaction: TransactionSchema, the transaction.
+        :raise: NotImplementedError
+        """
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """
+        Removes everything from the index.
+        :raise: NotImplementedError
+        """
+        raise NotImplementedError
+
+    def remove_transaction(self, height: int, position: int, transaction: dict) -> None:
+        """
+        Removes the newest indexed transaction.
+
+        :param height: int, the height of the block holding the transaction.
+        :param position: int, the position of the transaction in the block.
+        :param transaction: TransactionSchema, the transaction.
+        :raise: NotImplementedError
+        """
+        raise NotImplementedError
+
+    def add_block(self, block: dict) -> None:
+        """
+        Indexes the transactions of the block, the block must be the next one in the chain.
+
+        :param block: BlockSchema, the block.
+        """
+        for position, transaction in enumerate(block["transaction"]):
+            self.add_transaction(block["height"], position, transaction)
+        self.height = block["height"] + 1
+
+    def remove_block(self, block: dict) -> None:
+        """
+        Removes the transactions of the block, the block must be the last indexed one(i.e. on a reorganisation).
+
+        :param block: BlockSchema, the block.
+        """
+        for position in reversed(range(len(block["transaction"]))):
+            self.remove_transaction(block["height"], position, block["transaction"][position])
+        self.height = block["height"]
+
+    def catch_up(self, chain) -> None:
+        """
+        Indexes the blocks of the chain that were added since the index was last updated.
+
+        :param chain: the blocks of the chain, Blockchain.chain
+        """
+        for height in range(self.height, len(chain)):
+            self.add_block(chain[height])
+
+    def rebuild(self, chain) -> None:
+        """
+        Builds the index again from the whole chain.
+
+        :param chain: the blocks of the chain, Blockchain.chain
+        """
+        self.clear()
+        self.height = 0
+        self.catch_up(chain)
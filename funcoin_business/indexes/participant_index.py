@@ -0,0 +1,87 @@
+from bisect import bisect_left
+
+from funcoin_business.indexes.block_index import BlockIndex
+
+
+class ParticipantIndex(BlockIndex):
+    """
+    Class ParticipantIndex, indexes the transactions of the chain by the addresses of their senders and receivers,
+    with the access of the participant as a secondary key.
+    {address: [(block height, position of the transaction in the block), ...]}
+    {(address, access): [(block height, position of the transaction in the block), ...]}
+    the lists are ordered from the oldest transaction.
+    """
+
+    PAGE_SIZE = 20
+
+    def __init__(self):
+        super().__init__()
+        self.addresses = {}
+        self.roles = {}
+
+    def add_transaction(self, height: int, position: int, transaction: dict) -> None:
+        location = (height, position)
+        participants = {(transaction["sender"]["address"], transaction["sender"]["access"]),
+                        (transaction["receiver"]["address"], transaction["receiver"]["access"])}
+        for address in {address for address, _ in participants}:
+            self.addresses.setdefault(address, []).append(location)
+        for role in participants:
+            self.roles.setdefault(role, []).append(location)
+
+    def clear(self) -> None:
+        self.addresses = {}
+        self.roles = {}
+
+    def remove_transaction(self, height: int, position: int, transaction: dict) -> None:
+        participants = {(transaction["sender"]["address"], transaction["sender"]["access"]),
+                        (transaction["receiver"]["address"], transaction["receiver"]["access"])}
+        for address in {address for address, _ in participants}:
+            self._remove_last(self.addresses, address)
+        for role in participants:
+            self._remove_last(self.roles, role)
+
+    @staticmethod
+    def _remove_last(locations: dict, key) -> None:
+        locations[key].pop()
+        if not locations[key]:
+            del locations[key]
+
+    @staticmethod
+    def encode_cursor(location: tuple[int, int]) -> str:
+        """
+        :param location: tuple (block height, position in the block)
+        :return: str, a cursor pointing at the location.
+        """
+        return f"{location[0]}:{location[1]}"
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[int, int]:
+        """
+        :raise: ValueError if the cursor is not valid.
+        :param cursor: str, a cursor made by encode_cursor.
+        :return: tuple (block height, position in the block) the cursor points at.
+        """
+        height, position = cursor.split(":")
+        return int(height), int(position)
+
+    def get_page(self, address: str, access: str | None = None, limit: int = PAGE_SIZE,
+                 cursor: str | None = None) -> tuple[list[tuple[int, int]], str | None]:
+        """
+        Returns a page of the transactions of a participant, from the newest.
+        :raise: ValueError if the cursor is not valid or the limit is lower than 1.
+
+        :param address: str, "ip:port" of the participant.
+        :param access: str, only transactions the participant made with this access, all of them if not given.
+        :param limit: int, the maximal number of transactions in the page.
+        :param cursor: str, the cursor returned with the previous page, the first page if not given.
+        :return: tuple (list of (block height, position in the block) from the newest,
+        the cursor of the next page or None if this is the last page).
+        """
+        if limit < 1:
+            raise ValueError(f"The page limit must be at least 1, got {limit}")
+        locations = self.roles.get((address, access), []) if access else self.addresses.get(address, [])
+        # The page ends right before the location the cursor points at
+        end = bisect_left(locations, self.decode_cursor(cursor)) if cursor else len(locations)
+        start = max(end - limit, 0)
+        next_cursor = self.encode_cursor(locations[start]) if start > 0 else None
+        return locations[start:end][::-1], next_cursor
@@ -0,0 +1,31 @@
+from funcoin_business.indexes.block_index import BlockIndex
+
+
+class CarProvenanceIndex(BlockIndex):
+    """
+    Class CarProvenanceIndex, indexes the transactions of the chain by the id of the transferred car.
+    {car id: [(block height, position of the transaction in the block), ...]} ordered from the oldest transfer.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.cars = {}
+
+    def add_transaction(self, height: int, position: int, transaction: dict) -> None:
+        self.cars.setdefault(str(transaction["item"]["id"]), []).append((height, position))
+
+    def clear(self) -> None:
+        self.cars = {}
+
+    def remove_transaction(self, height: int, position: int, transaction: dict) -> None:
+        car_id = str(transaction["item"]["id"])
+        self.cars[car_id].pop()
+        if not self.cars[car_id]:
+            del self.cars[car_id]
+
+    def get_locations(self, car_id: int | str) -> list[tuple[int, int]]:
+        """
+        :param car_id: int or str, the id of the car.
+        :return: list of tuples (block height, position in the block) of the transfers of the car, oldest first.
+        """
+        return self.cars.get(str(car_id), [])
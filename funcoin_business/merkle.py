@@ -0,0 +1,79 @@
+from hashlib import sha256
+
+# Prefixes separating leaf hashes from inner node hashes, so an inner node can't be passed off as a leaf
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+EMPTY_ROOT = sha256(b"").hexdigest()
+
+
+def hash_leaf(leaf: str) -> bytes:
+    """
+    :param leaf: str, a transaction digest in hexadecimal.
+    :return: bytes, the hash of the leaf in the tree.
+    """
+    return sha256(LEAF_PREFIX + bytes.fromhex(leaf)).digest()
+
+
+def hash_node(left: bytes, right: bytes) -> bytes:
+    """
+    :return: bytes, the hash of an inner node with the given children.
+    """
+    return sha256(NODE_PREFIX + left + right).digest()
+
+
+def _next_level(level: list[bytes]) -> list[bytes]:
+    # Pairs up the nodes, an odd node at the end is moved up as is
+    parents = [hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        parents.append(level[-1])
+    return parents
+
+
+def merkle_root(leaves: list[str]) -> str:
+    """
+    :param leaves: list of str, the transaction digests in the order of the block.
+    :return: str, the root of the merkle tree in hexadecimal.
+    """
+    if not leaves:
+        return EMPTY_ROOT
+    level = [hash_leaf(leaf) for leaf in leaves]
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0].hex()
+
+
+def merkle_proof(leaves: list[str], index: int) -> list[dict]:
+    """
+    Builds the inclusion proof of one leaf, the siblings on the path from the leaf to the root.
+
+    :param leaves: list of str, the transaction digests in the order of the block.
+    :param index: int, the position of the leaf to prove.
+    :return: list of dict {"hash": str, sibling hash in hexadecimal, "side": "left" or "right" of the path}
+    """
+    proof = []
+    level = [hash_leaf(leaf) for leaf in leaves]
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({"hash": level[sibling].hex(), "side": "left" if sibling < index else "right"})
+        level = _next_level(level)
+        index //= 2
+    return proof
+
+
+def verify_merkle_proof(leaf: str, proof: list[dict], root: str) -> bool:
+    """
+    :param leaf: str, the transaction digest in hexadecimal.
+    :param proof: list of dict, the proof made by merkle_proof.
+    :param root: str, the merkle root from the block header.
+    :return: Boolean, True if the leaf is included in the tree with the given root, False otherwise
+    """
+    try:
+        node = hash_leaf(leaf)
+        for step in proof:
+            sibling = bytes.fromhex(step["hash"])
+            node = hash_node(sibling, node) if step["side"] == "left" else hash_node(node, sibling)
+    except (ValueError, KeyError, TypeError):
+        return False
+    return node.hex() == root
@@ -1,4 +1,5 @@
 from marshmallow import Schema, fields, post_load
+from marshmallow.validate import Range
 from marshmallow_oneofschema import OneOfSchema
 
 from funcoin_business import schema
@@ -57,16 +58,90 @@ class TransactionMessage(Schema):
         return data
 
 
+class GetHeadersMessage(Schema):
+    """
+    class GetHeadersMessage(marshmallow.Schema), asks a node for the headers of its chain.
+    {
+        "payload": {"start": Int, the height of the first header, "count": Int, the maximal number of headers}
+        "name": Str, the name of the message initialized automatically to "get_headers".
+    }
+    """
+
+    payload = fields.Dict(keys=fields.Str(), values=fields.Int(validate=Range(min=0)))
+
+    @post_load
+    def add_name(self, data, **kwargs):
+        data["name"] = "get_headers"
+        return data
+
+
+class HeadersMessage(Schema):
+    """
+    class HeadersMessage(marshmallow.Schema), the answer to GetHeadersMessage.
+    {
+        "payload": {"headers": list of schema.HeaderSchema, from the lowest height}
+        "name": Str, the name of the message initialized automatically to "headers".
+    }
+    """
+
+    payload = fields.Dict(keys=fields.Str(), values=fields.List(fields.Nested(schema.HeaderSchema())))
+
+    @post_load
+    def add_name(self, data, **kwargs):
+        data["name"] = "headers"
+        return data
+
+
+class GetBlocksMessage(Schema):
+    """
+    class GetBlocksMessage(marshmallow.Schema), asks a node for the blocks at some heights.
+    {
+        "payload": {"heights": list of Int}
+        "name": Str, the name of the message initialized automatically to "get_blocks".
+    }
+    """
+
+    payload = fields.Dict(keys=fields.Str(), values=fields.List(fields.Int(validate=Range(min=0))))
+
+    @post_load
+    def add_name(self, data, **kwargs):
+        data["name"] = "get_blocks"
+        return data
+
+
+class BlocksMessage(Schema):
+    """
+    class BlocksMessage(marshmallow.Schema), the answer to GetBlocksMessage.
+    {
+        "payload": {"blocks": list of blocks, the blocks the node has of the asked heights}
+        "name": Str, the name of the message initialized automatically to "blocks".
+    }
+    The blocks are validated by Blockchain.receive_block when they are added, not here, so they are validated once.
+    """
+
+    payload = fields.Dict(keys=fields.Str(), values=fields.List(fields.Dict()))
+
+    @post_load
+    def add_name(self, data, **kwargs):
+        data["name"] = "blocks"
+        return data
+
+
 class MessageDisambiguation(OneOfSchema):
     """
     Schemas handler, uses the name of the message to load the right schema.
     """
 
     type_field = "name"
+    # Instances, so the message schemas are built once and not on every message
     type_schemas = {
-        "peer": PeerMessage,
-        "block": BlockMessage,
-        "transaction": TransactionMessage,
+        "peer": PeerMessage(),
+        "block": BlockMessage(),
+        "transaction": TransactionMessage(),
+        "get_headers": GetHeadersMessage(),
+        "headers": HeadersMessage(),
+        "get_blocks": GetBlocksMessage(),
+        "blocks": BlocksMessage(),
     }
 
     def get_obj_type(self, obj):
@@ -93,7 +168,8 @@ class BaseSchema(Schema):
     {
         "meta": MetaSchema.
         "message": MessageDisambiguation, one of the allowed message schemas:
-                    (PeerMessage, BlockMessage, TransactionMessage).
+                    (PeerMessage, BlockMessage, TransactionMessage,
+                    GetHeadersMessage, HeadersMessage, GetBlocksMessage, BlocksMessage).
     }
     """
 
@@ -101,6 +177,10 @@ class BaseSchema(Schema):
     message = fields.Nested(MessageDisambiguation())
 
 
+# Built once, used to dump and load every message
+BASE_SCHEMA = BaseSchema()
+
+
 def meta(ip, port, version="funcoin-0.1"):
     """
 
@@ -116,56 +196,164 @@ def meta(ip, port, version="funcoin-0.1"):
     }
 
 
-def create_peers_message(external_ip: str, external_port: int, peer: schema.PeerSchema):
+def dump_message(message: dict, codec=None) -> str | bytes:
+    """
+    Serializes a message with BaseSchema.
+
+    :param message: dict, {"meta": MetaSchema, "message": one of the allowed message schemas}
+    :param codec: codec.codec.JsonCodec or BinaryCodec, the encoding of the transport, JSON text if not given.
+    :return: JSON encoded string of the message, or bytes encoded by the codec if a codec was given.
+    """
+    if codec is None:
+        return BASE_SCHEMA.dumps(message)
+    return codec.encode_message(BASE_SCHEMA.dump(message))
+
+
+def load_message(data: str | bytes, codec=None) -> dict:
+    """
+    Deserializes and validates a message made by dump_message.
+
+    :param data: str or bytes, the encoded message.
+    :param codec: the codec the message was encoded with, JSON text if not given.
+    :return: dict, the message loaded by BaseSchema.
+    """
+    if codec is None:
+        return BASE_SCHEMA.loads(data)
+    return BASE_SCHEMA.load(codec.decode_message(data))
+
+
+def create_peers_message(external_ip: str, external_port: int, peer: schema.PeerSchema, codec=None):
     """
     Generates a message containing a Peer, should be used when an authorized user is joining the server.
 
     :param external_ip: the public IP of the peer
     :param external_port: the port the peer is listening on
     :param peer: PeerSchema.
+    :param codec: the encoding of the transport, JSON text if not given.
     :return: JSON encoded string of the transaction message.
     """
-    return BaseSchema().dumps(
+    return dump_message(
         {
             "meta": meta(external_ip, external_port),
             "message": {"name": "peer", "payload": peer},
-        }
+        },
+        codec,
     )
 
 
-def create_block_message(external_ip, external_port, block):
+def create_block_message(external_ip, external_port, block, codec=None):
     """
     Generates a message containing a block.
 
     :param external_ip: the public IP of the peer
     :param external_port: the port the peer is listening on
     :param block: block payload,a dictionary.
+    :param codec: the encoding of the transport, JSON text if not given.
     :return: JSON encoded string of the transaction message.
     """
-    return BaseSchema().dumps(
+    return dump_message(
         {
             "meta": meta(external_ip, external_port),
             "message": {"name": "block", "payload": block},
-        }
+        },
+        codec,
     )
 
 
-def create_transaction_message(external_ip, external_port, tx):
+def create_transaction_message(external_ip, external_port, tx, codec=None):
     """
     Generates a message containing a transaction.
 
     :param external_ip: the public IP of the peer
     :param external_port: the port the peer is listening on
     :param tx: transaction payload, a dictionary.
+    :param codec: the encoding of the transport, JSON text if not given.
     :return: JSON encoded string of the block message.
     """
-    return BaseSchema().dumps(
+    return dump_message(
         {
             "meta": meta(external_ip, external_port),
             "message": {
                 "name": "transaction",
                 "payload": tx,
             },
-        }
+        },
+        codec,
+    )
+
+
+def create_get_headers_message(external_ip, external_port, start, count, codec=None):
+    """
+    Generates a message asking for the headers of a chain.
+
+    :param external_ip: the public IP of the peer
+    :param external_port: the port the peer is listening on
+    :param start: int, the height of the first header.
+    :param count: int, the maximal number of headers.
+    :param codec: the encoding of the transport, JSON text if not given.
+    :return: JSON encoded string of the get_headers message.
+    """
+    return dump_message(
+        {
+            "meta": meta(external_ip, external_port),
+            "message": {"name": "get_headers", "payload": {"start": start, "count": count}},
+        },
+        codec,
     )
 
+
+def create_headers_message(external_ip, external_port, headers, codec=None):
+    """
+    Generates a message containing block headers.
+
+    :param external_ip: the public IP of the peer
+    :param external_port: the port the peer is listening on
+    :param headers: list of schema.HeaderSchema, from the lowest height.
+    :param codec: the encoding of the transport, JSON text if not given.
+    :return: JSON encoded string of the headers message.
+    """
+    return dump_message(
+        {
+            "meta": meta(external_ip, external_port),
+            "message": {"name": "headers", "payload": {"headers": headers}},
+        },
+        codec,
+    )
+
+
+def create_get_blocks_message(external_ip, external_port, heights, codec=None):
+    """
+    Generates a message asking for the blocks at the given heights.
+
+    :param external_ip: the public IP of the peer
+    :param external_port: the port the peer is listening on
+    :param heights: list of int, the heights of the blocks.
+    :param codec: the encoding of the transport, JSON text if not given.
+    :return: JSON encoded string of the get_blocks message.
+    """
+    return dump_message(
+        {
+            "meta": meta(external_ip, external_port),
+            "message": {"name": "get_blocks", "payload": {"heights": heights}},
+        },
+        codec,
+    )
+
+
+def create_blocks_message(external_ip, external_port, blocks, codec=None):
+    """
+    Generates a message containing blocks.
+
+    :param external_ip: the public IP of the peer
+    :param external_port: the port the peer is listening on
+    :param blocks: list of schema.BlockSchema.
+    :param codec: the encoding of the transport, JSON text if not given.
+    :return: JSON encoded string of the blocks message.
+    """
+    return dump_message(
+        {
+            "meta": meta(external_ip, external_port),
+            "message": {"name": "blocks", "payload": {"blocks": blocks}},
+        },
+        codec,
+    )
@@ -0,0 +1,156 @@
+import asyncio
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+
+import structlog
+
+from funcoin_business.transactions.canonical import canonical_bytes
+
+logger = structlog.getLogger(__name__)
+
+NONCE_FIELD = b'"nonce": '
+
+
+class MiningCancelled(Exception):
+    pass
+
+
+def meets_difficulty(block_hash: str, difficulty: int) -> bool:
+    """
+    :param block_hash: str, the hash of a block in hexadecimal.
+    :param difficulty: int, the number of leading zero bits the hash must have.
+    :return: Boolean, True if the hash has enough leading zero bits, False otherwise
+    """
+    return int(block_hash, 16) >> (256 - difficulty) == 0 if difficulty else True
+
+
+def search_nonce(header: dict, start: int, count: int) -> int | None:
+    """
+    Runs in a worker process, looks for a nonce that gives the header a hash meeting its difficulty.
+    The header is encoded once, only the nonce is encoded for every attempt.
+
+    :param header: dict, the header of the block(the block without "transaction" and "hash"), including "difficulty"
+    :param start: int, the first nonce to try.
+    :param count: int, the number of nonces to try.
+    :return: int, the first nonce that meets the difficulty, None if there is no such nonce in the range.
+    """
+    prefix, suffix = canonical_bytes(dict(header, nonce=0)).split(NONCE_FIELD + b"0", 1)
+    target = 1 << (256 - header["difficulty"])
+    prefix_hash = sha256(prefix + NONCE_FIELD)
+    for nonce in range(start, start + count):
+        attempt = prefix_hash.copy()
+        attempt.update(str(nonce).encode() + suffix)
+        if int.from_bytes(attempt.digest(), "big") < target:
+            return nonce
+    return None
+
+
+class DifficultyAdjuster:
+    """
+    Class DifficultyAdjuster, decides the difficulty of the next block, in leading zero bits of its hash.
+    Every block retargets from the average interval of the last window blocks, each bit doubles the expected work,
+    so the difficulty moves by log2(target interval / average interval), at most max_step bits at a time.
+    """
+
+    BLOCK_INTERVAL = 10.0
+    INITIAL_DIFFICULTY = 16
+    WINDOW = 10
+    MAX_STEP = 2
+    MAX_DIFFICULTY = 255
+
+    def __init__(self, block_interval: float = BLOCK_INTERVAL, initial_difficulty: int = INITIAL_DIFFICULTY,
+                 window: int = WINDOW, max_step: int = MAX_STEP):
+        """
+        :param block_interval: float, the wanted number of seconds between blocks.
+        :param initial_difficulty: int, the difficulty until there are enough mined blocks to retarget.
+        :param window: int, the number of blocks the average interval is taken over.
+        :param max_step: int, the maximal change of the difficulty from one block to the next.
+        """
+        self.block_interval = block_interval
+        self.initial_difficulty = initial_difficulty
+        self.window = window
+        self.max_step = max_step
+
+    def next_difficulty(self, chain) -> int:
+        """
+        :param chain: the blocks of the chain, Blockchain.chain
+        :return: int, the difficulty of the block after the last block of the chain.
+        """
+        height = len(chain) - 1
+        last_difficulty = chain[height].get("difficulty", 0) if height >= 0 else 0
+        if not last_difficulty or height < self.window:
+            return last_difficulty or self.initial_difficulty
+
+        average_interval = (chain.timestamp_at(height) - chain.timestamp_at(height - self.window)) / self.window
+        step = round(math.log2(self.block_interval / max(average_interval, 1e-3)))
+        step = max(-self.max_step, min(self.max_step, step))
+        return max(1, min(self.MAX_DIFFICULTY, last_difficulty + step))
+
+
+class Miner:
+    """
+    Class Miner, searches for proof of work nonces on a pool of processes.
+    The nonce space is handed out in chunks, a worker that finishes a chunk gets the next one,
+    the event loop only waits on the results so it stays responsive while mining.
+    """
+
+    CHUNK_SIZE = 20000
+
+    def __init__(self, workers: int | None = None, chunk_size: int = CHUNK_SIZE):
+        """
+        :param workers: int, the number of worker processes, the number of cores if not given.
+        :param chunk_size: int, the number of nonces a worker tries before reporting back.
+        """
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.executor = None
+        self._cancel = asyncio.Event()
+
+    def cancel(self) -> None:
+        """
+        Stops the current search, i.e. when a competing block for the same height arrived.
+        """
+        self._cancel.set()
+
+    async def mine(self, header: dict) -> int:
+        """
+        Searches for a nonce that gives the header a hash meeting its difficulty.
+        :raise: MiningCancelled if cancel was called during the search.
+
+        :param header: dict, the header of the block(the block without "transaction" and "hash"), including "difficulty"
+        :return: int, the nonce.
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._cancel.clear()
+        cancel_waiter = asyncio.ensure_future(self._cancel.wait())
+        next_start = 0
+        searches = set()
+        try:
+            while True:
+                # Keep every worker busy with a chunk
+                while len(searches) < self.workers:
+                    searches.add(asyncio.wrap_future(
+                        self.executor.submit(search_nonce, header, next_start, self.chunk_size)))
+                    next_start += self.chunk_size
+                done, _ = await asyncio.wait(searches | {cancel_waiter}, return_when=asyncio.FIRST_COMPLETED)
+                if cancel_waiter in done:
+                    raise MiningCancelled("Mining was cancelled")
+                searches -= done
+                nonces = [search.result() for search in done if search.result() is not None]
+                if nonces:
+                    return min(nonces)
+        finally:
+            cancel_waiter.cancel()
+            for search in searches:
+                search.cancel()
+
+    def close(self) -> None:
+        """
+        Shuts the worker processes down.
+        """
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,106 @@
+import asyncio
+from collections import Counter, deque
+
+import structlog
+
+logger = structlog.getLogger(__name__)
+
+# What a full send queue does with a new message
+DROP = "drop"
+COALESCE = "coalesce"
+DISCONNECT = "disconnect"
+
+
+class SendQueue:
+    """
+    Class SendQueue, the outgoing messages of one connection, written by a task of their own.
+    The task waits for the transport to drain after every write, so a slow reader holds back only its own queue.
+    When max_messages are waiting the slow consumer policy applies to a new broadcast message:
+    DROP drops it, COALESCE replaces the waiting broadcast messages with a notice of how many were skipped
+    and keeps the new one, DISCONNECT closes the connection.
+    Direct messages to the user(i.e. a prompt the server waits for an answer to) are always queued and never skipped.
+    """
+
+    MAX_MESSAGES = 256
+
+    def __init__(self, writer: asyncio.StreamWriter, max_messages: int = MAX_MESSAGES, policy: str = DROP):
+        """
+        :param writer: asyncio.StreamWriter, the connection.
+        :param max_messages: int, the number of waiting messages from which the slow consumer policy applies.
+        :param policy: str, DROP, COALESCE or DISCONNECT, what happens to messages once the queue is full.
+        """
+        self.writer = writer
+        self.max_messages = max_messages
+        self.policy = policy
+        # (the encoded message, Boolean, True if it was broadcast) in the order they are written
+        self._messages = deque()
+        self._ready = asyncio.Event()
+        self._skipped = 0
+        self._task = None
+        # The numbers of messages written, dropped and skipped, and the number of bytes written
+        self.counts = Counter(sent=0, dropped=0, coalesced=0, bytes=0)
+
+    def start(self) -> None:
+        """
+        Starts the task that writes the messages, must be called from the event loop.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def put(self, data: bytes, broadcast: bool = False) -> bool:
+        """
+        Queues a message to be written, without waiting for it to be written.
+
+        :param data: bytes, the encoded message.
+        :param broadcast: Boolean, True for a message sent to all the users, the slow consumer policy applies to it.
+        :return: Boolean, True if the message was queued, False if it was dropped.
+        """
+        if self.writer.is_closing():
+            return False
+        if broadcast and len(self._messages) >= self.max_messages:
+            if self.policy == DISCONNECT:
+                logger.warning("Disconnecting a slow consumer", queued=len(self._messages))
+                self.writer.close()
+                return False
+            if self.policy == COALESCE:
+                direct = deque(message for message in self._messages if not message[1])
+                self._skipped += len(self._messages) - len(direct)
+                self._messages = direct
+            else:
+                self.counts["dropped"] += 1
+                return False
+        self._messages.append((data, broadcast))
+        self._ready.set()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self._messages:
+                    if self._skipped:
+                        self.writer.write(f"[{self._skipped} messages were skipped]\r\n".encode())
+                        self.counts["coalesced"] += self._skipped
+                        self._skipped = 0
+                    data, _ = self._messages.popleft()
+                    self.writer.write(data)
+                    self.counts["sent"] += 1
+                    self.counts["bytes"] += len(data)
+                    # Back pressure, wait while the transport buffer is above its high water mark
+                    await self.writer.drain()
+        except ConnectionError as e:
+            # The connection was lost, the server cleans it up when the reads fail
+            logger.info("Stopped writing to a closed connection", error=str(e), unsent=len(self._messages))
+
+    def close(self) -> None:
+        """
+        Stops writing, the messages that weren't written yet are dropped.
+        """
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._messages.clear()
@@ -1,4 +1,6 @@
+from funcoin_business.blockchain import Blockchain
 from funcoin_business.connections import ConnectionPool
+from funcoin_business.forks.block_tree import EXTENDED, REORG
 import structlog
 
 logger = structlog.getLogger(__name__)
@@ -13,11 +15,13 @@ class P2PProtocol:
     class P2PProtocol handles communication on the server, responsible for handling messages on the server.
     """
 
-    def __init__(self, connection_pool: ConnectionPool):
+    def __init__(self, connection_pool: ConnectionPool, blockchain: Blockchain):
         """
         :param connection_pool: ConnectionPool, the pool of all connected users
+        :param blockchain: Blockchain, the chain blocks from other nodes are added to.
         """
         self.connection_pool = connection_pool
+        self.blockchain = blockchain
 
     async def handle_message(self, message: dict) -> None:
         """
@@ -39,7 +43,9 @@ class P2PProtocol:
             raise P2PError("Missing handler for message")
 
         msg = await handler(message["payload"])
-        await self.connection_pool.broadcast(msg)
+        # Some messages change nothing the users should hear about
+        if msg:
+            await self.connection_pool.broadcast(msg)
 
     async def handle_peer(self, peer_payload: dict) -> str:
         """
@@ -53,15 +59,23 @@ class P2PProtocol:
               f"\r\nis now authorized"
         return msg
 
-    async def handle_block(self, block_payload: dict) -> None:
+    async def handle_block(self, block_payload: dict) -> str | None:
         """
-        Handles a block message
-        (currently a message about a block created is handled by the controller in handle_transaction)
+        Handles a block message from another node, the block may extend the chain, a side branch,
+        or make the chain switch to a branch with more work.
+        (blocks sealed by this node are handled by the block sealer)
 
         :param block_payload: schema.BlockSchema
-        :return: str, the message to broadcast to all connected users about a new block that was created
+        :return: str, the message to broadcast to all connected users about a change of the chain,
+        None if the chain didn't change.
         """
-        pass
+        outcome = self.blockchain.receive_block(block_payload)
+        if outcome == EXTENDED:
+            return f"A new Block was added to the blockchain [height: {block_payload['height']}]"
+        if outcome == REORG:
+            return f"The blockchain switched to a branch with more work [height: {self.blockchain.last_block['height']}]"
+        logger.info("A block didn't change the chain", outcome=outcome, height=block_payload["height"])
+        return None
 
     async def handle_transaction(self, transaction_payload: dict) -> str:
         """
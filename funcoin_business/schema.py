@@ -1,9 +1,32 @@
 from time import time
 
 import funcoin_business.blockchain
+from funcoin_business.mining.miner import meets_difficulty
+from funcoin_business.transactions.canonical import CanonicalTransaction
 
 from marshmallow import Schema, fields, validates_schema, ValidationError, post_load
 from marshmallow.exceptions import MarshmallowError
+from marshmallow.validate import Range
+
+
+def check_block_hash(block: dict) -> None:
+    """
+    Checks that a block is sealed correctly, used by BlockSchema and by validation.validators.
+    :raise: marshmallow.ValidationError if the hash, the merkle root or the proof of work is wrong.
+
+    :param block: dict, a block with the structure of BlockSchema.
+    """
+    # if the hash of the block doesn't match the hash provided, the hash isn't part of what is hashed.
+    if block["hash"] != funcoin_business.blockchain.Blockchain.hash(block):
+        raise ValidationError("Fraudulent block: hash is wrong")
+
+    # if the transactions don't match the merkle root the hash is based on.
+    if block["merkle_root"] != funcoin_business.blockchain.Blockchain.merkle_root(block["transaction"]):
+        raise ValidationError("Fraudulent block: merkle root is wrong")
+
+    # if the hash doesn't have the proof of work the block claims.
+    if not meets_difficulty(block["hash"], block.get("difficulty", 0)):
+        raise ValidationError("Fraudulent block: not enough proof of work")
 
 
 class AddressSchema(Schema):
@@ -82,6 +105,11 @@ class TransactionSchema(Schema):
     class Meta:
         ordered = True
 
+    @post_load
+    def make_canonical(self, data, **kwargs):
+        # the loaded transaction caches its canonical encodings for signing, verification and block hashing
+        return CanonicalTransaction(data)
+
 
 class BlockSchema(Schema):
     """
@@ -90,18 +118,25 @@ class BlockSchema(Schema):
         "height": Int, block number.
         "address": AddressSchema, the address of the creator.
         "transaction": list of TransactionSchema, the transactions the block holds.
+        "merkle_root": Str, the root of the merkle tree over the transactions.
         "previous_hash": Str, the hash of the previous block .
         "hash": Str, the hash of the block.
         "timestamp": Float, the time the block was created.
+        "difficulty": Int, the number of leading zero bits the hash must have, 0 without proof of work.
+        "nonce": Int, the proof of work.
     }
     """
 
     height = fields.Int(required=True)
     address = fields.Nested(AddressSchema(), required=True)
     transaction = fields.Nested(TransactionSchema(many=True), required=True)
+    merkle_root = fields.Str(required=True)
     previous_hash = fields.Str(required=True)
     hash = fields.Str(required=True)
     timestamp = fields.Float(required=True)
+    # Blocks made before proof of work was added don't have these fields, they are hashed without them
+    difficulty = fields.Int(validate=Range(min=0, max=256))
+    nonce = fields.Int(validate=Range(min=0))
 
     class Meta:
         ordered = True
@@ -113,13 +148,46 @@ class BlockSchema(Schema):
         validates a transaction at the point of deserialization to ensure that any transaction is always valid.
         if the transaction is not valid raising Marshmallow.ValidationError(Exception).
         """
-        block = data.copy()
-        # Remove the hash key and its matching value
-        block.pop("hash")
+        check_block_hash(data)
+
+
+class HeaderSchema(Schema):
+    """
+    class HeaderSchema(marshmallow.Schema), the header of a block, the block without its transactions.
+    {
+        "height": Int, block number.
+        "address": AddressSchema, the address of the creator.
+        "merkle_root": Str, the root of the merkle tree over the transactions.
+        "previous_hash": Str, the hash of the previous block .
+        "hash": Str, the hash of the block.
+        "timestamp": Float, the time the block was created.
+        "difficulty": Int, the number of leading zero bits the hash must have, 0 without proof of work.
+        "nonce": Int, the proof of work.
+    }
+    """
+
+    height = fields.Int(required=True)
+    address = fields.Nested(AddressSchema(), required=True)
+    merkle_root = fields.Str(required=True)
+    previous_hash = fields.Str(required=True)
+    hash = fields.Str(required=True)
+    timestamp = fields.Float(required=True)
+    difficulty = fields.Int(validate=Range(min=0, max=256))
+    nonce = fields.Int(validate=Range(min=0))
+
+    class Meta:
+        ordered = True
 
-        # if the hash of the block doesn't match the hash provided.
-        if data["hash"] != funcoin_business.blockchain.Blockchain.hash(block):
-            raise ValidationError("Fraudulent block: hash is wrong")
+    @validates_schema
+    def validate_hash(self, data, **kwargs):
+        """
+        validates the header at the point of deserialization, the hash must match the header and meet its difficulty.
+        the transactions can't be checked without the block.
+        """
+        if data["hash"] != funcoin_business.blockchain.Blockchain.hash(data):
+            raise ValidationError("Fraudulent header: hash is wrong")
+        if not meets_difficulty(data["hash"], data.get("difficulty", 0)):
+            raise ValidationError("Fraudulent header: not enough proof of work")
 
 
 class PeerSchema(Schema):
@@ -0,0 +1,140 @@
+import asyncio
+from functools import partial
+
+import structlog
+
+from funcoin_business.blockchain import Blockchain
+from funcoin_business.connections import ConnectionPool
+from funcoin_business.mining.miner import Miner, MiningCancelled
+
+logger = structlog.getLogger(__name__)
+
+
+class BlockSealer:
+    """
+    Class BlockSealer, seals the pending transactions into blocks in the background.
+    A block is sealed once max_transactions are pending or max_latency seconds passed since the oldest of them
+    arrived, whichever comes first. Hashing runs in a thread so the event loop keeps serving the users.
+    When the chain requires proof of work the block is mined on the worker processes of the miner,
+    mining is cancelled if a block from another node extends the chain first.
+    """
+
+    MAX_LATENCY = 30.0
+
+    def __init__(self, blockchain: Blockchain, connection_pool: ConnectionPool,
+                 max_transactions: int = Blockchain.MAX_TRANSACTIONS, max_latency: float = MAX_LATENCY,
+                 miner: Miner | None = None):
+        """
+        :param blockchain: Blockchain, the chain the blocks are added to.
+        :param connection_pool: ConnectionPool, the users that are told about new blocks.
+        :param max_transactions: int, the number of pending transactions that seals a block right away.
+        :param max_latency: float, the maximal number of seconds a transaction waits to be sealed.
+        :param miner: Miner, mines the blocks when the chain requires proof of work.
+        """
+        self.blockchain = blockchain
+        self.connection_pool = connection_pool
+        self.max_transactions = max_transactions
+        self.max_latency = max_latency
+        self.miner = miner
+        self._new_transaction = asyncio.Event()
+        blockchain.block_listeners.append(self._on_block_added)
+        blockchain.reorg_listeners.append(self._on_reorg)
+
+    def _on_block_added(self, block: dict, trusted: bool) -> None:
+        """
+        A block from another node took the height that is being mined, the mined block can't extend the chain.
+        """
+        if not trusted and self.miner:
+            self.miner.cancel()
+
+    def _on_reorg(self, removed: list[dict], added: list[dict]) -> None:
+        """
+        The chain switched to another branch, the mined block can't extend the chain.
+        """
+        if self.miner:
+            self.miner.cancel()
+
+    def notify(self) -> None:
+        """
+        Tells the sealer a transaction was added to the pending transactions.
+        """
+        self._new_transaction.set()
+
+    async def _wait_for_transaction(self, timeout: float | None = None) -> bool:
+        """
+        :param timeout: float, the maximal number of seconds to wait, wait forever if not given.
+        :return: Boolean, True if a transaction was added, False if the time ran out.
+        """
+        self._new_transaction.clear()
+        try:
+            await asyncio.wait_for(self._new_transaction.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def run(self) -> None:
+        """
+        Seals blocks for as long as the server runs.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            while not self.blockchain.pending_transactions:
+                await self._wait_for_transaction()
+
+            # The deadline starts with the oldest pending transaction
+            deadline = loop.time() + self.max_latency
+            while len(self.blockchain.pending_transactions) < self.max_transactions:
+                remaining = deadline - loop.time()
+                if remaining <= 0 or not await self._wait_for_transaction(remaining):
+                    break
+
+            await self.seal()
+
+    async def seal(self) -> dict | None:
+        """
+        Seals up to max_transactions of the oldest pending transactions into a block and adds it to the chain.
+
+        :return: dict, the block if it was added, None otherwise.
+        """
+        loop = asyncio.get_running_loop()
+        fields = self.blockchain.next_block_fields(self.max_transactions)
+        block = await loop.run_in_executor(None, partial(Blockchain.create_block, **fields))
+        if fields["difficulty"]:
+            block = await self.mine(block)
+            if block is None:
+                return None
+
+        # Try to add the block to the blockchain
+        if not self.blockchain.add_block(block, trusted=True):
+            logger.error("Failed to add a sealed block", height=block["height"])
+            self.blockchain.return_pending_transactions(block["transaction"])
+            # The transactions wait for the next block, which is sealed once another transaction arrives
+            # or max_latency seconds passed, instead of right away
+            await self._wait_for_transaction(self.max_latency)
+            return None
+        logger.info("Sealed block", height=block["height"], transactions=len(block["transaction"]))
+        # Broadcast a message to the server about the new block that was added to the blockchain
+        await self.connection_pool.broadcast("A new Block was added to the blockchain")
+        return block
+
+    async def mine(self, block: dict) -> dict | None:
+        """
+        Finds the proof of work of the block.
+        :raise: RuntimeError if the chain requires proof of work and the sealer has no miner.
+
+        :param block: dict, the block, with its difficulty.
+        :return: dict, the block with its nonce and hash, None if mining was cancelled.
+        """
+        if self.miner is None:
+            raise RuntimeError("The chain requires proof of work but the sealer has no miner")
+        header = {key: value for key, value in Blockchain.header(block).items() if key != "hash"}
+        try:
+            block["nonce"] = await self.miner.mine(header)
+        except MiningCancelled:
+            logger.info("Mining was cancelled", height=block["height"])
+            # The transactions weren't sealed, they wait for the next block
+            self.blockchain.return_pending_transactions(block["transaction"])
+            return None
+        block["hash"] = Blockchain.hash(block)
+        logger.info("Mined block", height=block["height"], difficulty=block["difficulty"], nonce=block["nonce"])
+        return block
@@ -1,21 +1,29 @@
 import json
+from copy import copy, deepcopy
 from textwrap import dedent
 
 from marshmallow.exceptions import MarshmallowError
 
+from funcoin_business.admission.admission import AdmissionControl, AdmissionTimeout
 from funcoin_business.connections import ConnectionPool
 from funcoin_business.blockchain import Blockchain
+from funcoin_business.mining.miner import Miner
+from funcoin_business.sealer.sealer import BlockSealer
 import asyncio
 import structlog
 from funcoin_business.utils import get_fake_ip_and_port, get_external_ip
-from funcoin_business.schema import AddressSchema
+from funcoin_business.validation.validators import ADDRESS_VALIDATOR, CAR_SCHEMA
+from funcoin_business.storage.snapshots import SnapshotStore
+from funcoin_business.transactions.transactions import is_car_creation, is_scrap
+from funcoin_business.verification.signatures import SignatureVerifier
 from funcoin_business.users.user import User
 from funcoin_business.users.authorized_user import AuthorizedUser
 from funcoin_business.messages import create_peers_message
 from funcoin_business.factories.user_factory import UserFactory
+from funcoin_business.cars.car import Car
 from funcoin_business.cars.car_inventory import CarInventory, NoCarsException
 from funcoin_business.schema import PeerSchema
-from funcoin_business.messages import BaseSchema
+from funcoin_business.messages import load_message
 from funcoin_business.commands.commands import CommandErrorException
 from funcoin_business.users.authorized_user import AuthorizedUser
 
@@ -27,17 +35,44 @@ class Server:
     Class Server, runs asyncio.start_server, the server contains a lisr of authorized users and a blockchain.
     """
 
+    # Seconds between checks that a user who is being voted on is still connected
+    DISCONNECT_CHECK_INTERVAL = 1.0
+
     def __init__(self, blockchain: Blockchain, connection_pool: ConnectionPool,
-                 p2p_protocol, controller):
+                 p2p_protocol, controller, max_block_transactions: int = Blockchain.MAX_TRANSACTIONS,
+                 block_deadline: float = BlockSealer.MAX_LATENCY, snapshots: SnapshotStore | None = None,
+                 miner: Miner | None = None, signatures: SignatureVerifier | None = None,
+                 admission: AdmissionControl | None = None):
+        """
+        :param max_block_transactions: int, the number of pending transactions that seals a block right away.
+        :param block_deadline: float, the maximal number of seconds a transaction waits to be sealed into a block.
+        :param snapshots: SnapshotStore, where snapshots of the cars are saved, no snapshots are taken if not given.
+        :param miner: Miner, mines the blocks when the chain requires proof of work.
+        :param signatures: SignatureVerifier, verifies the signatures of transactions, one with a thread per core
+        if not given.
+        :param admission: AdmissionControl, lets joining users through authorization, with the default limits
+        if not given.
+        """
         self.blockchain = blockchain
         self.connection_pool = connection_pool
-        self.p2p_protocol = p2p_protocol(self.connection_pool)
+        self.p2p_protocol = p2p_protocol(self.connection_pool, blockchain)
         self.controller = controller(self)
-        self.is_waiting_for_authorization = False
-        self.voter = None
+        self.sealer = BlockSealer(blockchain, connection_pool, max_block_transactions, block_deadline,
+                                  miner=miner)
+        # The task of the sealer, runs while the server listens
+        self.sealer_task = None
+        self.snapshots = snapshots
+        # The task writing the latest snapshot
+        self.snapshot_task = None
+        self.signatures = signatures or SignatureVerifier()
+        self.admission = admission or AdmissionControl()
         self.external_ip = None
         self.external_port = None
         self.cars = CarInventory()
+        # The ids of the cars that were destroyed
+        self.scrapped_cars = set()
+        blockchain.block_listeners.append(self.handle_added_block)
+        blockchain.reorg_listeners.append(self.handle_reorg)
 
     @staticmethod
     async def close_connection(writer: asyncio.StreamWriter) -> None:
@@ -82,9 +117,6 @@ class Server:
         :return: None
         """
         await self.close_connection(writer)
-
-        # Indicating there isn't a user who is waiting for authorization.
-        self.is_waiting_for_authorization = False
         return None
 
     async def close_connection_authorized_user(self, user: User) -> None:
@@ -98,21 +130,13 @@ class Server:
 
         # Remove the user from the connections pool
         self.connection_pool.remove_peer(user)
+        # A user that connects again from the address has new keys
+        self.signatures.keys.invalidate(user.get_address())
 
-        # Notify the voter a user has left, so if the server is during a vote the vote will be able to end.
-        await self.voter.notify_user_quit()
+        # Notify the open votes a user has left, so they will be able to end without the user's vote.
+        await self.admission.notify_user_quit(user.get_address())
         return None
 
-    async def wait(self, writer: asyncio.StreamWriter) -> None:
-        """
-        Makes a user wait until the authorization process of another user is finished.
-        :param writer: asyncio.StreamWriter, the writer of the user.
-        """
-        writer.write("Please wait, another user in the process of connecting\r\n".encode())
-        # wait until the process is finished
-        while self.is_waiting_for_authorization:
-            await asyncio.sleep(5)
-
     def get_external_ip(self) -> str:
         """
 
@@ -127,10 +151,187 @@ class Server:
         """
         return self.external_port
 
+    def capture_state(self) -> dict:
+        """
+        :return: dict, a snapshot of the cars as of the last block in the chain, stamped with its height and hash.
+        """
+        # The approved transactions that weren't sealed yet already changed the cars, undo them on a copy
+        cars = CarInventory()
+        for car in self.cars.inventory.values():
+            cars.add_car(Car(**CAR_SCHEMA.dump(car)))
+        scrapped_cars = set(self.scrapped_cars)
+        for tx in reversed(list(self.blockchain.pending_transactions)):
+            self.revert_transaction(tx, cars, scrapped_cars)
+
+        last_block = self.blockchain.last_block
+        return {"height": last_block["height"],
+                "hash": last_block["hash"],
+                "cars": [CAR_SCHEMA.dump(car) for car in cars.inventory.values()],
+                "scrapped": sorted(scrapped_cars),
+                }
+
+    @staticmethod
+    def apply_transaction(tx: dict, cars: CarInventory, scrapped_cars: set[str]) -> None:
+        """
+        Transfers the car of a transaction to its receiver, creates it if it's new and removes it if it's scrapped.
+
+        :param tx: TransactionSchema, the transaction.
+        :param cars: CarInventory, the cars.
+        :param scrapped_cars: set of str, the ids of the cars that were destroyed.
+        """
+        car_id = str(tx["item"]["id"])
+        if car_id in scrapped_cars:
+            return
+        if is_scrap(tx):
+            cars.inventory.pop(car_id, None)
+            scrapped_cars.add(car_id)
+            return
+        car = cars.get_car(car_id)
+        if not car:
+            car = Car(**{**tx["item"], "owner": dict(tx["item"]["owner"])})
+            cars.add_car(car)
+        car.set_owner(tx["receiver"]["address"], tx["receiver"]["access"])
+
+    @staticmethod
+    def revert_transaction(tx: dict, cars: CarInventory, scrapped_cars: set[str]) -> None:
+        """
+        Transfers the car of a transaction back to its sender, the opposite of apply_transaction.
+
+        :param tx: TransactionSchema, the transaction.
+        :param cars: CarInventory, the cars.
+        :param scrapped_cars: set of str, the ids of the cars that were destroyed.
+        """
+        car_id = str(tx["item"]["id"])
+        if is_scrap(tx):
+            if car_id in scrapped_cars:
+                scrapped_cars.discard(car_id)
+                cars.add_car(Car(**{**tx["item"], "owner": dict(tx["sender"])}))
+            return
+        car = cars.get_car(car_id)
+        if car and (car.get_owner_address(), car.get_owner_access()) == \
+                (tx["receiver"]["address"], tx["receiver"]["access"]):
+            if is_car_creation(tx):
+                cars.inventory.pop(car_id)
+            else:
+                car.set_owner(tx["sender"]["address"], tx["sender"]["access"])
+
+    def apply_block(self, block: dict) -> None:
+        """
+        Applies the transactions in the block to the cars, see apply_transaction.
+        Applying a block again leaves the cars the same, so replaying blocks a snapshot already reflects is harmless.
+
+        :param block: BlockSchema, the block.
+        """
+        for tx in block["transaction"]:
+            self.apply_transaction(tx, self.cars, self.scrapped_cars)
+
+    def revert_block(self, block: dict) -> None:
+        """
+        Reverts the transactions in the block, the opposite of apply_block.
+
+        :param block: BlockSchema, the block.
+        """
+        for tx in reversed(block["transaction"]):
+            self.revert_transaction(tx, self.cars, self.scrapped_cars)
+
+    def handle_added_block(self, block: dict, trusted: bool) -> None:
+        """
+        Applies the blocks of other nodes to the cars and to the inventories of the connected users,
+        the cars of the blocks this node sealed were transferred when their transactions were approved.
+
+        :param block: BlockSchema, the block that was added to the chain.
+        :param trusted: Boolean, True if this node sealed the block.
+        """
+        if not trusted:
+            self.apply_block(block)
+            self.update_user_cars(block["transaction"])
+        self.take_snapshot()
+
+    def handle_reorg(self, removed: list[dict], added: list[dict]) -> None:
+        """
+        Rolls the cars back over the blocks that left the chain and forward over the blocks of the new branch,
+        then updates the inventories of the connected users who took part in them.
+
+        :param removed: list of BlockSchema, the blocks that left the chain, from the oldest.
+        :param added: list of BlockSchema, the blocks that joined the chain, from the oldest.
+        """
+        for block in reversed(removed):
+            self.revert_block(block)
+        for block in added:
+            self.apply_block(block)
+        # The transactions that are pending again still hold, like any approved transaction
+        pending = self.blockchain.pending_transactions
+        self.apply_block({"transaction": [tx for block in removed for tx in block["transaction"]
+                                          if tx["signature"] in pending]})
+        self.update_user_cars([tx for block in removed + added for tx in block["transaction"]])
+        self.take_snapshot()
+
+    def update_user_cars(self, transactions: list[dict]) -> None:
+        """
+        Brings the car inventories of the connected senders and receivers of the transactions in line with the cars
+        of the server, after the transactions were applied or reverted.
+
+        :param transactions: list of TransactionSchema, the transactions.
+        """
+        for tx in transactions:
+            car_id = str(tx["item"]["id"])
+            car = self.cars.get_car(car_id)
+            for participant in (tx["sender"], tx["receiver"]):
+                user = self.connection_pool.get_authorized_user(participant["address"])
+                if not isinstance(user, AuthorizedUser):
+                    continue
+                if car and (car.get_owner_address(), car.get_owner_access()) == \
+                        (user.get_address(), user.get_access()):
+                    user.cars.add_car(deepcopy(car))
+                else:
+                    user.cars.inventory.pop(car_id, None)
+
+    def restore_state(self) -> None:
+        """
+        Loads the latest snapshot of the cars and replays only the blocks added after it,
+        replays the whole chain if there is no usable snapshot.
+        """
+        snapshot = self.snapshots.load_latest() if self.snapshots else None
+        start = 0
+        if snapshot and snapshot["height"] < len(self.blockchain.chain) and \
+                self.blockchain.chain[snapshot["height"]]["hash"] == snapshot["hash"]:
+            for car in snapshot["cars"]:
+                self.cars.add_car(Car(**car))
+            self.scrapped_cars = set(snapshot["scrapped"])
+            start = snapshot["height"] + 1
+        elif snapshot:
+            logger.warning("The latest snapshot is not on the chain, replaying the chain", height=snapshot["height"])
+
+        for block in self.blockchain.iter_blocks(start):
+            self.apply_block(block)
+        logger.info("Restored state", snapshot_height=start - 1, height=len(self.blockchain.chain))
+
+    def take_snapshot(self) -> None:
+        """
+        Takes a snapshot of the cars once enough blocks joined the chain since the last one, whether this node
+        sealed them or they came from other nodes. The state is captured right away and the file is written in
+        a thread, a snapshot that is due while the previous one is still being written is taken with a later block.
+        """
+        if not self.snapshots or not self.snapshots.is_due(self.blockchain.last_block["height"]):
+            return
+        if self.snapshot_task and not self.snapshot_task.done():
+            return
+        self.snapshot_task = asyncio.create_task(self.save_snapshot(self.capture_state()))
+
+    async def save_snapshot(self, state: dict) -> None:
+        """
+        Writes a snapshot in a thread.
+
+        :param state: dict, the snapshot, see capture_state.
+        """
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.snapshots.save, state)
+        except OSError as e:
+            logger.error("Failed to save a snapshot", height=state["height"], error=str(e))
+
     async def __load_user_address(self, writer: asyncio.StreamWriter, reader: asyncio.StreamReader):
         """
-        Gets as keyboard input the ip and port of the user and tries to load it, if exception was raised.
-        closes the connection of the user.
+        Gets as keyboard input the ip and port of the user and tries to load it.
         :param writer: asyncio.StreamWriter.
         :param reader: asyncio.StreamReader.
         :return: schema.AddressSchema(dict), the address of the user, if the address isn't valid returns None.
@@ -141,11 +342,11 @@ class Server:
         final_address = None
         try:
             # Configure the address
-            final_address = AddressSchema().load(address)
+            final_address = ADDRESS_VALIDATOR.load(address)
         except (MarshmallowError, json.decoder.JSONDecodeError) as e:
             logger.info("Received unauthorized IP and port", peer=writer)
-            # Close the connection and clean up
-            return await self.close_connection_unauthorized_user(writer)
+            # The connection is closed by handle_connection
+            return None
         else:
             return final_address
 
@@ -160,25 +361,30 @@ class Server:
         if size == 0:
             return True
 
-        # Indicate all the users that a new user is requesting to join.
-        await self.connection_pool.broadcast(
-            f"New user [ip:{user_to_validate.get_ip()}, port: {user_to_validate.get_port()}] is "
-            f"requesting for authorization as {access}\r\n"
-            f"respond with {self.voter.authorization_word} for permission when asked to make your vote"
-        )
-
-        # Wait until the vote ends.
-        while not self.voter.is_vote_ended():
-            await asyncio.sleep(5)
-            # New user as disconnected during the vote
+        # The users connected now vote, other users may be in a vote of their own at the same time
+        address = user_to_validate.get_address()
+        voter = self.admission.start_vote(address, list(self.connection_pool.connection_pool))
+        try:
+            # Indicate all the users that a new user is requesting to join.
+            await self.connection_pool.broadcast(
+                f"New user [ip:{user_to_validate.get_ip()}, port: {user_to_validate.get_port()}] is "
+                f"requesting for authorization as {access}\r\n"
+                f"respond with {voter.authorization_word} for permission when asked to make your vote"
+            )
+
+            # Wait until the vote ends, it ends as soon as it is decided or at its deadline.
+            while not await voter.wait(self.DISCONNECT_CHECK_INTERVAL):
+                # New user as disconnected during the vote
+                if user_to_validate.get_reader().at_eof():
+                    await self.connection_pool.broadcast(f"The user has quit during the vote")
+                    return False
+
+            # User as disconnected during the vote
             if user_to_validate.get_reader().at_eof():
-                await self.connection_pool.broadcast(f"The user has quit during the vote")
                 return False
-
-        # User as disconnected during the vote
-        if user_to_validate.get_reader().at_eof():
-            return False
-        return self.voter.conclude_vote()
+            return voter.conclude_vote()
+        finally:
+            self.admission.end_vote(address, voter)
 
     async def handle_authorization_response(self, user: User, access: str) -> bool:
         """
@@ -234,12 +440,12 @@ class Server:
         :param user: User(object), The user that sent the message.
         """
 
-        # If the server is on a vote and the user hasn't voted yet
-        if self.is_waiting_for_authorization and not self.voter.has_user_vote(user):
-            await user.receive_message("Unauthorized user requesting access please make your vote")
+        # The open votes the user hasn't voted in yet
+        for address, voter in self.admission.open_votes(user):
+            await user.receive_message(f"Unauthorized user [{address}] requesting access please make your vote")
             message = await user.respond()
             await user.receive_message("decision received")
-            await self.voter.add_vote(message, user.get_address())
+            await voter.add_vote(message, user.get_address())
             # TODO: finish the transaction update
         if isinstance(user, AuthorizedUser):
             if user.has_pending_transactions():
@@ -268,49 +474,70 @@ class Server:
             except NoCarsException as e:
                 await user.receive_message(str(e))
 
-    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    async def authorize(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> User | None:
         """
+        The authorization process of a new user, gets the address and the access of the user and conducts a vote.
 
         :param reader: asyncio.StreamReader
         :param writer: asyncio.StreamWriter, represents the connecting peer
-        """
-
-        # If the server is already in authorization process
-        if self.is_waiting_for_authorization:
-            # wait until authorization process ends
-            await self.wait(writer)
-
-        # Start of authorization process
-        self.is_waiting_for_authorization = True
-        authorization_word = 'p'
-        self.voter = Voter(self.connection_pool.get_size(), authorization_word)
-
+        :return: User, the user with the access the user was authorized with, None if the user is not authorized.
+        """
+        # Get user's address: {ip,port}
+        address = await self.__load_user_address(writer, reader)
+        if address is None:
+            return None
+        user = User(writer, reader, 100, False, address)
+        # Another user with the same address is already connected or in authorization,
+        # the address stays reserved until this authorization ends, so a concurrent join from it is refused
+        if user.get_address() in self.connection_pool.connection_pool or \
+                not self.admission.reserve(user.get_address()):
+            await user.receive_message("The address is already in use")
+            return None
         try:
-            # Get user's address: {ip,port}
-            address = await self.__load_user_address(writer, reader)
-
-            user = User(writer, reader, 100, False, address)
-
             # Get user's access
             access = await self.get_user_access(user)
 
             # Wait for authorization process to finish
-            if await self.handle_authorization_response(user, access):
-                # User is authorized
-                user = await UserFactory().get_user(access, writer, reader, 100, False, address)
-                peer_message = create_peers_message(self.get_external_ip(), self.get_external_port(),
-                                                    PeerSchema().load({"address": address}))
-                peer_message = BaseSchema().loads(peer_message)
-                await self.p2p_protocol.handle_message(peer_message["message"])
-                self.connection_pool.add_peer(user)
-            # User is not authorized
-            else:
-                return await self.close_connection_unauthorized_user(writer)
+            if not await self.handle_authorization_response(user, access):
+                # User is not authorized
+                return None
+
+            # User is authorized
+            user = await UserFactory().get_user(access, writer, reader, 100, False, address)
+            # Give back the cars the user owned before reconnecting
+            if isinstance(user, AuthorizedUser):
+                for car in self.cars.get_cars_by_owner(user.get_address(), user.get_access()):
+                    await user.add_car(copy(car))
+            peer_message = create_peers_message(self.get_external_ip(), self.get_external_port(),
+                                                PeerSchema().load({"address": address}))
+            peer_message = load_message(peer_message)
+            await self.p2p_protocol.handle_message(peer_message["message"])
+            self.connection_pool.add_peer(user)
+            return user
+        finally:
+            self.admission.release(user.get_address())
 
-            # End of authorization process
-            self.is_waiting_for_authorization = False
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+
+        :param reader: asyncio.StreamReader
+        :param writer: asyncio.StreamWriter, represents the connecting peer
+        """
+
+        # Wait in line while other users are in authorization
+        if self.admission.is_full():
+            writer.write("Please wait, other users are in the process of connecting\r\n".encode())
+        try:
+            async with self.admission.place():
+                user = await self.admission.authorize(self.authorize(reader, writer))
+        except AdmissionTimeout as e:
+            logger.info("Authorization timed out", error=str(e))
+            writer.write(f"{e}, please try again later\r\n".encode())
+            return await self.close_connection_unauthorized_user(writer)
         except (asyncio.exceptions.IncompleteReadError, ConnectionError):
             return await self.close_connection_unauthorized_user(writer)
+        if user is None:
+            return await self.close_connection_unauthorized_user(writer)
 
         # User is authorized
         try:
@@ -334,83 +561,29 @@ class Server:
         """
         This is the listen method which spawns our server
         """
-        server = await asyncio.start_server(self.handle_connection, hostname, port)
-        logger.info(f"Server listening on {hostname}:{port}")
+        # Rebuild the cars from the latest snapshot and the blocks after it, before any user connects
+        self.restore_state()
 
         self.external_ip = await get_external_ip()
         self.external_port = 8888
 
-        async with server:
-            await server.serve_forever()
-
-
-class Voter:
-    """
-    Class Voter, handles votes on the server.
-    Only authorized users can vote.
-    """
-
-    def __init__(self, size: int, authorization_word: str):
-        self.votes = {}
-        self.end_of_vote = size
-        self.vote_ended = False
-        self.authorization_word = authorization_word
-
-    def is_vote_ended(self) -> bool:
-        """
-        Should be in track of this method returned bool, it indicates if the vote was ended or not
-        can be used with while loop
-        while not is_vote_ended:
-            sleep
-        :return: True if vote ended, False otherwise.
-        """
-        return self.vote_ended
-
-    def has_user_vote(self, user: User) -> bool:
-        """
-        checks if a user has already voted.
-        :param user: The user.
-        :return: True if the user has already voted, False otherwise.
-        """
-        return user.get_address() in self.votes.keys()
-
-    async def add_vote(self, vote: str, address: str) -> None:
-        """
-        Adds user's vote.
-        :param vote: Str, the answer for the vote
-        :param address: the address if the user that voted.
-        """
-        self.votes[address] = vote
-
-        # Check if the vote has ended
-        await self.check_vote_ended()
-
-    def conclude_vote(self) -> bool:
-        """
-        Calculates the decision of the vote based on the votes.
-        :return: True if the vote has passed(more than half of the users was in favor), False otherwise.
-        """
-        yes_voters = list(self.votes.values()).count(self.authorization_word)
-        if yes_voters >= len(self.votes) / 2.0:
-            return True
-        return False
+        server = await asyncio.start_server(self.handle_connection, hostname, port)
+        logger.info(f"Server listening on {hostname}:{port}")
 
-    async def notify_user_quit(self) -> None:
-        """
-        notifies the voter an authorized user has left during the vote.
-        """
-        self.end_of_vote -= 1
+        # Seal pending transactions into blocks in the background
+        self.sealer_task = asyncio.create_task(self.sealer.run())
 
-        # Checks if the vote has ended
-        await self.check_vote_ended()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.sealer_task.cancel()
+            await asyncio.gather(self.sealer_task, return_exceptions=True)
+            self.sealer_task = None
+            # Let the snapshot that is being written finish
+            if self.snapshot_task:
+                await asyncio.gather(self.snapshot_task, return_exceptions=True)
 
-    async def check_vote_ended(self) -> None:
-        """
-        Checks if the vote ended by the number of votes currently held by the Voter.
-        If the vote ended changes the voter vote_ended attribute to True.
-        """
-        if len(self.votes) == self.end_of_vote:
-            self.vote_ended = True
 
 # {"ip": "1234", "port": 8888}
 # telnet 127.0.0.1 8888
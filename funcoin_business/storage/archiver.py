@@ -0,0 +1,53 @@
+import asyncio
+
+import structlog
+
+from funcoin_business.storage.block_store import BlockStore
+
+logger = structlog.getLogger(__name__)
+
+
+class SegmentArchiver:
+    """
+    Class SegmentArchiver, moves the segments of a block store whose blocks are older than max_age
+    to the compressed cold tier, in the background.
+    Compressing runs in a thread, the compressed segment is swapped in on the event loop,
+    where all the other reads and writes of the store happen.
+    """
+
+    MAX_AGE = 7 * 24 * 60 * 60
+    INTERVAL = 60 * 60
+
+    def __init__(self, store: BlockStore, max_age: float = MAX_AGE, interval: float = INTERVAL):
+        """
+        :param store: BlockStore, the store whose segments are archived.
+        :param max_age: float, the number of seconds after which the blocks of a full segment are archived.
+        :param interval: float, the number of seconds between looks for old segments.
+        """
+        self.store = store
+        self.max_age = max_age
+        self.interval = interval
+
+    async def archive_old_segments(self) -> int:
+        """
+        :return: int, the number of segments that were archived.
+        """
+        loop = asyncio.get_running_loop()
+        archived = 0
+        for segment in self.store.archivable_segments(self.max_age):
+            await loop.run_in_executor(None, self.store.compress_segment, segment)
+            if self.store.install_archive(segment):
+                archived += 1
+        if archived:
+            logger.info("Archived old segments", archived=archived, **{
+                f"{tier}_{key}": value for tier, stats in self.store.storage_stats().items()
+                for key, value in stats.items()})
+        return archived
+
+    async def run(self) -> None:
+        """
+        Archives old segments for as long as the node runs.
+        """
+        while True:
+            await self.archive_old_segments()
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,602 @@
+import io
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_right
+
+import structlog
+
+from funcoin_business.codec.codec import JsonCodec, get_codec
+from funcoin_business.storage.cold_segment import ColdSegment, compress_segment
+
+logger = structlog.getLogger(__name__)
+
+
+class BlockStoreError(Exception):
+    pass
+
+
+class MemoryBlockStore:
+    """
+    Class MemoryBlockStore, keeps the blocks in memory, has the same interface as BlockStore.
+    """
+
+    def __init__(self):
+        self.blocks = []
+        # The timestamp index, timestamps[height] is the latest block timestamp up to and including that height
+        self.timestamps = array("d")
+
+    def append(self, block: dict) -> None:
+        """
+        Appends a block to the end of the store.
+
+        :param block: dict, the block to store(similar to BlockSchema).
+        """
+        last = self.timestamps[-1] if self.timestamps else block["timestamp"]
+        self.blocks.append(block)
+        self.timestamps.append(max(block["timestamp"], last))
+
+    def hash_at(self, height: int) -> str:
+        """
+        :param height: int, the height of the block.
+        :return: str, the hash of the block.
+        """
+        return self.blocks[height]["hash"]
+
+    def truncate(self, length: int) -> None:
+        """
+        Drops the blocks from the given height to the end of the store.
+
+        :param length: int, the number of blocks to keep.
+        """
+        del self.blocks[length:]
+        del self.timestamps[length:]
+
+    def timestamp_at(self, height: int) -> float:
+        """
+        :param height: int, the height of the block.
+        :return: float, the indexed timestamp of the block, never lower than the timestamps of the blocks before it.
+        """
+        return self.timestamps[height]
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def __getitem__(self, item: int | slice) -> dict | list[dict]:
+        return self.blocks[item]
+
+    def __iter__(self):
+        return iter(self.blocks)
+
+
+class BlockStore:
+    """
+    Class BlockStore, an append-only block store on disk, blocks can only be dropped from the end.
+    Blocks are encoded by a codec(JSON or binary) and written as length-prefixed records into segment files,
+    a new segment is started once the current one reaches max_segment_size.
+    The index file holds one fixed-width entry per height:
+    (segment number, offset of the record, length of the payload)
+    so any block is located without scanning, and reads go through memory maps of the files.
+    Each index entry also holds the block timestamp (raised to the previous one if the clock went back),
+    so the index is ordered by time and can be binary searched without reading any block,
+    and the hash and the number of transactions of the block, so the headers of the chain are loaded from the index.
+
+    Old segments can be archived into a cold tier: compressed in chunks that are decompressed independently,
+    so any block is still read without decompressing its whole segment, see cold_segment.
+    The index keeps the offsets of the raw segment, so archiving changes nothing in it.
+
+    The meta file records the codec and the format of the index. The index of a store written in an older format
+    is rebuilt from the segments when the store is opened for writing, the records themselves never change.
+
+    The store behaves like a read-only sequence of blocks with an append method, so it can be used as
+    Blockchain.chain in place of a list.
+    """
+
+    INDEX_NAME = "index.dat"
+    META_NAME = "store.json"
+    SEGMENT_NAME = "segment_{:08d}.dat"
+    ARCHIVE_NAME = "segment_{:08d}.z"
+    # The format of the index, 1: entries without the timestamp, 2: entries with the timestamp,
+    # 3: entries with the timestamp, the hash and the number of transactions
+    FORMAT_VERSION = 3
+    # The raw size of the independently compressed chunks of an archived segment
+    CHUNK_SIZE = 256 * 1024
+    # segment number, offset, payload length, timestamp, hash, number of transactions
+    INDEX_ENTRY = struct.Struct("<IQId32sI")
+    # payload length
+    RECORD_HEADER = struct.Struct("<I")
+    MAX_SEGMENT_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, directory: str, max_segment_size: int = MAX_SEGMENT_SIZE, sync: bool = True,
+                 readonly: bool = False, codec: str = JsonCodec.name):
+        """
+        Opens the store in the given directory, creates it if needed and recovers from a torn last write.
+
+        :param directory: str, the directory holding the segment files and the index.
+        :param max_segment_size: int, the size in bytes after which a new segment file is started.
+        :param sync: bool, fsync every append, protects the ledger from power loss at the cost of latency.
+        :param readonly: bool, open the blocks that are already stored for reading only, nothing is changed on disk.
+        (used by other processes reading a store that is open for writing)
+        :param codec: str, the name of the codec blocks are encoded with in a new store,
+        an existing store keeps the codec it was created with.
+        """
+        self.directory = directory
+        self.max_segment_size = max_segment_size
+        self.sync = sync
+        self.readonly = readonly
+        codec, store_format = self._load_meta(codec)
+        self.codec = get_codec(codec)
+
+        # {segment number: (mmap, mapped size)}
+        self._maps = {}
+        self._index_map = None
+        self._index_map_size = 0
+        # {segment number: ColdSegment, None until it's read} of the archived segments
+        self._cold = {}
+        # The number of reads and the time they took, per tier
+        self.read_stats = {"hot": {"reads": 0, "seconds": 0.0}, "cold": {"reads": 0, "seconds": 0.0}}
+        if os.path.isdir(directory):
+            self._scan_archives()
+
+        if store_format > self.FORMAT_VERSION:
+            raise BlockStoreError(f"The block store format {store_format} is newer than this node supports")
+        if store_format < self.FORMAT_VERSION:
+            if readonly:
+                raise BlockStoreError(f"The block store format {store_format} must be migrated, "
+                                      f"open the store for writing first")
+            self._migrate(store_format)
+
+        if readonly:
+            self._index_file = self._segment_file = None
+            self._length = os.path.getsize(os.path.join(directory, self.INDEX_NAME)) // self.INDEX_ENTRY.size
+            return
+
+        os.makedirs(directory, exist_ok=True)
+        self._index_file = open(os.path.join(directory, self.INDEX_NAME), "ab")
+        self._length = self._recover()
+        self._segment_file = open(self._segment_path(self._segment), "ab")
+        logger.info("Opened block store", directory=directory, height=self._length)
+
+    def _load_meta(self, codec: str) -> tuple[str, int]:
+        """
+        :param codec: str, the codec to use if the store is new.
+        :return: tuple (the name of the codec the store is encoded with, the format of its index).
+        """
+        meta_path = os.path.join(self.directory, self.META_NAME)
+        if os.path.exists(meta_path):
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+            # A store opened for reading only takes the codec it finds
+            if meta["codec"] != codec and not self.readonly:
+                logger.warning("The block store keeps the codec it was created with", codec=meta["codec"])
+            # The meta file was introduced with the timestamps in the index, and recorded only the codec at first
+            return meta["codec"], meta.get("format", 2)
+        # A store written before the meta file is JSON, its index entries may or may not hold timestamps
+        if os.path.exists(os.path.join(self.directory, self.INDEX_NAME)):
+            return JsonCodec.name, 1
+        if not self.readonly:
+            self._write_meta(codec)
+        return codec, self.FORMAT_VERSION
+
+    def _write_meta(self, codec: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        meta_path = os.path.join(self.directory, self.META_NAME)
+        with open(meta_path + ".tmp", "w") as meta_file:
+            json.dump({"codec": codec, "format": self.FORMAT_VERSION}, meta_file)
+            self._flush(meta_file)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, self.SEGMENT_NAME.format(segment))
+
+    def _archive_path(self, segment: int) -> str:
+        return os.path.join(self.directory, self.ARCHIVE_NAME.format(segment))
+
+    def _scan_archives(self) -> None:
+        """
+        Finds the archived segments, and cleans up after an archiving that was interrupted.
+        """
+        prefix, suffix = self.ARCHIVE_NAME.split("{:08d}")
+        for name in os.listdir(self.directory):
+            if not self.readonly and name.startswith(prefix) and name.endswith(suffix + ".tmp"):
+                os.remove(os.path.join(self.directory, name))
+            elif name.startswith(prefix) and name.endswith(suffix):
+                segment = int(name[len(prefix):-len(suffix)])
+                self._cold[segment] = None
+                # The archive is complete once it has its name, the raw segment wasn't removed yet
+                if not self.readonly and os.path.exists(self._segment_path(segment)):
+                    os.remove(self._segment_path(segment))
+
+    def _remove_segment(self, segment: int) -> bool:
+        """
+        :return: bool, True if the segment existed.
+        """
+        self._close_cold(segment)
+        self._cold.pop(segment, None)
+        existed = False
+        for path in (self._segment_path(segment), self._archive_path(segment)):
+            if os.path.exists(path):
+                os.remove(path)
+                existed = True
+        return existed
+
+    def _segment_records(self, segment: int):
+        """
+        Reads a segment from its file or its archive, a partially written record at the end is skipped.
+
+        :param segment: int, the segment number.
+        :return: iterator of tuples (offset of the record, payload), in the order of the records.
+        """
+        if segment in self._cold:
+            cold = self._cold_segment(segment)
+            read, end = cold.read, cold.raw_size
+        else:
+            with open(self._segment_path(segment), "rb") as segment_file:
+                raw = segment_file.read()
+            read, end = lambda start, size: raw[start:start + size], len(raw)
+        offset = 0
+        while offset + self.RECORD_HEADER.size <= end:
+            (size,) = self.RECORD_HEADER.unpack(read(offset, self.RECORD_HEADER.size))
+            if offset + self.RECORD_HEADER.size + size > end:
+                break
+            yield offset, read(offset + self.RECORD_HEADER.size, size)
+            offset += self.RECORD_HEADER.size + size
+
+    def _index_entry(self, segment: int, offset: int, payload: bytes, block: dict) -> bytes:
+        """
+        :param segment: int, the segment number of the record.
+        :param offset: int, the offset of the record in the segment.
+        :param payload: bytes, the encoded block.
+        :param block: dict, the block(similar to BlockSchema).
+        :return: bytes, the index entry of the block, the block must be the next one in the store.
+        """
+        timestamp = block["timestamp"]
+        if self._last_timestamp is not None:
+            timestamp = max(timestamp, self._last_timestamp)
+        self._last_timestamp = timestamp
+        return self.INDEX_ENTRY.pack(segment, offset, len(payload), timestamp, bytes.fromhex(block["hash"]),
+                                     len(block["transaction"]))
+
+    def _migrate(self, store_format: int) -> None:
+        """
+        Rebuilds the index of a store written in an older format from the records of its segments.
+        The new index replaces the old one only once it's complete, an interrupted migration runs again on the next open.
+
+        :param store_format: int, the format the store was written in.
+        """
+        logger.warning("Migrating the block store index", directory=self.directory, format=store_format,
+                       new_format=self.FORMAT_VERSION)
+        index_path = os.path.join(self.directory, self.INDEX_NAME)
+        self._last_timestamp = None
+        length = 0
+        with open(index_path + ".tmp", "wb") as index_file:
+            segment = 0
+            while segment in self._cold or os.path.exists(self._segment_path(segment)):
+                for offset, payload in self._segment_records(segment):
+                    index_file.write(self._index_entry(segment, offset, payload, self.codec.decode_block(payload)))
+                    length += 1
+                segment += 1
+            self._flush(index_file)
+        os.replace(index_path + ".tmp", index_path)
+        self._write_meta(self.codec.name)
+        logger.info("Migrated the block store index", directory=self.directory, height=length)
+
+    def _recover(self) -> int:
+        """
+        Drops partially written index entries and records that were never indexed,
+        and sets the active segment and its end offset.
+
+        :return: int, the number of blocks in the store.
+        """
+        index_path = os.path.join(self.directory, self.INDEX_NAME)
+        index_size = os.path.getsize(index_path)
+        length = index_size // self.INDEX_ENTRY.size
+        if index_size % self.INDEX_ENTRY.size:
+            logger.warning("Truncating a partially written index entry", directory=self.directory)
+            self._index_file.truncate(length * self.INDEX_ENTRY.size)
+
+        if length:
+            with open(index_path, "rb") as index_file:
+                index_file.seek((length - 1) * self.INDEX_ENTRY.size)
+                segment, offset, size, timestamp, _, _ = self.INDEX_ENTRY.unpack(
+                    index_file.read(self.INDEX_ENTRY.size))
+            end = offset + self.RECORD_HEADER.size + size
+        else:
+            segment, end, timestamp = 0, 0, None
+
+        # The active segment is written to, it can't stay archived
+        if segment in self._cold:
+            self._thaw(segment)
+        # Records written after the last index entry belong to an append that never completed
+        segment_path = self._segment_path(segment)
+        if os.path.exists(segment_path) and os.path.getsize(segment_path) > end:
+            logger.warning("Truncating an unindexed record", segment=segment)
+            os.truncate(segment_path, end)
+        next_segment = segment + 1
+        while self._remove_segment(next_segment):
+            next_segment += 1
+
+        self._segment = segment
+        self._segment_size = end
+        self._last_timestamp = timestamp
+        return length
+
+    def _flush(self, file) -> None:
+        file.flush()
+        if self.sync:
+            os.fsync(file.fileno())
+
+    def append(self, block: dict) -> None:
+        """
+        Appends a block to the end of the store.
+
+        :param block: dict, the block to store(similar to BlockSchema).
+        """
+        if self.readonly:
+            raise io.UnsupportedOperation("the block store is open for reading only")
+        payload = self.codec.encode_block(block)
+        record = self.RECORD_HEADER.pack(len(payload)) + payload
+
+        # Start a new segment once the current one is full
+        if self._segment_size and self._segment_size + len(record) > self.max_segment_size:
+            self._segment_file.close()
+            self._segment += 1
+            self._segment_size = 0
+            self._segment_file = open(self._segment_path(self._segment), "ab")
+
+        offset = self._segment_size
+        self._segment_file.write(record)
+        self._flush(self._segment_file)
+        self._segment_size += len(record)
+
+        # The block exists only once its index entry is written
+        self._index_file.write(self._index_entry(self._segment, offset, payload, block))
+        self._flush(self._index_file)
+        self._length += 1
+
+    def truncate(self, length: int) -> None:
+        """
+        Drops the blocks from the given height to the end of the store(i.e. on a reorganisation of the chain).
+        The index is cut first, so a crash in between leaves unindexed records that are dropped on the next open.
+
+        :param length: int, the number of blocks to keep.
+        """
+        if self.readonly:
+            raise io.UnsupportedOperation("the block store is open for reading only")
+        if length >= self._length:
+            return
+        segment, offset = self._read_index(length)[:2]
+        self._last_timestamp = self._read_index(length - 1)[3] if length else None
+
+        # The maps can't outlive the parts of the files they map
+        self.close()
+        index_path = os.path.join(self.directory, self.INDEX_NAME)
+        os.truncate(index_path, length * self.INDEX_ENTRY.size)
+        if segment in self._cold:
+            self._thaw(segment)
+        os.truncate(self._segment_path(segment), offset)
+        next_segment = segment + 1
+        while self._remove_segment(next_segment):
+            next_segment += 1
+
+        self._index_file = open(index_path, "ab")
+        self._segment_file = open(self._segment_path(segment), "ab")
+        self._segment = segment
+        self._segment_size = offset
+        self._length = length
+        logger.info("Truncated block store", directory=self.directory, height=length)
+
+    def _read_index(self, height: int) -> tuple[int, int, int, float, bytes, int]:
+        """
+        :param height: int, a valid height in the store.
+        :return: tuple (segment number, offset, payload length, timestamp, hash, number of transactions)
+        of the block at the given height.
+        """
+        start = height * self.INDEX_ENTRY.size
+        end = start + self.INDEX_ENTRY.size
+        if end > self._index_map_size:
+            if self._index_map:
+                self._index_map.close()
+            with open(os.path.join(self.directory, self.INDEX_NAME), "rb") as index_file:
+                self._index_map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._index_map_size = len(self._index_map)
+        return self.INDEX_ENTRY.unpack_from(self._index_map, start)
+
+    def _read_record(self, segment: int, offset: int, size: int) -> bytes:
+        """
+        :return: bytes, the payload of the record at the given position.
+        """
+        started = time.perf_counter()
+        tier = "cold" if segment in self._cold else "hot"
+        if tier == "hot":
+            try:
+                payload = self._read_hot(segment, offset + self.RECORD_HEADER.size, size)
+            except FileNotFoundError:
+                # Another process archived the segment since this store was opened
+                if not os.path.exists(self._archive_path(segment)):
+                    raise
+                self._cold[segment] = None
+                tier = "cold"
+        if tier == "cold":
+            payload = self._cold_segment(segment).read(offset + self.RECORD_HEADER.size, size)
+        stats = self.read_stats[tier]
+        stats["reads"] += 1
+        stats["seconds"] += time.perf_counter() - started
+        return payload
+
+    def _read_hot(self, segment: int, start: int, size: int) -> bytes:
+        end = start + size
+        segment_map, mapped_size = self._maps.get(segment, (None, 0))
+        # The active segment keeps growing, map it again once a read goes past the mapped part
+        if end > mapped_size:
+            if segment_map:
+                segment_map.close()
+            with open(self._segment_path(segment), "rb") as segment_file:
+                segment_map = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = (segment_map, len(segment_map))
+        return segment_map[start:end]
+
+    def _cold_segment(self, segment: int) -> ColdSegment:
+        if self._cold[segment] is None:
+            self._cold[segment] = ColdSegment(self._archive_path(segment))
+        return self._cold[segment]
+
+    def _close_cold(self, segment: int) -> None:
+        if self._cold.get(segment):
+            self._cold[segment].close()
+            self._cold[segment] = None
+
+    def _thaw(self, segment: int) -> None:
+        """
+        Moves an archived segment back to the hot tier, i.e. before blocks are dropped from it.
+        """
+        self._cold_segment(segment).decompress(self._segment_path(segment))
+        self._close_cold(segment)
+        del self._cold[segment]
+        os.remove(self._archive_path(segment))
+        logger.info("Moved an archived segment back to the hot tier", segment=segment)
+
+    def _segment_last_timestamp(self, segment: int) -> float:
+        """
+        :param segment: int, a segment number, there must be blocks in the store after the segment.
+        :return: float, the indexed timestamp of the newest block in the segment.
+        """
+        last_height = bisect_right(range(self._length), segment, key=lambda height: self._read_index(height)[0]) - 1
+        return self.timestamp_at(last_height)
+
+    def archivable_segments(self, max_age: float, now: float | None = None) -> list[int]:
+        """
+        :param max_age: float, the number of seconds after which the blocks of a segment are old.
+        :param now: float, the current time, time.time() if not given.
+        :return: list of int, the full segments in the hot tier whose newest block is older than max_age.
+        """
+        cutoff = (time.time() if now is None else now) - max_age
+        return [segment for segment in range(self._segment)
+                if segment not in self._cold and self._segment_last_timestamp(segment) <= cutoff]
+
+    def compress_segment(self, segment: int) -> None:
+        """
+        Writes the archive of a full segment, changes nothing the store reads, so it can run in another thread.
+        install_archive moves the segment to the cold tier afterwards.
+
+        :param segment: int, the segment number.
+        """
+        compress_segment(self._segment_path(segment), self._archive_path(segment), self.CHUNK_SIZE, sync=self.sync)
+
+    def install_archive(self, segment: int) -> bool:
+        """
+        Moves a segment whose archive was written by compress_segment to the cold tier, and removes the raw segment.
+
+        :param segment: int, the segment number.
+        :return: Boolean, True if the segment was archived,
+        False if the segment changed since the archive was written(the archive is dropped).
+        """
+        if self.readonly:
+            raise io.UnsupportedOperation("the block store is open for reading only")
+        archive = ColdSegment(self._archive_path(segment))
+        raw_path = self._segment_path(segment)
+        if segment >= self._segment or not os.path.exists(raw_path) or os.path.getsize(raw_path) != archive.raw_size:
+            archive.close()
+            os.remove(self._archive_path(segment))
+            return False
+        segment_map, _ = self._maps.pop(segment, (None, 0))
+        if segment_map:
+            segment_map.close()
+        self._cold[segment] = archive
+        os.remove(raw_path)
+        logger.info("Archived a segment", segment=segment, raw_size=archive.raw_size, size=archive.stored_size)
+        return True
+
+    def storage_stats(self) -> dict:
+        """
+        :return: dict {"hot": {...}, "cold": {...}}, per tier: the number of segments, their size on disk,
+        the raw size of the blocks, the compression ratio(raw size / size on disk), the number of reads
+        and their average latency in milliseconds.
+        """
+        hot_segments = [segment for segment in range(self._segment + 1) if segment not in self._cold]
+        hot_size = sum(os.path.getsize(self._segment_path(segment)) for segment in hot_segments
+                       if os.path.exists(self._segment_path(segment)))
+        cold_segments = [self._cold_segment(segment) for segment in sorted(self._cold)]
+        tiers = {"hot": (len(hot_segments), hot_size, hot_size),
+                 "cold": (len(cold_segments), sum(cold.raw_size for cold in cold_segments),
+                          sum(cold.stored_size for cold in cold_segments))}
+        stats = {}
+        for tier, (segments, raw_size, size) in tiers.items():
+            reads = self.read_stats[tier]
+            stats[tier] = {"segments": segments,
+                           "size": size,
+                           "raw_size": raw_size,
+                           "ratio": raw_size / size if size else 1.0,
+                           "reads": reads["reads"],
+                           "average_read_ms": 1000 * reads["seconds"] / reads["reads"] if reads["reads"] else 0.0,
+                           }
+        return stats
+
+    def _get_block(self, height: int) -> dict:
+        return self.codec.decode_block(self._read_record(*self._read_index(height)[:3]))
+
+    def timestamp_at(self, height: int) -> float:
+        """
+        :param height: int, the height of the block.
+        :return: float, the indexed timestamp of the block, never lower than the timestamps of the blocks before it.
+        """
+        return self._read_index(height)[3]
+
+    def hash_at(self, height: int) -> str:
+        """
+        :param height: int, the height of the block.
+        :return: str, the hash of the block, without reading the block.
+        """
+        return self._read_index(height)[4].hex()
+
+    def iter_headers(self):
+        """
+        Reads the headers of the blocks from the index, without reading any block.
+
+        :return: iterator of tuples (hash, indexed timestamp, number of transactions), from the lowest height.
+        """
+        if not self._length:
+            return
+        self._read_index(self._length - 1)
+        for _, _, _, timestamp, block_hash, tx_count in \
+                self.INDEX_ENTRY.iter_unpack(self._index_map[:self._length * self.INDEX_ENTRY.size]):
+            yield block_hash.hex(), timestamp, tx_count
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, item: int | slice) -> dict | list[dict]:
+        """
+        :param item: int or slice, heights of the wanted blocks, negative heights count from the end.
+        :return: dict for a single height, list of dicts for a slice.
+        """
+        if isinstance(item, slice):
+            return [self._get_block(height) for height in range(*item.indices(self._length))]
+        height = item + self._length if item < 0 else item
+        if not 0 <= height < self._length:
+            raise IndexError("block height out of range")
+        return self._get_block(height)
+
+    def __iter__(self):
+        for height in range(self._length):
+            yield self._get_block(height)
+
+    def close(self) -> None:
+        """
+        Closes all the files and memory maps of the store.
+        """
+        for segment_map, _ in self._maps.values():
+            segment_map.close()
+        self._maps = {}
+        for segment in self._cold:
+            self._close_cold(segment)
+        if self._index_map:
+            self._index_map.close()
+            self._index_map = None
+            self._index_map_size = 0
+        if not self.readonly:
+            self._segment_file.close()
+            self._index_file.close()
@@ -0,0 +1,135 @@
+import mmap
+import os
+import struct
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+
+MAGIC = b"FCZ1"
+# raw size of the segment, number of chunks
+ARCHIVE_HEADER = struct.Struct("<QI")
+# offset of the chunk in the raw segment, offset of the compressed chunk in the archive, compressed length
+CHUNK_ENTRY = struct.Struct("<QQI")
+# payload length, the record header of BlockStore
+RECORD_HEADER = struct.Struct("<I")
+
+
+class ColdSegmentError(Exception):
+    pass
+
+
+def compress_segment(raw_path: str, archive_path: str, chunk_size: int, level: int = zlib.Z_DEFAULT_COMPRESSION,
+                     sync: bool = True) -> None:
+    """
+    Writes a compressed copy of a segment file, the records are grouped into chunks of about chunk_size bytes
+    that are compressed independently, a record never spans two chunks.
+    The archive is written to a temporary file and renamed, the raw segment is left as it is.
+
+    :param raw_path: str, the path of the segment file.
+    :param archive_path: str, the path of the archive.
+    :param chunk_size: int, the raw size in bytes after which a new chunk is started.
+    :param level: int, the zlib compression level.
+    :param sync: bool, fsync the archive before it is renamed.
+    """
+    with open(raw_path, "rb") as raw_file:
+        raw = raw_file.read()
+
+    # Cut the segment at record boundaries
+    starts = [0]
+    offset = 0
+    while offset < len(raw):
+        (size,) = RECORD_HEADER.unpack_from(raw, offset)
+        offset += RECORD_HEADER.size + size
+        if offset - starts[-1] >= chunk_size and offset < len(raw):
+            starts.append(offset)
+    chunks = [zlib.compress(raw[start:end], level) for start, end in zip(starts, starts[1:] + [len(raw)])]
+
+    table_end = len(MAGIC) + ARCHIVE_HEADER.size + CHUNK_ENTRY.size * len(chunks)
+    table = []
+    compressed_offset = table_end
+    for start, chunk in zip(starts, chunks):
+        table.append(CHUNK_ENTRY.pack(start, compressed_offset, len(chunk)))
+        compressed_offset += len(chunk)
+
+    temp_path = archive_path + ".tmp"
+    with open(temp_path, "wb") as archive_file:
+        archive_file.write(MAGIC + ARCHIVE_HEADER.pack(len(raw), len(chunks)) + b"".join(table))
+        for chunk in chunks:
+            archive_file.write(chunk)
+        archive_file.flush()
+        if sync:
+            os.fsync(archive_file.fileno())
+    os.replace(temp_path, archive_path)
+
+
+class ColdSegment:
+    """
+    Class ColdSegment, reads records from a segment archived by compress_segment.
+    The archive is memory mapped, a read decompresses only the chunk holding the record,
+    the most recently decompressed chunks are kept.
+    """
+
+    CACHED_CHUNKS = 4
+
+    def __init__(self, path: str, cached_chunks: int = CACHED_CHUNKS):
+        """
+        :raise: ColdSegmentError if the file is not an archive.
+        :param path: str, the path of the archive.
+        :param cached_chunks: int, the number of decompressed chunks kept in memory.
+        """
+        self.path = path
+        self.cached_chunks = cached_chunks
+        with open(path, "rb") as archive_file:
+            self._map = mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ColdSegmentError(f"{path} is not an archived segment")
+        self.raw_size, count = ARCHIVE_HEADER.unpack_from(self._map, len(MAGIC))
+        table_start = len(MAGIC) + ARCHIVE_HEADER.size
+        self.chunks = [CHUNK_ENTRY.unpack_from(self._map, table_start + CHUNK_ENTRY.size * index)
+                       for index in range(count)]
+        self._chunk_starts = [start for start, _, _ in self.chunks]
+        # {chunk number: decompressed chunk} from the least recently used
+        self._cache = OrderedDict()
+
+    @property
+    def stored_size(self) -> int:
+        return len(self._map)
+
+    def _chunk(self, index: int) -> bytes:
+        chunk = self._cache.get(index)
+        if chunk is None:
+            _, compressed_offset, compressed_size = self.chunks[index]
+            chunk = zlib.decompress(self._map[compressed_offset:compressed_offset + compressed_size])
+            self._cache[index] = chunk
+            if len(self._cache) > self.cached_chunks:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(index)
+        return chunk
+
+    def read(self, offset: int, size: int) -> bytes:
+        """
+        :param offset: int, the offset of the data in the raw segment.
+        :param size: int, the number of bytes to read, the data must be within one record.
+        :return: bytes, the data.
+        """
+        index = bisect_right(self._chunk_starts, offset) - 1
+        start = offset - self._chunk_starts[index]
+        return self._chunk(index)[start:start + size]
+
+    def decompress(self, raw_path: str) -> None:
+        """
+        Writes the raw segment back, i.e. before records are dropped from its end.
+
+        :param raw_path: str, the path of the segment file.
+        """
+        with open(raw_path, "wb") as raw_file:
+            for index in range(len(self.chunks)):
+                raw_file.write(self._chunk(index))
+            raw_file.flush()
+            os.fsync(raw_file.fileno())
+
+    def close(self) -> None:
+        self._cache.clear()
+        self._map.close()
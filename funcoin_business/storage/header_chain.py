@@ -0,0 +1,143 @@
+from collections import Counter, OrderedDict
+
+import structlog
+
+from funcoin_business.storage.block_store import BlockStore
+
+logger = structlog.getLogger(__name__)
+
+
+class BlockHeader:
+    """
+    Class BlockHeader, the compact part of a block that is kept in memory for every height.
+    The headers of the stored blocks are loaded from the index of the store, their timestamps are the indexed ones.
+    """
+
+    __slots__ = ("height", "hash", "previous_hash", "timestamp", "tx_count")
+
+    def __init__(self, height: int, block_hash: str, previous_hash: str, timestamp: float, tx_count: int):
+        self.height = height
+        self.hash = block_hash
+        self.previous_hash = previous_hash
+        self.timestamp = timestamp
+        self.tx_count = tx_count
+
+    @classmethod
+    def from_block(cls, block: dict) -> "BlockHeader":
+        """
+        :param block: dict, the block(similar to BlockSchema).
+        :return: BlockHeader, the header of the block.
+        """
+        return cls(block["height"], block["hash"], block["previous_hash"], block["timestamp"],
+                   len(block["transaction"]))
+
+
+class HeaderChain:
+    """
+    Class HeaderChain, keeps only the headers of the blocks in memory, the blocks themselves stay in a BlockStore
+    and are read on demand through a bounded LRU cache, so memory grows with the number of blocks
+    and not with their transactions.
+
+    Has the same interface as BlockStore, so it can be used as Blockchain.chain in its place.
+    """
+
+    CACHE_SIZE = 256
+
+    def __init__(self, store: BlockStore, cache_size: int = CACHE_SIZE):
+        """
+        Reads the header of every block in the store from its index, the blocks themselves aren't read.
+
+        :param store: BlockStore, where the blocks are kept.
+        :param cache_size: int, the maximal number of blocks kept in memory.
+        """
+        self.store = store
+        self.cache_size = cache_size
+        self.headers = []
+        for height, (block_hash, timestamp, tx_count) in enumerate(store.iter_headers()):
+            previous_hash = self.headers[-1].hash if self.headers else "first block"
+            self.headers.append(BlockHeader(height, block_hash, previous_hash, timestamp, tx_count))
+        # {height: block} from the least recently used
+        self._cache = OrderedDict()
+        self.cache_stats = Counter(hits=0, misses=0)
+        logger.info("Loaded the headers of the chain", height=len(self.headers))
+
+    def header_at(self, height: int) -> BlockHeader:
+        """
+        :param height: int, the height of the block, negative heights count from the end.
+        :return: BlockHeader, the header of the block, without reading the block.
+        """
+        return self.headers[height]
+
+    def hash_at(self, height: int) -> str:
+        """
+        :param height: int, the height of the block.
+        :return: str, the hash of the block, without reading the block.
+        """
+        return self.headers[height].hash
+
+    def timestamp_at(self, height: int) -> float:
+        """
+        :param height: int, the height of the block.
+        :return: float, the indexed timestamp of the block, never lower than the timestamps of the blocks before it.
+        """
+        return self.store.timestamp_at(height)
+
+    def _cache_block(self, height: int, block: dict) -> None:
+        self._cache[height] = block
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _get_block(self, height: int) -> dict:
+        block = self._cache.get(height)
+        if block is not None:
+            self._cache.move_to_end(height)
+            self.cache_stats["hits"] += 1
+            return block
+        self.cache_stats["misses"] += 1
+        block = self.store[height]
+        self._cache_block(height, block)
+        return block
+
+    def append(self, block: dict) -> None:
+        """
+        Appends a block to the end of the store, the newest blocks are the most likely to be read.
+
+        :param block: dict, the block to store(similar to BlockSchema).
+        """
+        self.store.append(block)
+        self.headers.append(BlockHeader.from_block(block))
+        self._cache_block(block["height"], block)
+
+    def truncate(self, length: int) -> None:
+        """
+        Drops the blocks from the given height to the end of the store.
+
+        :param length: int, the number of blocks to keep.
+        """
+        self.store.truncate(length)
+        del self.headers[length:]
+        for height in [height for height in self._cache if height >= length]:
+            del self._cache[height]
+
+    def __len__(self) -> int:
+        return len(self.headers)
+
+    def __getitem__(self, item: int | slice) -> dict | list[dict]:
+        """
+        :param item: int or slice, heights of the wanted blocks, negative heights count from the end.
+        :return: dict for a single height, list of dicts for a slice.
+        """
+        if isinstance(item, slice):
+            return [self._get_block(height) for height in range(*item.indices(len(self.headers)))]
+        height = item + len(self.headers) if item < 0 else item
+        if not 0 <= height < len(self.headers):
+            raise IndexError("block height out of range")
+        return self._get_block(height)
+
+    def __iter__(self):
+        # A full scan reads through the store without pushing the recently used blocks out of the cache
+        return iter(self.store)
+
+    def close(self) -> None:
+        self._cache.clear()
+        self.store.close()
@@ -0,0 +1,80 @@
+import json
+import os
+
+import structlog
+
+logger = structlog.getLogger(__name__)
+
+
+class SnapshotStore:
+    """
+    Class SnapshotStore, saves snapshots of the state derived from the chain, each stamped with the height and hash
+    of the last block it reflects. A snapshot is written to a temporary file and renamed over its final name,
+    so a crash never leaves a partly written snapshot behind.
+    """
+
+    SNAPSHOT_NAME = "snapshot_{:012d}.json"
+    INTERVAL = 100
+    KEEP = 2
+
+    def __init__(self, directory: str, interval: int = INTERVAL, keep: int = KEEP):
+        """
+        :param directory: str, the directory the snapshots are kept in.
+        :param interval: int, the number of blocks between snapshots.
+        :param keep: int, the number of newest snapshots to keep, older ones are deleted.
+        """
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+        heights = self._heights()
+        self.last_height = heights[-1] if heights else None
+
+    def _heights(self) -> list[int]:
+        """
+        :return: list of int, the heights of the saved snapshots, from the oldest.
+        """
+        prefix, suffix = self.SNAPSHOT_NAME.split("{:012d}")
+        return sorted(int(name[len(prefix):-len(suffix)]) for name in os.listdir(self.directory)
+                      if name.startswith(prefix) and name.endswith(suffix))
+
+    def _path(self, height: int) -> str:
+        return os.path.join(self.directory, self.SNAPSHOT_NAME.format(height))
+
+    def is_due(self, height: int) -> bool:
+        """
+        :param height: int, the height of the last block in the chain.
+        :return: Boolean, True if interval blocks were added since the last snapshot, False otherwise.
+        """
+        return self.last_height is None or height - self.last_height >= self.interval
+
+    def save(self, state: dict) -> None:
+        """
+        Atomically writes a snapshot, and deletes the snapshots older than the newest keep ones.
+
+        :param state: dict, JSON serializable, with the "height" and "hash" of the last block it reflects.
+        """
+        path = self._path(state["height"])
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as snapshot_file:
+            json.dump(state, snapshot_file)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temp_path, path)
+        self.last_height = state["height"]
+        logger.info("Saved a snapshot", height=state["height"])
+
+        for height in self._heights()[:-self.keep]:
+            os.remove(self._path(height))
+
+    def load_latest(self) -> dict | None:
+        """
+        :return: dict, the newest snapshot that can be read, None if there is no such snapshot.
+        """
+        for height in reversed(self._heights()):
+            try:
+                with open(self._path(height)) as snapshot_file:
+                    return json.load(snapshot_file)
+            except (OSError, json.decoder.JSONDecodeError) as e:
+                logger.warning("Skipping an unreadable snapshot", height=height, error=str(e))
+        return None
@@ -0,0 +1,467 @@
+import asyncio
+import json
+import struct
+from collections import deque
+from heapq import heappop, heappush
+
+import structlog
+from marshmallow.exceptions import MarshmallowError
+
+from funcoin_business.blockchain import Blockchain
+from funcoin_business.codec.codec import CodecError
+from funcoin_business.forks.block_tree import block_work, EXTENDED, KNOWN, REORG, SIDE
+from funcoin_business.messages import (load_message, create_get_headers_message, create_headers_message,
+                                       create_get_blocks_message, create_blocks_message)
+
+logger = structlog.getLogger(__name__)
+
+# big endian length of the encoded message
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+class SyncError(Exception):
+    pass
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    """
+    :raise: asyncio.IncompleteReadError if the connection closed, SyncError if the frame is too big.
+    :param reader: asyncio.StreamReader, the connection.
+    :return: bytes, the next encoded message.
+    """
+    (size,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    if size > MAX_FRAME_SIZE:
+        raise SyncError(f"The frame is too big: {size} bytes")
+    return await reader.readexactly(size)
+
+
+def write_frame(writer: asyncio.StreamWriter, data: str | bytes) -> None:
+    """
+    :param writer: asyncio.StreamWriter, the connection.
+    :param data: str or bytes, an encoded message, see messages.dump_message.
+    """
+    data = data.encode() if isinstance(data, str) else data
+    writer.write(FRAME_HEADER.pack(len(data)) + data)
+
+
+class SyncServer:
+    """
+    Class SyncServer, serves the chain of this node to nodes that synchronise with it, on its own port.
+    Every message is a length-prefixed frame, the answers are sent in the order of the requests,
+    so a client can have several requests in flight on one connection.
+    """
+
+    PORT = 8889
+    MAX_HEADERS = 2000
+    MAX_BLOCKS = 64
+
+    def __init__(self, blockchain: Blockchain, codec=None, external_ip: str = "0.0.0.0", port: int = PORT):
+        """
+        :param blockchain: Blockchain, the chain that is served.
+        :param codec: codec.codec.JsonCodec or BinaryCodec, the encoding of the messages, JSON text if not given.
+        (the clients must use the same encoding)
+        :param external_ip: str, the public IP of the node, sent in the meta of the messages.
+        :param port: int, the port the server listens on.
+        """
+        self.blockchain = blockchain
+        self.codec = codec
+        self.external_ip = external_ip
+        self.port = port
+
+    def get_headers(self, start: int, count: int) -> list[dict]:
+        """
+        :param start: int, the height of the first header.
+        :param count: int, the maximal number of headers, at most MAX_HEADERS.
+        :return: list of HeaderSchema, the headers of the chain from start, empty if start is past the tip.
+        """
+        end = min(start + min(count, self.MAX_HEADERS), len(self.blockchain.chain))
+        return [self.blockchain.get_header(height) for height in range(start, end)]
+
+    def get_blocks(self, heights: list[int]) -> list[dict]:
+        """
+        :param heights: list of int, the heights of the wanted blocks, at most MAX_BLOCKS are answered.
+        :return: list of BlockSchema, the blocks the chain has of the heights.
+        """
+        return [self.blockchain.chain[height] for height in heights[:self.MAX_BLOCKS]
+                if height < len(self.blockchain.chain)]
+
+    def handle_request(self, message: dict) -> str | bytes:
+        """
+        :raise: SyncError if the message is not a request.
+        :param message: dict, the message loaded by BaseSchema.
+        :return: str or bytes, the encoded answer.
+        """
+        body = message["message"]
+        if body["name"] == "get_headers":
+            headers = self.get_headers(body["payload"].get("start", 0), body["payload"].get("count", 0))
+            return create_headers_message(self.external_ip, self.port, headers, self.codec)
+        if body["name"] == "get_blocks":
+            blocks = self.get_blocks(body["payload"].get("heights", []))
+            return create_blocks_message(self.external_ip, self.port, blocks, self.codec)
+        raise SyncError(f"Unexpected message: {body['name']}")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Answers the requests of a client until it disconnects or sends something that is not a request.
+
+        :param reader: asyncio.StreamReader
+        :param writer: asyncio.StreamWriter, represents the connecting node
+        """
+        peer = writer.get_extra_info("peername")
+        try:
+            while True:
+                message = load_message(await read_frame(reader), self.codec)
+                write_frame(writer, self.handle_request(message))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except (SyncError, CodecError, MarshmallowError, json.decoder.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.info("Closing a sync connection after an invalid request", peer=peer, error=str(e))
+        finally:
+            writer.close()
+
+    async def listen(self, hostname: str = "0.0.0.0") -> None:
+        """
+        Serves the chain forever.
+        """
+        server = await asyncio.start_server(self.handle_connection, hostname, self.port)
+        logger.info(f"Sync server listening on {hostname}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+
+class PeerConnection:
+    """
+    Class PeerConnection, a connection to the SyncServer of another node.
+    Up to window requests are in flight at once, the answers arrive in the order of the requests.
+    """
+
+    WINDOW = 4
+
+    def __init__(self, host: str, port: int, codec=None, window: int = WINDOW):
+        """
+        :param host: str, the address of the node.
+        :param port: int, the port of its sync server.
+        :param codec: the encoding of the messages, JSON text if not given.
+        :param window: int, the maximal number of requests in flight.
+        """
+        self.host = host
+        self.port = port
+        self.codec = codec
+        self.window = window
+        self._in_flight = asyncio.Semaphore(window)
+        # The futures of the requests in flight, in the order they were sent
+        self._waiting = deque()
+        self._reader = self._writer = self._reader_task = None
+        self.closed = False
+
+    def __str__(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    async def open(self) -> None:
+        """
+        :raise: OSError if the node can't be reached.
+        """
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._reader_task = asyncio.create_task(self._read_answers())
+
+    async def _read_answers(self) -> None:
+        """
+        Hands every answer to the request that waits for it, fails the waiting requests once the connection is lost.
+        """
+        error = ConnectionError("The connection was closed")
+        try:
+            while True:
+                answer = load_message(await read_frame(self._reader), self.codec)
+                self._waiting.popleft().set_result(answer)
+        except (asyncio.IncompleteReadError, ConnectionError, IndexError, SyncError, CodecError, MarshmallowError,
+                json.decoder.JSONDecodeError, UnicodeDecodeError) as e:
+            error = ConnectionError(f"The connection to {self} failed: {e}")
+        finally:
+            self.close()
+            while self._waiting:
+                future = self._waiting.popleft()
+                if not future.done():
+                    future.set_exception(error)
+
+    async def request(self, data: str | bytes) -> dict:
+        """
+        Sends a request once there is room in the window and waits for its answer.
+        :raise: ConnectionError if the connection is lost before the answer arrives.
+
+        :param data: str or bytes, the encoded request.
+        :return: dict, the answer loaded by BaseSchema.
+        """
+        async with self._in_flight:
+            if self.closed:
+                raise ConnectionError(f"The connection to {self} is closed")
+            future = asyncio.get_running_loop().create_future()
+            self._waiting.append(future)
+            write_frame(self._writer, data)
+            await self._writer.drain()
+            return await future
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self._writer:
+            self._writer.close()
+        if self._reader_task and self._reader_task is not asyncio.current_task():
+            self._reader_task.cancel()
+
+
+class SyncClient:
+    """
+    Class SyncClient, brings the chain up to date with other nodes, headers first:
+    every node is asked for the headers of its chain from the point it forks from this chain, found by walking back
+    from the tip, and the headers are checked to link to the chain and to each other. The branch with the most work
+    is followed, the heights it covers become work items that are downloaded in batches from all the nodes
+    in parallel, each node with a bounded window of requests in flight. The blocks are handed to the chain
+    in height order, a block is accepted only if its hash is the hash of the verified header,
+    the chain switches to the branch once it has more work than the blocks it replaces.
+
+    The blocks added before a connection is lost stay on the chain, the heights that were in flight on it
+    go back to the other nodes, and a new sync continues from there.
+    """
+
+    BATCH_SIZE = 16
+    # The maximal number of downloaded blocks waiting for the blocks below them
+    MAX_AHEAD = 1024
+
+    def __init__(self, blockchain: Blockchain, codec=None, window: int = PeerConnection.WINDOW,
+                 batch_size: int = BATCH_SIZE, max_ahead: int = MAX_AHEAD):
+        """
+        :param blockchain: Blockchain, the chain that is brought up to date.
+        :param codec: the encoding of the messages, JSON text if not given.
+        :param window: int, the maximal number of requests in flight on each connection.
+        :param batch_size: int, the number of blocks asked for in one request.
+        :param max_ahead: int, how far above the tip of the chain blocks are downloaded.
+        """
+        self.blockchain = blockchain
+        self.codec = codec
+        self.window = window
+        self.batch_size = min(batch_size, SyncServer.MAX_BLOCKS)
+        self.max_ahead = max_ahead
+        # The verified headers of the followed branch above the fork point, {height: header}
+        self.headers = {}
+        # The height of the next block to hand to the chain
+        self._next = 0
+        self._heights = []
+        # {height: (block, the connection it came from)} of the blocks waiting for the blocks below them
+        self._downloaded = {}
+        self._progress = asyncio.Condition()
+
+    @staticmethod
+    def _verify_headers(headers: list[dict], previous: dict) -> None:
+        """
+        Checks that the headers continue the header before them and each other.
+        (the hashes and the proof of work of the headers were checked by HeaderSchema)
+        :raise: SyncError if they don't.
+
+        :param headers: list of HeaderSchema, from the lowest height.
+        :param previous: HeaderSchema, the header below the first one.
+        """
+        for header in headers:
+            if header["height"] != previous["height"] + 1 or header["previous_hash"] != previous["hash"]:
+                raise SyncError(f"The header at height {header['height']} doesn't link to the chain")
+            previous = header
+
+    async def _request_headers(self, connection: PeerConnection, start: int) -> list[dict]:
+        """
+        :raise: ConnectionError if the connection was lost.
+        :param connection: PeerConnection, the node.
+        :param start: int, the height of the first header.
+        :return: list of HeaderSchema, the headers of the chain of the node from start, empty if start is past its tip.
+        """
+        request = create_get_headers_message("0.0.0.0", 0, start, SyncServer.MAX_HEADERS, self.codec)
+        return (await connection.request(request))["message"]["payload"].get("headers", [])
+
+    async def find_fork_point(self, connection: PeerConnection) -> tuple[int, list[dict]]:
+        """
+        Walks back from the tip of the chain, twice as far every time, until the headers of the node
+        share a block with the chain.
+        :raise: SyncError if the chains share no block within Blockchain.MAX_REORG_DEPTH of the tip,
+        ConnectionError if the connection was lost.
+
+        :param connection: PeerConnection, the node.
+        :return: tuple (int, the height of the last block both chains share,
+        list of HeaderSchema, the headers of the node above it that came with the answer).
+        """
+        tip = len(self.blockchain.chain) - 1
+        depth = 0
+        while True:
+            start = max(tip - depth, 0)
+            headers = await self._request_headers(connection, start)
+            shared = 0
+            while shared < len(headers) and headers[shared]["height"] <= tip and \
+                    headers[shared]["hash"] == self.blockchain.chain.hash_at(headers[shared]["height"]):
+                shared += 1
+            if shared:
+                return start + shared - 1, headers[shared:]
+            if start == 0:
+                raise SyncError("The node has another genesis block")
+            if depth >= Blockchain.MAX_REORG_DEPTH:
+                raise SyncError(f"The chain of the node forks more than {Blockchain.MAX_REORG_DEPTH} blocks "
+                                f"below the tip")
+            depth = min(max(2 * depth, 1), Blockchain.MAX_REORG_DEPTH)
+
+    async def download_headers(self, connection: PeerConnection) -> tuple[int, dict]:
+        """
+        Finds the point the chain of the node forks from this chain, and downloads and verifies the headers above it.
+        :raise: SyncError if the node sent headers that don't link or its chain forks too deep,
+        ConnectionError if the connection was lost.
+
+        :param connection: PeerConnection, the node to download from.
+        :return: tuple (int, the height of the last block both chains share,
+        dict {height: HeaderSchema}, the verified headers of the node above it).
+        """
+        fork_height, headers = await self.find_fork_point(connection)
+        previous = self.blockchain.get_header(fork_height)
+        verified = {}
+        while headers:
+            self._verify_headers(headers, previous)
+            for header in headers:
+                verified[header["height"]] = header
+            previous = headers[-1]
+            logger.info("Downloaded headers", peer=str(connection), height=previous["height"] + 1)
+            headers = await self._request_headers(connection, previous["height"] + 1)
+        return fork_height, verified
+
+    async def _try_download_headers(self, connection: PeerConnection) -> tuple[int, dict] | None:
+        """
+        :param connection: PeerConnection, the node to download from.
+        :return: tuple, see download_headers, None if the node couldn't be synchronised with.
+        """
+        try:
+            return await self.download_headers(connection)
+        except (SyncError, ConnectionError) as e:
+            logger.info("Couldn't download headers", peer=str(connection), error=str(e))
+            connection.close()
+            return None
+
+    def _extra_work(self, fork_height: int, headers: dict) -> int:
+        """
+        :param fork_height: int, the height of the last block the branch shares with the chain.
+        :param headers: dict {height: HeaderSchema}, the headers of the branch above the fork point.
+        :return: int, the work of the branch minus the work of the blocks of the chain it would replace.
+        """
+        chain_work = sum(block_work(self.blockchain.get_header(height))
+                         for height in range(fork_height + 1, len(self.blockchain.chain)))
+        return sum(block_work(header) for header in headers.values()) - chain_work
+
+    def _has_work(self) -> bool:
+        """
+        :return: Boolean, True if there is a height to download that is not too far above the tip of the chain.
+        """
+        return bool(self._heights) and self._heights[0] < self._next + self.max_ahead
+
+    async def _download_blocks(self, connection: PeerConnection, target: int) -> None:
+        """
+        Downloads batches of the lowest heights that are left until the blocks up to the target were handed
+        to the chain or the connection is lost, the heights of a failed request go back to the other workers.
+        """
+        while True:
+            async with self._progress:
+                await self._progress.wait_for(
+                    lambda: self._has_work() or self._next >= target or connection.closed)
+            if self._next >= target or connection.closed:
+                return
+            batch = []
+            while len(batch) < self.batch_size and self._has_work():
+                batch.append(heappop(self._heights))
+
+            try:
+                request = create_get_blocks_message("0.0.0.0", 0, batch, self.codec)
+                answer = await connection.request(request)
+            except ConnectionError as e:
+                logger.info("Lost a sync connection", peer=str(connection), error=str(e))
+                await self._return_heights(batch)
+                return
+
+            blocks = {block.get("height"): block for block in answer["message"]["payload"].get("blocks", [])}
+            missing = [height for height in batch
+                       if not blocks.get(height) or blocks[height].get("hash") != self.headers[height]["hash"]]
+            for height in set(batch) - set(missing):
+                self._downloaded[height] = (blocks[height], connection)
+            if missing:
+                # The node doesn't have the verified blocks, the other nodes may
+                logger.info("A node is missing synced blocks", peer=str(connection), heights=len(missing))
+                connection.close()
+                await self._return_heights(missing)
+            await self._add_downloaded_blocks()
+
+    async def _return_heights(self, heights: list[int]) -> None:
+        """
+        Puts heights back to be downloaded by another worker.
+        """
+        for height in heights:
+            heappush(self._heights, height)
+        async with self._progress:
+            self._progress.notify_all()
+
+    async def _add_downloaded_blocks(self) -> None:
+        """
+        Hands the downloaded blocks to the chain in height order, the blocks of a branch are side blocks until
+        the branch has more work than the chain, a block the chain rejects is downloaded again elsewhere.
+        """
+        while self._next in self._downloaded:
+            height = self._next
+            block, connection = self._downloaded.pop(height)
+            if self.blockchain.receive_block(block) not in (EXTENDED, SIDE, REORG, KNOWN):
+                logger.info("The chain rejected a synced block", peer=str(connection), height=height)
+                connection.close()
+                heappush(self._heights, height)
+                break
+            self.headers.pop(height, None)
+            self._next += 1
+        async with self._progress:
+            self._progress.notify_all()
+
+    async def sync(self, peers: list[tuple[str, int]]) -> int:
+        """
+        Brings the chain up to the verified chain of headers with the most work of the nodes,
+        switching to its branch if it forks from the chain.
+        :raise: SyncError if no node could be synchronised with.
+
+        :param peers: list of tuples (host, sync port) of the nodes.
+        :return: int, the number of blocks of the branch that were handed to the chain.
+        """
+        connections = []
+        for host, port in peers:
+            connection = PeerConnection(host, port, self.codec, self.window)
+            try:
+                await connection.open()
+            except OSError as e:
+                logger.info("Couldn't connect to a node", peer=str(connection), error=str(e))
+                continue
+            connections.append(connection)
+        try:
+            branches = [branch for branch in await asyncio.gather(*(self._try_download_headers(connection)
+                                                                    for connection in connections)) if branch]
+            if not branches:
+                raise SyncError("No node could be synchronised with")
+            fork_height, self.headers = max(branches, key=lambda branch: self._extra_work(*branch))
+            if self._extra_work(fork_height, self.headers) <= 0:
+                # No node has a chain with more work
+                self.headers = {}
+            target = max(self.headers, default=fork_height) + 1
+            first = self._next = fork_height + 1
+
+            # The heights left to download, lowest first
+            self._heights = list(range(first, target))
+            self._downloaded = {}
+            # Every connection has a worker for every request it can have in flight
+            await asyncio.gather(*(self._download_blocks(connection, target) for connection in connections
+                                   if not connection.closed for _ in range(self.window)))
+        finally:
+            for connection in connections:
+                connection.close()
+
+        added = self._next - first
+        logger.info("Synchronised the chain", added=added, fork_height=fork_height, height=len(self.blockchain.chain),
+                    target=target)
+        if self._next < target:
+            raise SyncError(f"The sync stopped at height {self._next} of {target}, sync again to resume")
+        return added
@@ -0,0 +1,53 @@
+import json
+from functools import cached_property
+from hashlib import sha256
+
+
+def canonical_bytes(data: dict | list) -> bytes:
+    """
+    Encodes data the same way every time, used for everything that is hashed or signed.
+
+    :param data: dict or list, JSON serializable data.
+    :return: bytes, the JSON encoding of the data with sorted keys.
+    """
+    return json.dumps(data, sort_keys=True).encode("ascii")
+
+
+class CanonicalTransaction(dict):
+    """
+    Class CanonicalTransaction, a transaction dict(similar to TransactionSchema) that encodes itself once.
+    The canonical encodings are computed on first use and cached on the transaction,
+    so a transaction must not be changed after it was signed.
+    """
+
+    @cached_property
+    def signing_bytes(self) -> bytes:
+        """
+        :return: bytes, the canonical encoding of the transaction without its signature, the data the sender signs.
+        """
+        return canonical_bytes({key: value for key, value in self.items() if key != "signature"})
+
+    @cached_property
+    def digest(self) -> str:
+        """
+        :return: str, the sha256 of the canonical encoding of the whole transaction in hexadecimal.
+        """
+        return sha256(canonical_bytes(self)).hexdigest()
+
+
+def as_canonical(transaction: dict) -> CanonicalTransaction:
+    """
+    :param transaction: dict, the transaction.
+    :return: CanonicalTransaction, the transaction itself if it's already canonical, otherwise a canonical copy of it.
+    """
+    if isinstance(transaction, CanonicalTransaction):
+        return transaction
+    return CanonicalTransaction(transaction)
+
+
+def transaction_digest(transaction: dict) -> str:
+    """
+    :param transaction: dict, the transaction.
+    :return: str, the cached digest of the transaction.
+    """
+    return as_canonical(transaction).digest
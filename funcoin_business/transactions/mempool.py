@@ -0,0 +1,149 @@
+from collections import OrderedDict
+
+
+class MempoolException(Exception):
+    pass
+
+
+class DuplicateTransactionException(MempoolException):
+    pass
+
+
+class CarConflictException(MempoolException):
+    pass
+
+
+class MempoolFullException(MempoolException):
+    pass
+
+
+class Mempool:
+    """
+    Class Mempool, holds the transactions waiting to be sealed into a block.
+    Transactions are kept in the order they arrived, and indexed by their signature and by the id of their car,
+    so a car can't be in two competing pending transfers at once. Transfers of a car may follow each other
+    (i.e. a car is created and then sold before the creation is sealed): a transaction of a pending car is accepted
+    if its sender is the receiver of the latest pending transaction of the car.
+    Once max_size transactions are pending, new transactions are rejected until a block takes some of them.
+    """
+
+    MAX_SIZE = 10000
+
+    def __init__(self, max_size: int = MAX_SIZE):
+        """
+        :param max_size: int, the maximal number of pending transactions.
+        """
+        self.max_size = max_size
+        # {signature: transaction} in arrival order
+        self.transactions = OrderedDict()
+        # {car id: list of the signatures of the pending transactions of the car, in arrival order}
+        self.cars = {}
+
+    def add(self, transaction: dict) -> None:
+        """
+        Adds a transaction to the end of the mempool.
+        :raise: DuplicateTransactionException if the transaction is already pending,
+        CarConflictException if another transaction of the same car is pending and the transaction doesn't follow it,
+        MempoolFullException if max_size transactions are pending.
+
+        :param transaction: TransactionSchema, the transaction.
+        """
+        signature = transaction["signature"]
+        car_id = transaction["item"]["id"]
+        if signature in self.transactions:
+            raise DuplicateTransactionException("The transaction is already pending")
+        if car_id in self.cars and \
+                not self._is_owner(transaction["sender"], self.transactions[self.cars[car_id][-1]]["receiver"]):
+            raise CarConflictException(f"The car {car_id} is already in a pending transaction")
+        # Evicting a pending transaction would undo a transfer the users were already told about
+        if len(self.transactions) >= self.max_size:
+            raise MempoolFullException(f"The mempool is full, {self.max_size} transactions are pending")
+
+        self.transactions[signature] = transaction
+        self.cars.setdefault(car_id, []).append(signature)
+
+    @staticmethod
+    def _is_owner(owner: dict, other: dict) -> bool:
+        """
+        :param owner: OwnerSchema, the sender or the receiver of a transaction.
+        :param other: OwnerSchema, the sender or the receiver of another transaction.
+        :return: Boolean, True if both are the same participant with the same access, False otherwise.
+        """
+        return owner["address"] == other["address"] and owner["access"] == other["access"]
+
+    def _unindex(self, transaction: dict) -> None:
+        """
+        Removes a transaction that left the mempool from the index of its car.
+
+        :param transaction: TransactionSchema, the transaction.
+        """
+        car_id = transaction["item"]["id"]
+        self.cars[car_id].remove(transaction["signature"])
+        if not self.cars[car_id]:
+            del self.cars[car_id]
+
+    def get(self, signature: str) -> dict | None:
+        """
+        :param signature: str, the signature of the transaction.
+        :return: TransactionSchema, the pending transaction with the signature, None if there is no such transaction.
+        """
+        return self.transactions.get(signature)
+
+    def get_by_car(self, car_id: int) -> dict | None:
+        """
+        :param car_id: int, the id of the car.
+        :return: TransactionSchema, the latest pending transaction of the car, None if there is no such transaction.
+        """
+        signatures = self.cars.get(car_id)
+        return self.transactions[signatures[-1]] if signatures else None
+
+    def remove(self, signature: str) -> dict | None:
+        """
+        :param signature: str, the signature of the transaction to remove.
+        :return: TransactionSchema, the removed transaction, None if it wasn't pending.
+        """
+        transaction = self.transactions.pop(signature, None)
+        if transaction:
+            self._unindex(transaction)
+        return transaction
+
+    def take(self, count: int) -> list[dict]:
+        """
+        Removes the oldest transactions, used to assemble a block.
+
+        :param count: int, the maximal number of transactions to take.
+        :return: list of TransactionSchema, in the order they arrived.
+        """
+        taken = []
+        while self.transactions and len(taken) < count:
+            _, transaction = self.transactions.popitem(last=False)
+            self._unindex(transaction)
+            taken.append(transaction)
+        return taken
+
+    def restore(self, transactions: list[dict]) -> None:
+        """
+        Puts taken transactions back at the front of the mempool, in their order,
+        transactions that are pending again, or whose car is pending again in a transaction that doesn't follow them,
+        are dropped.
+
+        :param transactions: list of TransactionSchema, the transactions in the order they were taken.
+        """
+        for transaction in reversed(transactions):
+            signature = transaction["signature"]
+            car_id = transaction["item"]["id"]
+            if signature in self.transactions or car_id in self.cars and \
+                    not self._is_owner(self.transactions[self.cars[car_id][0]]["sender"], transaction["receiver"]):
+                continue
+            self.transactions[signature] = transaction
+            self.transactions.move_to_end(signature, last=False)
+            self.cars.setdefault(car_id, []).insert(0, signature)
+
+    def __contains__(self, signature: str) -> bool:
+        return signature in self.transactions
+
+    def __len__(self) -> int:
+        return len(self.transactions)
+
+    def __iter__(self):
+        return iter(self.transactions.values())
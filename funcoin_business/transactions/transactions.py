@@ -1,14 +1,18 @@
-import json
 from time import time
 
 from nacl.exceptions import BadSignatureError
 
-from funcoin_business.schema import CarSchema
+from funcoin_business.transactions.canonical import CanonicalTransaction, as_canonical
 from funcoin_business.cars.car import Car
 from nacl.signing import VerifyKey
 from nacl.encoding import HexEncoder
 
 from funcoin_business.users.authorized_user import AuthorizedUser
+from funcoin_business.verification.keys import VERIFY_KEYS
+
+
+# The access of the receiver of a transaction that scraps a car, the car is gone once the transaction is applied
+SCRAPPED = "scrapped"
 
 
 def create_transaction(sender: AuthorizedUser, receiver: AuthorizedUser, car: Car) -> dict:
@@ -19,44 +23,97 @@ def create_transaction(sender: AuthorizedUser, receiver: AuthorizedUser, car: Ca
     :param car: Car(object), the car being transferred
     :return: dict, representing the transaction(the dict is similar to TransactionSchema)
     """
-    item = CarSchema().loads(CarSchema().dumps(car))
-    tx = {
+    return sign_transaction(sender, {"address": receiver.get_address(), "access": receiver.get_access()}, car)
+
+
+def create_car_transaction(manufacturer: AuthorizedUser, car: Car) -> dict:
+    """
+    Records the creation of a car on the chain, as a transaction of the car from the manufacturer to itself.
+
+    :param manufacturer: AuthorizedUser(object), the manufacturer who created the car.
+    :param car: Car(object), the new car.
+    :return: dict, representing the transaction(the dict is similar to TransactionSchema)
+    """
+    return create_transaction(manufacturer, manufacturer, car)
+
+
+def create_scrap_transaction(scrap_merchant: AuthorizedUser, car: Car) -> dict:
+    """
+    Records the destruction of a car on the chain, as a transaction of the car to the SCRAPPED access.
+
+    :param scrap_merchant: AuthorizedUser(object), the scrap merchant who destroyed the car.
+    :param car: Car(object), the destroyed car.
+    :return: dict, representing the transaction(the dict is similar to TransactionSchema)
+    """
+    return sign_transaction(scrap_merchant, {"address": scrap_merchant.get_address(), "access": SCRAPPED}, car)
+
+
+def is_car_creation(transaction: dict) -> bool:
+    """
+    :param transaction: TransactionSchema, a transaction.
+    :return: Boolean, True if the transaction records the creation of its car(see create_car_transaction).
+    """
+    return transaction["sender"]["address"] == transaction["receiver"]["address"] and \
+        transaction["sender"]["access"] == transaction["receiver"]["access"]
+
+
+def is_scrap(transaction: dict) -> bool:
+    """
+    :param transaction: TransactionSchema, a transaction.
+    :return: Boolean, True if the transaction records the destruction of its car(see create_scrap_transaction).
+    """
+    return transaction["receiver"]["access"] == SCRAPPED
+
+
+def sign_transaction(sender: AuthorizedUser, receiver: dict, car: Car) -> dict:
+    """
+    :param sender: User(object), the sender of the transaction, signs it.
+    :param receiver: dict(schema.OwnerSchema), the receiver of the transaction.
+    :param car: Car(object), the car being transferred
+    :return: dict, representing the transaction(the dict is similar to TransactionSchema)
+    """
+    # The car keeps changing owners, the transaction holds an immutable snapshot of it at the time of the transfer
+    item = car.snapshot()
+    tx = CanonicalTransaction({
         "timestamp": int(time()),
         "sender": {"address": sender.get_address(), "access": sender.get_access()},
-        "receiver": {"address": receiver.get_address(), "access": receiver.get_access()},
+        "receiver": receiver,
         "item": item,
-    }
-    tx_bytes = json.dumps(tx, sort_keys=True).encode("ascii")
+    })
 
-    # Now add the signature to the original transaction
-    tx["signature"] = sender.sign(tx_bytes)
+    # Now add the signature to the original transaction, the signed bytes stay cached on the transaction
+    tx["signature"] = sender.sign(tx.signing_bytes)
     return tx
 
 
-def validate_transaction(transaction: dict, sender: AuthorizedUser) -> bool:
+def verify_signature(verify_key: VerifyKey, signing_bytes: bytes, signature: str) -> bool:
     """
-    verifies that a given transaction was sent from the sender by his signature
-
-    :param transaction: the Transaction dict
-    :param sender: the sender of the transaction
-    :return: Boolean, True if valid False otherwise
+    :param verify_key: VerifyKey, the verification key of the signer(see verification.keys.VerifyKeyCache).
+    :param signing_bytes: bytes, the data that was signed.
+    :param signature: str, the hex encoded signature.
+    :return: Boolean, True if the signature is valid False otherwise
     """
-    # Copy the transaction
-    tx = transaction.copy()
-
-    # Strip the "signature" key from the tx
-    signature = tx.pop("signature")
     signature_bytes = HexEncoder.decode(signature)
 
-    tx_bytes = json.dumps(tx, sort_keys=True).encode("ascii")
-
-    # Generate a verifying key from the public key
-    verify_key = VerifyKey(sender.get_public_key(), encoder=HexEncoder)
-
     # Attempt to verify the signature
     try:
-        verify_key.verify(tx_bytes, signature_bytes)
+        verify_key.verify(signing_bytes, signature_bytes)
     except BadSignatureError:
         return False
     else:
         return True
+
+
+def validate_transaction(transaction: dict, sender: AuthorizedUser) -> bool:
+    """
+    verifies that a given transaction was sent from the sender by his signature
+
+    :param transaction: the Transaction dict
+    :param sender: the sender of the transaction
+    :return: Boolean, True if valid False otherwise
+    """
+    # Reuse the canonical encoding cached on the transaction, it doesn't include the signature
+    tx = as_canonical(transaction)
+    # The verifying key of the sender is parsed once and cached
+    verify_key = VERIFY_KEYS.get(sender.get_address(), sender.get_public_key())
+    return verify_signature(verify_key, tx.signing_bytes, tx["signature"])
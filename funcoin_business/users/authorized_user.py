@@ -46,6 +46,8 @@ class AuthorizedUser(User, ABC):
         self.cars = CarInventory()
         self.pending_transactions_q = queue.SimpleQueue()
         self.private_key = SigningKey.generate()
+        # Encoded once, verifiers compare it with the key they cached to tell if it changed
+        self.public_key = self.private_key.verify_key.encode(encoder=HexEncoder)
 
     async def __choose_user_for_transaction(self,
                                             access_dict: dict[str, 'AuthorizedUser'],
@@ -180,7 +182,14 @@ class AuthorizedUser(User, ABC):
         """
         :return: <bytes>, encoded verification key of the user, used to verify the user's signatures
         """
-        return self.private_key.verify_key.encode(encoder=HexEncoder)
+        return self.public_key
+
+    def rotate_keys(self) -> None:
+        """
+        Replaces the signing key of the user, verifiers that cached the old key replace it when they see the new one.
+        """
+        self.private_key = SigningKey.generate()
+        self.public_key = self.private_key.verify_key.encode(encoder=HexEncoder)
 
     def sign(self, data: bytes) -> str:
         """
@@ -6,6 +6,7 @@ from marshmallow.exceptions import MarshmallowError
 
 from funcoin_business.commands.commands import Command
 from funcoin_business.schema import CarSchema
+from funcoin_business.validation.validators import CAR_VALIDATOR
 from funcoin_business.users.authorized_user import AuthorizedUser
 from funcoin_business.cars.car import Car
 from funcoin_business.users.dealer import Dealer
@@ -73,7 +74,7 @@ class Manufacturer(AuthorizedUser):
             await self.receive_message("Please enter the color of the car:")
             color = await self.respond()
             try:
-                car = CarSchema().load({"id": ID, "owner": owner, "model": model, "color": color})
+                car = CAR_VALIDATOR.load({"id": ID, "owner": owner, "model": model, "color": color})
                 break
             except (MarshmallowError, json.decoder.JSONDecodeError):
                 await self.receive_message("There is a problem with the car details, please try again")
@@ -4,6 +4,14 @@ from funcoin_business.schema import AddressSchema
 from funcoin_business.utils import get_clean_str
 
 
+def encode_message(message: str) -> bytes:
+    """
+    :param message: str, a message to a user.
+    :return: bytes, the message as it is written to the user's connection.
+    """
+    return f'{message}\r\n'.encode()
+
+
 class User:
     """
     Class User , handles users with no access(guests), means they can't perform any transactions
@@ -30,6 +38,8 @@ class User:
         self.miner = miner
         self.address = address
         self.access = None
+        # outbound.send_queue.SendQueue, set while the user is in the connection pool
+        self.send_queue = None
 
     @property
     async def get_next_in_chain(self):
@@ -85,7 +95,20 @@ class User:
         sending a message to the user using asyncio.StreamWriter
         :param message: the message to receive
         """
-        self.writer.write(f'{message}\r\n'.encode())
+        self.send(encode_message(message))
+
+    def send(self, data: bytes, broadcast: bool = False) -> bool:
+        """
+        sends an encoded message to the user, through the user's send queue once the user is in the connection pool.
+        The data isn't copied, so the same bytes can be sent to many users.
+        :param data: bytes, the message encoded by encode_message.
+        :param broadcast: Boolean, True for a message sent to all the users, it may be dropped if the user is slow.
+        :return: True if the message was handed to the connection, False if it was dropped.
+        """
+        if self.send_queue is not None:
+            return self.send_queue.put(data, broadcast)
+        self.writer.write(data)
+        return True
 
     async def respond(self) -> str:
         """
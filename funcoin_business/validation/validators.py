@@ -0,0 +1,186 @@
+import json
+from collections import Counter
+
+from marshmallow import Schema, ValidationError
+
+from funcoin_business.schema import AddressSchema, CarSchema, TransactionSchema, BlockSchema, check_block_hash
+from funcoin_business.transactions.canonical import CanonicalTransaction, as_canonical
+
+
+# The schemas are built once, building a schema with nested schemas costs more than loading small data with it
+ADDRESS_SCHEMA = AddressSchema()
+CAR_SCHEMA = CarSchema()
+TRANSACTION_SCHEMA = TransactionSchema()
+BLOCK_SCHEMA = BlockSchema()
+
+ADDRESS_FIELDS = {"ip", "port"}
+OWNER_FIELDS = {"address", "access"}
+CAR_FIELDS = {"id", "owner", "model", "color"}
+TRANSACTION_FIELDS = {"timestamp", "sender", "receiver", "item", "signature"}
+BLOCK_FIELDS = {"height", "address", "transaction", "merkle_root", "previous_hash", "hash", "timestamp"}
+BLOCK_OPTIONAL_FIELDS = {"difficulty", "nonce"}
+
+
+def is_int(value) -> bool:
+    # bool is a subclass of int, but fields.Int rejects it
+    return type(value) is int
+
+
+def is_str(value) -> bool:
+    return type(value) is str
+
+
+def check_address(data, copy: bool = True) -> dict | None:
+    """
+    :param data: the data to validate as AddressSchema.
+    :param copy: Boolean, False to only validate the data, it is returned as is.
+    :return: dict, a copy of the address, None if the data isn't exactly in the shape AddressSchema loads.
+    """
+    if not (isinstance(data, dict) and data.keys() == ADDRESS_FIELDS and is_str(data["ip"]) and is_int(data["port"])):
+        return None
+    return {"ip": data["ip"], "port": data["port"]} if copy else data
+
+
+def check_owner(data, copy: bool = True) -> dict | None:
+    """
+    :param data: the data to validate as OwnerSchema.
+    :param copy: Boolean, False to only validate the data, it is returned as is.
+    :return: dict, a copy of the owner, None if the data isn't exactly in the shape OwnerSchema loads.
+    """
+    if not (isinstance(data, dict) and data.keys() == OWNER_FIELDS
+            and is_str(data["address"]) and is_str(data["access"])):
+        return None
+    return {"address": data["address"], "access": data["access"]} if copy else data
+
+
+def check_car(data, copy: bool = True) -> dict | None:
+    """
+    :param data: the data to validate as CarSchema.
+    :param copy: Boolean, False to only validate the data, it is returned as is.
+    :return: dict, a copy of the car, None if the data isn't exactly in the shape CarSchema loads.
+    """
+    if not (isinstance(data, dict) and data.keys() == CAR_FIELDS
+            and is_int(data["id"]) and is_str(data["model"]) and is_str(data["color"])):
+        return None
+    owner = check_owner(data["owner"], copy)
+    if owner is None:
+        return None
+    return {"id": data["id"], "owner": owner, "model": data["model"], "color": data["color"]} if copy else data
+
+
+def check_transaction(data, copy: bool = True) -> CanonicalTransaction | None:
+    """
+    :param data: the data to validate as TransactionSchema.
+    :param copy: Boolean, False to only validate the data, it is returned as is(wrapped by as_canonical).
+    :return: CanonicalTransaction, a copy of the transaction,
+    None if the data isn't exactly in the shape TransactionSchema loads.
+    """
+    if not (isinstance(data, dict) and data.keys() == TRANSACTION_FIELDS
+            and is_int(data["timestamp"]) and is_str(data["signature"])):
+        return None
+    sender = check_owner(data["sender"], copy)
+    receiver = check_owner(data["receiver"], copy)
+    item = check_car(data["item"], copy)
+    if sender is None or receiver is None or item is None:
+        return None
+    if not copy:
+        return as_canonical(data)
+    return CanonicalTransaction({"timestamp": data["timestamp"], "sender": sender, "receiver": receiver,
+                                 "item": item, "signature": data["signature"]})
+
+
+def check_block(data, copy: bool = True) -> dict | None:
+    """
+    :param data: the data to validate as BlockSchema.
+    :param copy: Boolean, False to only validate the data, it is returned as is.
+    :return: dict, a copy of the block, None if the data isn't exactly in the shape BlockSchema loads
+    or isn't sealed correctly.
+    """
+    if not (isinstance(data, dict) and BLOCK_FIELDS <= data.keys() <= BLOCK_FIELDS | BLOCK_OPTIONAL_FIELDS
+            and is_int(data["height"]) and type(data["timestamp"]) is float and is_str(data["merkle_root"])
+            and is_str(data["previous_hash"]) and is_str(data["hash"]) and type(data["transaction"]) is list):
+        return None
+    if "difficulty" in data and not (is_int(data["difficulty"]) and 0 <= data["difficulty"] <= 256):
+        return None
+    if "nonce" in data and not (is_int(data["nonce"]) and data["nonce"] >= 0):
+        return None
+    address = check_address(data["address"], copy)
+    transactions = [check_transaction(tx, copy) for tx in data["transaction"]]
+    if address is None or None in transactions:
+        return None
+    if not copy:
+        try:
+            check_block_hash(data)
+        except ValidationError:
+            return None
+        return data
+    block = {"height": data["height"], "address": address, "transaction": transactions,
+             "merkle_root": data["merkle_root"], "previous_hash": data["previous_hash"], "hash": data["hash"],
+             "timestamp": data["timestamp"]}
+    for key in ("difficulty", "nonce"):
+        if key in data:
+            block[key] = data[key]
+    try:
+        check_block_hash(block)
+    except ValidationError:
+        # The schema reports the error
+        return None
+    return block
+
+
+class Validator:
+    """
+    Class Validator, validates data of one type with a schema that is built once.
+    Data that is exactly in the shape the schema loads(the right types, no unknown or missing fields) is validated
+    by a check specialised for the type, anything else is loaded by the schema,
+    so coerced values and errors are the same as loading with the schema.
+    """
+
+    def __init__(self, schema: Schema, check):
+        """
+        :param schema: marshmallow.Schema, the schema of the type.
+        :param check: function, takes the data and whether to copy it, returns a copy of it as the schema would load it
+        (the data itself if it isn't copied), or None if the data isn't exactly in the shape the schema loads.
+        """
+        self.schema = schema
+        self.check = check
+        # The number of loads validated by the check and by the schema
+        self.counts = Counter(fast=0, schema=0)
+
+    def load(self, data, strict: bool = False):
+        """
+        Validates and deserializes data.
+        :raise: marshmallow.ValidationError if the data is invalid.
+
+        :param data: dict, the data.
+        :param strict: Boolean, True for data made by this node, which must already be exactly in the shape
+        the schema loads, it is validated without being coerced or copied.
+        :return: the loaded data, as the schema loads it.
+        """
+        # Strict data is only validated, it is already what the schema would load
+        loaded = self.check(data, not strict)
+        if loaded is not None:
+            self.counts["fast"] += 1
+            return loaded
+        self.counts["schema"] += 1
+        loaded = self.schema.load(data)
+        if strict:
+            raise ValidationError("Not in the shape the schema loads, the data would have to be coerced")
+        return loaded
+
+    def loads(self, text: str | bytes, strict: bool = False):
+        """
+        Validates and deserializes JSON text.
+        :raise: marshmallow.ValidationError if the data is invalid, json.decoder.JSONDecodeError if it isn't JSON.
+
+        :param text: str or bytes, the JSON text.
+        :param strict: Boolean, see load.
+        :return: the loaded data, as the schema loads it.
+        """
+        return self.load(json.loads(text), strict)
+
+
+ADDRESS_VALIDATOR = Validator(ADDRESS_SCHEMA, check_address)
+CAR_VALIDATOR = Validator(CAR_SCHEMA, check_car)
+TRANSACTION_VALIDATOR = Validator(TRANSACTION_SCHEMA, check_transaction)
+BLOCK_VALIDATOR = Validator(BLOCK_SCHEMA, check_block)
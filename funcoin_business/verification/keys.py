@@ -0,0 +1,59 @@
+from collections import Counter, OrderedDict
+
+from nacl.encoding import HexEncoder
+from nacl.signing import VerifyKey
+
+
+class VerifyKeyCache:
+    """
+    Class VerifyKeyCache, keeps the parsed verification keys of the participants, so a key is decoded once
+    and not for every transaction. An entry is replaced when the participant's public key changes(the keys were
+    rotated), and dropped when the participant disconnects.
+    """
+
+    CACHE_SIZE = 1024
+
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        """
+        :param cache_size: int, the maximal number of participants whose keys are kept.
+        """
+        self.cache_size = cache_size
+        # {address: (hex encoded public key, VerifyKey)} from the least recently used
+        self._cache = OrderedDict()
+        self.cache_stats = Counter(hits=0, misses=0)
+
+    def get(self, address: str, public_key: bytes) -> VerifyKey:
+        """
+        :raise: ValueError or nacl.exceptions.CryptoError if the public key isn't a valid verification key.
+
+        :param address: str, "ip:port" of the participant.
+        :param public_key: bytes, the hex encoded public key of the participant(AuthorizedUser.get_public_key).
+        :return: VerifyKey, the parsed key, it holds the raw bytes of the key.
+        """
+        entry = self._cache.get(address)
+        if entry is not None and entry[0] == public_key:
+            self._cache.move_to_end(address)
+            self.cache_stats["hits"] += 1
+            return entry[1]
+        self.cache_stats["misses"] += 1
+        verify_key = VerifyKey(public_key, encoder=HexEncoder)
+        self._cache[address] = (public_key, verify_key)
+        self._cache.move_to_end(address)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return verify_key
+
+    def invalidate(self, address: str) -> None:
+        """
+        Drops the key of a participant, i.e. when they disconnect.
+
+        :param address: str, "ip:port" of the participant.
+        """
+        self._cache.pop(address, None)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+# The keys of the connected participants, shared by everything that verifies their signatures
+VERIFY_KEYS = VerifyKeyCache()
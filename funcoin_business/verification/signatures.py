@@ -0,0 +1,140 @@
+import asyncio
+import binascii
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import structlog
+from nacl.exceptions import CryptoError
+from nacl.signing import VerifyKey
+
+from funcoin_business.transactions.canonical import as_canonical
+from funcoin_business.transactions.transactions import verify_signature
+from funcoin_business.verification.keys import VerifyKeyCache, VERIFY_KEYS
+
+logger = structlog.getLogger(__name__)
+
+
+def verify_batch(checks: list[tuple[VerifyKey, bytes, str]]) -> list[bool]:
+    """
+    Runs in a worker thread, verifies a batch of signatures, each one on its own,
+    so an invalid or malformed signature fails only its own check.
+
+    :param checks: list of tuples (verify key, signed bytes, signature), see transactions.verify_signature.
+    :return: list of Boolean, True for every valid signature, in the order of the checks.
+    """
+    results = []
+    for verify_key, signing_bytes, signature in checks:
+        try:
+            results.append(verify_signature(verify_key, signing_bytes, signature))
+        except (binascii.Error, ValueError, TypeError):
+            # The signature isn't valid hex or has the wrong length
+            results.append(False)
+    return results
+
+
+class SignatureVerifier:
+    """
+    Class SignatureVerifier, verifies transaction signatures in batches on a pool of threads.
+    Checks are collected until batch_size are waiting or max_delay seconds passed since the first of them,
+    then the batch is verified by a worker and every check gets its own result.
+    libsodium releases the GIL while it verifies, so bursts of transactions use all the cores
+    while the event loop keeps serving the users.
+    """
+
+    BATCH_SIZE = 64
+    MAX_DELAY = 0.002
+
+    def __init__(self, workers: int | None = None, batch_size: int = BATCH_SIZE, max_delay: float = MAX_DELAY,
+                 keys: VerifyKeyCache = VERIFY_KEYS):
+        """
+        :param workers: int, the number of worker threads, the number of cores if not given.
+        :param batch_size: int, the number of waiting checks that are verified right away.
+        :param max_delay: float, the maximal number of seconds a check waits for its batch to fill.
+        :param keys: VerifyKeyCache, the parsed keys of the senders, the cache shared by the node if not given.
+        """
+        self.workers = workers or os.cpu_count()
+        self.keys = keys
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.executor = None
+        self._checks = []
+        self._futures = []
+        self._timer = None
+        # The number of verified batches, valid signatures and failed signatures
+        self.counts = Counter(batches=0, valid=0, failed=0)
+
+    async def verify(self, transaction: dict, address: str, public_key: bytes) -> bool:
+        """
+        Verifies that a transaction was signed by the owner of the public key.
+
+        :param transaction: dict, the transaction(similar to TransactionSchema).
+        :param address: str, "ip:port" of the sender.
+        :param public_key: bytes, the hex encoded verification key of the sender(AuthorizedUser.get_public_key).
+        :return: Boolean, True if the signature is valid False otherwise
+        """
+        loop = asyncio.get_running_loop()
+        # The keys are parsed on the event loop, the cache isn't shared with the workers
+        try:
+            verify_key = self.keys.get(address, public_key)
+        except (CryptoError, ValueError, TypeError):
+            self.counts["failed"] += 1
+            return False
+        # Reuse the canonical encoding cached on the transaction, it doesn't include the signature
+        tx = as_canonical(transaction)
+        future = loop.create_future()
+        self._checks.append((verify_key, tx.signing_bytes, tx["signature"]))
+        self._futures.append(future)
+        if len(self._checks) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """
+        Hands the waiting checks to a worker as one batch.
+        """
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if not self._checks:
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="signatures")
+        checks, futures = self._checks, self._futures
+        self._checks, self._futures = [], []
+        batch = asyncio.get_running_loop().run_in_executor(self.executor, verify_batch, checks)
+        batch.add_done_callback(lambda done: self._resolve(done, futures))
+
+    def _resolve(self, batch: asyncio.Future, futures: list[asyncio.Future]) -> None:
+        """
+        Gives every check of a verified batch its result.
+
+        :param batch: asyncio.Future, the batch, its result is the result of verify_batch.
+        :param futures: list of asyncio.Future, the futures of the checks, in the order of the batch.
+        """
+        self.counts["batches"] += 1
+        if batch.cancelled():
+            for future in futures:
+                future.cancel()
+            return
+        if batch.exception():
+            logger.error("Signature verification failed", error=str(batch.exception()), checks=len(futures))
+            for future in futures:
+                if not future.done():
+                    future.set_exception(batch.exception())
+            return
+        for future, valid in zip(futures, batch.result()):
+            self.counts["valid" if valid else "failed"] += 1
+            # The transaction the check was made for may have been cancelled meanwhile
+            if not future.done():
+                future.set_result(valid)
+
+    def close(self) -> None:
+        """
+        Shuts the worker threads down.
+        """
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import structlog
+
+from funcoin_business.blockchain import Blockchain
+from funcoin_business.mining.miner import meets_difficulty
+from funcoin_business.storage.block_store import BlockStore
+from funcoin_business.storage.header_chain import HeaderChain
+
+logger = structlog.getLogger(__name__)
+
+GENESIS_PREVIOUS_HASH = "first block"
+
+
+def verify_blocks(blocks, start: int) -> dict:
+    """
+    Recomputes the hashes and merkle roots of consecutive blocks and checks the links between them.
+
+    :param blocks: iterable of dict(BlockSchema), the blocks from the height start onwards.
+    :param start: int, the height of the first block.
+    :return: dict {
+        "first_previous_hash": Str, the previous hash of the first block, checked by the caller.
+        "last_hash": Str, the hash of the last block.
+        "invalid": list of tuples (height, reason), the blocks that failed verification.
+    }
+    """
+    result = {"first_previous_hash": None, "last_hash": None, "invalid": []}
+    previous_hash = None
+    for height, block in enumerate(blocks, start):
+        if height == start:
+            result["first_previous_hash"] = block["previous_hash"]
+        elif block["previous_hash"] != previous_hash:
+            result["invalid"].append((height, "previous hash doesn't match the previous block"))
+        if block["height"] != height:
+            result["invalid"].append((height, "height doesn't match the position in the chain"))
+        if block["hash"] != Blockchain.hash(block):
+            result["invalid"].append((height, "hash is wrong"))
+        if block["merkle_root"] != Blockchain.merkle_root(block["transaction"]):
+            result["invalid"].append((height, "merkle root is wrong"))
+        if not meets_difficulty(block["hash"], block.get("difficulty", 0)):
+            result["invalid"].append((height, "not enough proof of work"))
+        previous_hash = block["hash"]
+    result["last_hash"] = previous_hash
+    return result
+
+
+def verify_store_range(directory: str, start: int, end: int) -> dict:
+    """
+    Runs in a worker process, verifies the blocks of a range read from its own read only view of the store.
+
+    :param directory: str, the directory of the BlockStore.
+    :param start: int, the height of the first block in the range.
+    :param end: int, the height to stop before.
+    :return: dict, see verify_blocks.
+    """
+    store = BlockStore(directory, readonly=True)
+    try:
+        return verify_blocks((store[height] for height in range(start, end)), start)
+    finally:
+        store.close()
+
+
+class ChainVerifier:
+    """
+    Class ChainVerifier, verifies the integrity of the whole chain on all cores.
+    The chain is split into ranges of heights, each range is verified in a worker process, and the links between
+    the ranges are checked when the results are collected.
+    The last verified height and its hash are saved as a checkpoint, so the next run verifies only newer blocks.
+    """
+
+    CHECKPOINT_NAME = "verified_checkpoint.json"
+    RANGE_SIZE = 10000
+
+    def __init__(self, blockchain: Blockchain, checkpoint_path: str | None = None, workers: int | None = None,
+                 range_size: int = RANGE_SIZE):
+        """
+        :param blockchain: Blockchain, the chain to verify.
+        :param checkpoint_path: str, the file the checkpoint is saved to, the checkpoint is kept in memory if not given.
+        :param workers: int, the number of worker processes, the number of cores if not given.
+        :param range_size: int, the number of blocks a worker verifies at once.
+        """
+        self.blockchain = blockchain
+        self.checkpoint_path = checkpoint_path
+        self.workers = workers or os.cpu_count()
+        self.range_size = range_size
+        self.checkpoint = self.load_checkpoint()
+
+    def load_checkpoint(self) -> dict | None:
+        """
+        :return: dict {"height": int, "hash": str} of the last verified block, None if nothing was verified yet.
+        """
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return None
+        try:
+            with open(self.checkpoint_path) as checkpoint_file:
+                return json.load(checkpoint_file)
+        except (OSError, json.decoder.JSONDecodeError) as e:
+            logger.warning("Ignoring unreadable verification checkpoint", error=str(e))
+            return None
+
+    def save_checkpoint(self, height: int, block_hash: str) -> None:
+        """
+        Atomically replaces the checkpoint.
+
+        :param height: int, the height of the last verified block.
+        :param block_hash: str, the hash of the last verified block.
+        """
+        self.checkpoint = {"height": height, "hash": block_hash}
+        if not self.checkpoint_path:
+            return
+        temp_path = self.checkpoint_path + ".tmp"
+        with open(temp_path, "w") as checkpoint_file:
+            json.dump(self.checkpoint, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temp_path, self.checkpoint_path)
+
+    def _start(self) -> tuple[int, str]:
+        """
+        :return: tuple (height, previous hash) to start verifying from, after the checkpoint if it's still on the chain.
+        """
+        chain = self.blockchain.chain
+        if self.checkpoint and self.checkpoint["height"] < len(chain):
+            if chain.hash_at(self.checkpoint["height"]) == self.checkpoint["hash"]:
+                return self.checkpoint["height"] + 1, self.checkpoint["hash"]
+            logger.warning("The verification checkpoint is no longer on the chain, verifying from genesis")
+        return 0, GENESIS_PREVIOUS_HASH
+
+    def _submit_ranges(self, executor: ProcessPoolExecutor, start: int, end: int) -> list[Future]:
+        """
+        Hands the ranges between start and end to the workers, the blocks kept in memory are read by the caller.
+
+        :return: list of Future, of the results of verify_blocks for the ranges, in order.
+        """
+        ranges = [(range_start, min(range_start + self.range_size, end))
+                  for range_start in range(start, end, self.range_size)]
+        chain = self.blockchain.chain
+        # The blocks of a header chain are in its block store
+        chain = chain.store if isinstance(chain, HeaderChain) else chain
+        # A disk store is opened by every worker, blocks kept in memory are sent to the workers
+        if isinstance(chain, BlockStore):
+            return [executor.submit(verify_store_range, chain.directory, range_start, range_end)
+                    for range_start, range_end in ranges]
+        return [executor.submit(verify_blocks, chain[range_start:range_end], range_start)
+                for range_start, range_end in ranges]
+
+    def _verify_ranges(self, start: int, end: int) -> list[dict]:
+        """
+        :return: list of dict, the results of verify_blocks for the ranges between start and end, in order.
+        """
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            return [future.result() for future in self._submit_ranges(executor, start, end)]
+
+    def _conclude(self, start: int, previous_hash: str, end: int, results: list[dict]) -> dict:
+        """
+        Checks the links between the ranges and moves the checkpoint to the last valid block.
+
+        :return: dict, see verify.
+        """
+        invalid = []
+        last_valid = (start - 1, previous_hash)
+        for range_start, result in zip(range(start, end, self.range_size), results):
+            # The link between this range and the one before it
+            if result["first_previous_hash"] != previous_hash:
+                invalid.append((range_start, "previous hash doesn't match the previous block"))
+            invalid.extend(result["invalid"])
+            previous_hash = result["last_hash"]
+            if not invalid:
+                last_valid = (min(range_start + self.range_size, end) - 1, previous_hash)
+
+        if last_valid[0] >= start:
+            self.save_checkpoint(*last_valid)
+        if invalid:
+            logger.error("Chain verification failed", invalid=invalid[:10], count=len(invalid))
+        else:
+            logger.info("Chain verified", height=end)
+        return {"start": start, "end": end, "invalid": invalid}
+
+    def verify(self) -> dict:
+        """
+        Verifies all the blocks after the checkpoint and moves the checkpoint to the last valid block.
+
+        :return: dict {
+            "start": int, the first verified height.
+            "end": int, the height verification stopped before.
+            "invalid": list of tuples (height, reason), empty if the chain is intact.
+        }
+        """
+        start, previous_hash = self._start()
+        end = len(self.blockchain.chain)
+        logger.info("Verifying chain", start=start, end=end, workers=self.workers)
+        return self._conclude(start, previous_hash, end, self._verify_ranges(start, end))
+
+    async def run_in_background(self, interval: float) -> None:
+        """
+        Verifies new blocks every interval seconds without blocking the event loop.
+        The chain is only read on the event loop, where blocks are added to it, the workers are waited for
+        without blocking it.
+
+        :param interval: float, seconds between verifications.
+        """
+        while True:
+            start, previous_hash = self._start()
+            end = len(self.blockchain.chain)
+            if end > start:
+                executor = ProcessPoolExecutor(max_workers=self.workers)
+                try:
+                    futures = self._submit_ranges(executor, start, end)
+                    results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+                finally:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                self._conclude(start, previous_hash, end, results)
+            await asyncio.sleep(interval)
@@ -1,22 +1,139 @@
+import argparse
 import asyncio
+import os
+import sys
+
+import structlog
 
 from funcoin_business.blockchain import Blockchain
+from funcoin_business.admission.admission import AdmissionControl
+from funcoin_business.admission.voter import ABSTAIN, REJECT
+from funcoin_business.codec.codec import CODECS, JsonCodec
+from funcoin_business.storage.archiver import SegmentArchiver
+from funcoin_business.storage.block_store import BlockStore
+from funcoin_business.storage.header_chain import HeaderChain
+from funcoin_business.storage.snapshots import SnapshotStore
 from funcoin_business.server import Server
 from funcoin_business.connections import ConnectionPool
+from funcoin_business.outbound.send_queue import SendQueue, DROP, COALESCE, DISCONNECT
 from funcoin_business.peers import P2PProtocol
 from funcoin_business.controller.controller import Controller
+from funcoin_business.mining.miner import DifficultyAdjuster, Miner
+from funcoin_business.sealer.sealer import BlockSealer
+from funcoin_business.sync.sync import SyncClient, SyncError, SyncServer
+from funcoin_business.verification.signatures import SignatureVerifier
+from funcoin_business.verification.verifier import ChainVerifier
+
+logger = structlog.getLogger(__name__)
+
+# The directory the ledger is kept in between runs of the node
+DATA_DIR = "chain_data"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Runs a blockchain for business node")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="the directory the ledger is kept in")
+    parser.add_argument("--store-codec", choices=list(CODECS), default=JsonCodec.name,
+                        help="the encoding of blocks in a new ledger, an existing ledger keeps its encoding")
+    parser.add_argument("--header-chain", action="store_true",
+                        help="keep only the headers of the blocks in memory, the blocks are read from disk on demand")
+    parser.add_argument("--block-cache", type=int, default=HeaderChain.CACHE_SIZE,
+                        help="the number of recently used blocks a header chain keeps in memory")
+    parser.add_argument("--archive-after", type=float, default=0,
+                        help="seconds after which full segments of old blocks are compressed, 0 disables archiving")
+    parser.add_argument("--archive-interval", type=float, default=SegmentArchiver.INTERVAL,
+                        help="seconds between looks for segments to archive")
+    parser.add_argument("--verify", action="store_true",
+                        help="verify the integrity of the chain before the server starts")
+    parser.add_argument("--verify-interval", type=float, default=0,
+                        help="seconds between background verifications of new blocks, 0 disables it")
+    parser.add_argument("--block-size", type=int, default=Blockchain.MAX_TRANSACTIONS,
+                        help="the number of pending transactions that seals a block right away")
+    parser.add_argument("--block-deadline", type=float, default=BlockSealer.MAX_LATENCY,
+                        help="the maximal number of seconds a transaction waits to be sealed into a block")
+    parser.add_argument("--snapshot-interval", type=int, default=SnapshotStore.INTERVAL,
+                        help="the number of blocks between snapshots of the cars")
+    parser.add_argument("--mine", action="store_true",
+                        help="seal blocks with proof of work, every node of the network must use the same setting")
+    parser.add_argument("--mining-workers", type=int, default=None,
+                        help="the number of processes that mine, the number of cores by default")
+    parser.add_argument("--block-interval", type=float, default=DifficultyAdjuster.BLOCK_INTERVAL,
+                        help="the wanted number of seconds between mined blocks")
+    parser.add_argument("--initial-difficulty", type=int, default=DifficultyAdjuster.INITIAL_DIFFICULTY,
+                        help="the number of leading zero bits of the first mined blocks")
+    parser.add_argument("--signature-workers", type=int, default=None,
+                        help="the number of threads that verify transaction signatures, the number of cores by default")
+    parser.add_argument("--max-concurrent-joins", type=int, default=AdmissionControl.MAX_CONCURRENT,
+                        help="the number of users that can be in authorization at the same time")
+    parser.add_argument("--join-timeout", type=float, default=AdmissionControl.TIMEOUT,
+                        help="the maximal number of seconds the authorization of a joining user takes")
+    parser.add_argument("--join-queue-timeout", type=float, default=AdmissionControl.QUEUE_TIMEOUT,
+                        help="the maximal number of seconds a joining user waits in line for authorization")
+    parser.add_argument("--vote-deadline", type=float, default=AdmissionControl.VOTE_DEADLINE,
+                        help="the maximal number of seconds an authorization vote takes")
+    parser.add_argument("--silent-voters", choices=[ABSTAIN, REJECT], default=ABSTAIN,
+                        help="what the votes of users who didn't vote by the deadline count as")
+    parser.add_argument("--send-queue-size", type=int, default=SendQueue.MAX_MESSAGES,
+                        help="the number of messages that can wait to be written to a user")
+    parser.add_argument("--slow-consumer", choices=[DROP, COALESCE, DISCONNECT], default=DROP,
+                        help="what happens to messages for a user whose send queue is full")
+    parser.add_argument("--sync-port", type=int, default=SyncServer.PORT,
+                        help="the port the chain is served on to nodes that synchronise with this one")
+    parser.add_argument("--sync-from", action="append", default=[], metavar="HOST:PORT",
+                        help="a node to synchronise the chain with before the server starts, can be repeated")
+    parser.add_argument("--sync-codec", choices=list(CODECS), default=None,
+                        help="the encoding of sync messages, JSON text by default, all nodes must use the same one")
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace):
+    # Instantiate the blockchain and our pool for "peers"
+    difficulty = DifficultyAdjuster(args.block_interval, args.initial_difficulty) if args.mine else None
+    block_store = BlockStore(args.data_dir, codec=args.store_codec)
+    store = HeaderChain(block_store, args.block_cache) if args.header_chain else block_store
+    blockchain = Blockchain(store, difficulty=difficulty)
+    # The background tasks of the node, cancelled once the server stops
+    background_tasks = []
+    if args.archive_after:
+        background_tasks.append(asyncio.create_task(
+            SegmentArchiver(block_store, args.archive_after, args.archive_interval).run()))
+    connection_pool = ConnectionPool(args.send_queue_size, args.slow_consumer)
 
-# Instantiate the blockchain and our pool for "peers"
-blockchain = Blockchain()
-connection_pool = ConnectionPool()
+    verifier = ChainVerifier(blockchain, os.path.join(args.data_dir, ChainVerifier.CHECKPOINT_NAME))
+    if args.verify and verifier.verify()["invalid"]:
+        sys.exit("The chain failed verification, the server was not started")
+    if args.verify_interval:
+        background_tasks.append(asyncio.create_task(verifier.run_in_background(args.verify_interval)))
 
-# Instantiate the server
-server = Server(blockchain, connection_pool, P2PProtocol, Controller)
+    # Bring the chain up to date with other nodes, then serve it to nodes that synchronise with this one
+    sync_codec = CODECS[args.sync_codec] if args.sync_codec else None
+    if args.sync_from:
+        peers = [(host, int(port)) for host, port in (peer.rsplit(":", 1) for peer in args.sync_from)]
+        try:
+            await SyncClient(blockchain, sync_codec).sync(peers)
+        except SyncError as e:
+            logger.warning("The chain is not fully synchronised", error=str(e))
+    background_tasks.append(asyncio.create_task(SyncServer(blockchain, sync_codec, port=args.sync_port).listen()))
 
+    # Instantiate the server
+    snapshots = SnapshotStore(os.path.join(args.data_dir, "snapshots"), args.snapshot_interval)
+    miner = Miner(args.mining_workers) if args.mine else None
+    signatures = SignatureVerifier(args.signature_workers)
+    server = Server(blockchain, connection_pool, P2PProtocol, Controller, args.block_size, args.block_deadline,
+                    snapshots, miner, signatures,
+                    AdmissionControl(args.max_concurrent_joins, args.join_queue_timeout, args.join_timeout,
+                                     vote_deadline=args.vote_deadline, silent_voters=args.silent_voters))
 
-async def main():
     # start the server
-    await server.listen()
+    try:
+        await server.listen()
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        signatures.close()
+        if miner:
+            miner.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
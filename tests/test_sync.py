@@ -0,0 +1,56 @@
+import asyncio
+import unittest
+
+import funcoin_business.blockchain
+from funcoin_business.blockchain import Blockchain
+from funcoin_business.sync.sync import SyncClient, SyncServer
+
+
+class SyncTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_sync_two_fresh_chains(self):
+        source = Blockchain()
+        for _ in range(5):
+            self.assertTrue(source.add_block(source.new_block(), trusted=True))
+        target = Blockchain()
+        self.assertEqual(source.chain[0]["hash"], target.chain[0]["hash"])
+
+        sync_server = SyncServer(source)
+        server = await asyncio.start_server(sync_server.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            added = await SyncClient(target).sync([("127.0.0.1", port)])
+
+        self.assertEqual(added, 5)
+        self.assertEqual([block["hash"] for block in target.chain], [block["hash"] for block in source.chain])
+
+    async def test_sync_follows_the_chain_with_the_most_work(self):
+        source = Blockchain()
+        shorter = Blockchain()
+        target = Blockchain()
+        for _ in range(3):
+            block = source.new_block()
+            self.assertTrue(source.add_block(block, trusted=True))
+            self.assertTrue(shorter.add_block(block))
+            self.assertTrue(target.add_block(block))
+        # The target went on with a block of its own, the source with a longer branch
+        self.assertTrue(target.add_block(target.new_block(), trusted=True))
+        self.assertTrue(shorter.add_block(shorter.new_block(), trusted=True))
+        for _ in range(4):
+            self.assertTrue(source.add_block(source.new_block(), trusted=True))
+
+        servers = [await asyncio.start_server(SyncServer(chain).handle_connection, "127.0.0.1", 0)
+                   for chain in (shorter, source)]
+        peers = [("127.0.0.1", server.sockets[0].getsockname()[1]) for server in servers]
+        try:
+            added = await SyncClient(target).sync(peers)
+        finally:
+            for server in servers:
+                server.close()
+
+        self.assertEqual(added, 4)
+        self.assertEqual([block["hash"] for block in target.chain], [block["hash"] for block in source.chain])
+
+
+if __name__ == "__main__":
+    unittest.main()